@@ -0,0 +1,223 @@
+"""PDF処理モジュール（asyncio版・モック実装）.
+
+`PDFProcessor` と同じステータス遷移・結果ファイルを、1つのイベントループ上で多数のジョブを
+並行処理できる形で実装する。ページ解析の待ち時間は `asyncio.sleep` で、CPU負荷のある処理は
+executor 上で実行する。
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import Executor
+from typing import Any
+
+import redis.asyncio as aioredis
+from loguru import logger
+
+from async_storage import AsyncStorageClient
+from cancellation import AsyncCancellationToken, JobCancelledError
+from processor import (
+    build_cancelled_status,
+    build_result_data,
+    build_status_data,
+    queue_status,
+    result_path_for,
+)
+from tracing import JobTiming, get_tracer
+
+
+async def save_status_async(
+    redis_client: aioredis.Redis,
+    job_id: str,
+    status_data: dict[str, Any],
+    pages: int = 0,
+    processing_seconds: float | None = None,
+    count: bool = True,
+) -> None:
+    """ステータスを書き込む（asyncio版、`processor.save_status` を参照）.
+
+    Args:
+        redis_client: 非同期Redisクライアント
+        job_id: ジョブID
+        status_data: ステータスデータ
+        pages: 前回の書き込み以降に処理したページ数
+        processing_seconds: 完了ジョブの処理時間（秒）
+        count: False の場合は終了ステータスの件数をカウンタに加算しない
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    queue_status(pipe, job_id, status_data, pages, processing_seconds, count)
+    await pipe.execute()
+
+
+def analyze_page(page_num: int) -> dict[str, int]:
+    """1ページ分のCPU処理（モック）.
+
+    ProcessPoolExecutor から呼び出せるよう、モジュールレベルの関数として定義する。
+
+    Args:
+        page_num: ページ番号
+
+    Returns:
+        dict[str, int]: ページ解析結果
+    """
+    return {"page": page_num}
+
+
+class AsyncPDFProcessor:
+    """PDF処理クラス（asyncio版・モック実装）."""
+
+    def __init__(
+        self,
+        job_id: str,
+        pdf_path: str,
+        storage_client: AsyncStorageClient,
+        redis_client: aioredis.Redis,
+        cpu_executor: Executor | None = None,
+        page_delay_range: tuple[float, float] = (3.0, 5.0),
+        page_count_range: tuple[int, int] = (5, 20),
+        cancel_check_interval: float | None = None,
+        timing: JobTiming | None = None,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            pdf_path: PDFファイルのストレージパス
+            storage_client: 非同期ストレージクライアント
+            redis_client: 非同期Redisクライアント（共有コネクションプール）
+            cpu_executor: ページ解析のCPU処理を実行するexecutor（None の場合はデフォルト）
+            page_delay_range: 1ページあたりの解析時間の範囲（秒, 最小〜最大）
+            page_count_range: モックのページ数の範囲（最小〜最大）
+            cancel_check_interval: キャンセルフラグを確認する最小間隔（秒, None の場合は確認しない）
+            timing: レイテンシ内訳の計測点（完了ステータスに内訳を記録する場合に指定）
+        """
+        self.job_id = job_id
+        self.pdf_path = pdf_path
+        self.storage_client = storage_client
+        self.redis_client = redis_client
+        self.cpu_executor = cpu_executor
+        self.page_delay_range = page_delay_range
+        self.timing = timing
+        self.cancel_token = (
+            AsyncCancellationToken(job_id, redis_client, cancel_check_interval)
+            if cancel_check_interval is not None
+            else None
+        )
+        # モック: ランダムにページ数を生成
+        self.page_count = random.randint(*page_count_range)
+        logger.info(f"[{self.job_id}] PDF has {self.page_count} pages (mock)")
+
+    async def process(self) -> str:
+        """PDFを処理し、結果ファイルのパスを返す.
+
+        Returns:
+            str: 結果ファイルのパス（例: "results/{job_id}/result.json"）
+
+        Raises:
+            JobCancelledError: ジョブがキャンセルされ、ページの区切りで中止した場合
+            Exception: 処理中にエラーが発生した場合
+        """
+        loop = asyncio.get_running_loop()
+        tracer = get_tracer()
+        start_time = time.time()
+
+        try:
+            # 処理待ちの間にキャンセルされたジョブは開始しない
+            await self.check_cancelled(0)
+
+            # 処理開始ステータス更新
+            await self._update_status(
+                status="processing", progress=0, message="Processing started..."
+            )
+
+            # 各ページ処理
+            for page_num in range(1, self.page_count + 1):
+                # ページ解析シミュレーション（外部解析の待ち時間はイベントループを解放して待機）
+                with tracer.span("analyze_page", job_id=self.job_id, page=page_num):
+                    await asyncio.sleep(random.uniform(*self.page_delay_range))
+                    await loop.run_in_executor(self.cpu_executor, analyze_page, page_num)
+
+                # 進捗率計算
+                progress = int((page_num / self.page_count) * 100)
+                message = f"Page {page_num}/{self.page_count} analyzing..."
+
+                # Redis更新
+                await self._update_status(
+                    status="processing", progress=progress, message=message, pages=1
+                )
+                logger.info(f"[{self.job_id}] {message} ({progress}%)")
+
+                if page_num < self.page_count:
+                    await self.check_cancelled(page_num)
+        except JobCancelledError as e:
+            await save_status_async(
+                self.redis_client, self.job_id, build_cancelled_status(e.pages_done, e.page_count)
+            )
+            logger.info(f"[{self.job_id}] {e}")
+            raise
+
+        # 処理完了
+        processing_time = time.time() - start_time
+
+        # 結果ファイル生成
+        result_path = result_path_for(self.job_id)
+        result_bytes = build_result_data(self.job_id, self.page_count, processing_time)
+        with tracer.span("upload_result", job_id=self.job_id, bytes=len(result_bytes)):
+            await self.storage_client.upload_file(result_bytes, result_path)
+
+        # 完了ステータス更新
+        await self._update_status(
+            status="completed",
+            progress=100,
+            message="Processing completed!",
+            result_url=result_path,
+            latency=(self.timing.breakdown(processing_time, time.time()) if self.timing else None),
+            processing_seconds=processing_time,
+        )
+
+        logger.info(f"[{self.job_id}] Processing completed in {processing_time:.2f}s")
+        return result_path
+
+    async def check_cancelled(self, pages_done: int) -> None:
+        """キャンセルされていれば途中結果を削除して処理を中止する.
+
+        Args:
+            pages_done: 処理済みのページ数
+
+        Raises:
+            JobCancelledError: ジョブがキャンセルされている場合
+        """
+        if self.cancel_token is None or not await self.cancel_token.is_cancelled():
+            return
+        await self.storage_client.delete_file(result_path_for(self.job_id))
+        raise JobCancelledError(self.job_id, pages_done, self.page_count)
+
+    async def _update_status(
+        self,
+        status: str,
+        progress: int,
+        message: str,
+        result_url: str = "",
+        error_msg: str = "",
+        latency: dict[str, float | None] | None = None,
+        pages: int = 0,
+        processing_seconds: float | None = None,
+    ) -> None:
+        """Redisにステータスを書き込む（TTL: 24時間）.
+
+        Args:
+            status: ステータス（processing, completed, failed, cancelled）
+            progress: 進捗率（0〜100）
+            message: ステータスメッセージ
+            result_url: 結果ファイルのURL（完了時のみ）
+            error_msg: エラーメッセージ（失敗時のみ）
+            latency: レイテンシ内訳（完了時のみ）
+            pages: 前回の書き込み以降に処理したページ数（カウンタに加算）
+            processing_seconds: 処理時間（完了時のみ、カウンタに加算）
+        """
+        status_data = build_status_data(status, progress, message, result_url, error_msg, latency)
+        with get_tracer().span("redis.set_status", job_id=self.job_id, status=status):
+            await save_status_async(
+                self.redis_client, self.job_id, status_data, pages, processing_seconds
+            )
+        logger.debug(f"[{self.job_id}] Status updated: {status} ({progress}%)")
@@ -0,0 +1,83 @@
+"""asyncio用ストレージアダプター.
+
+`StorageClient` のブロッキングI/Oを専用スレッドプールで実行し、イベントループを塞がずに
+アップロード・ダウンロードを待機できるようにする。
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from config import Settings
+from storage import StorageClient, get_storage_client
+
+
+class AsyncStorageClient:
+    """`StorageClient` を非同期インターフェースで扱うアダプター."""
+
+    def __init__(self, inner: StorageClient, max_workers: int = 32) -> None:
+        """初期化.
+
+        Args:
+            inner: 実際のI/Oを行うストレージクライアント
+            max_workers: 同時実行するI/Oスレッド数の上限
+        """
+        self.inner = inner
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage-io")
+        logger.info(f"AsyncStorageClient initialized (max_workers={max_workers})")
+
+    async def upload_file(self, file_bytes: bytes, destination_path: str) -> str:
+        """ファイルをアップロードし、パスを返す.
+
+        Args:
+            file_bytes: アップロードするファイルのバイトデータ
+            destination_path: 保存先パス
+
+        Returns:
+            str: 保存されたファイルのパス
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.inner.upload_file, file_bytes, destination_path
+        )
+
+    async def download_file(self, source_path: str) -> bytes:
+        """ファイルをダウンロードし、バイトデータを返す.
+
+        Args:
+            source_path: ダウンロード元パス
+
+        Returns:
+            bytes: ファイルのバイトデータ
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.inner.download_file, source_path)
+
+    async def delete_file(self, path: str) -> bool:
+        """ファイルを削除する（存在しない場合は何もしない）.
+
+        Args:
+            path: 削除するファイルのパス
+
+        Returns:
+            bool: ファイルを削除した場合は True
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.inner.delete_file, path)
+
+    def close(self) -> None:
+        """I/Oスレッドプールを停止する."""
+        self.executor.shutdown(wait=False)
+
+
+def get_async_storage_client(settings: Settings) -> AsyncStorageClient:
+    """設定に基づいて非同期ストレージクライアントを返す.
+
+    Args:
+        settings: アプリケーション設定
+
+    Returns:
+        AsyncStorageClient: 非同期ストレージクライアント
+    """
+    return AsyncStorageClient(get_storage_client(settings), settings.async_storage_io_workers)
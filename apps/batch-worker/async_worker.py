@@ -0,0 +1,344 @@
+"""バッチワーカーメインモジュール（asyncio/ASGI版, Push型 Pub/Sub対応）.
+
+`worker.py` と同じPushエンベロープを受け付け、1つのイベントループ上で多数のジョブを並行処理する。
+Redisは `redis.asyncio` の共有コネクションプール、ストレージは非同期アダプター経由で扱い、
+ページ解析のCPU処理は ProcessPoolExecutor で実行する。
+Flask版ワーカーが再発行したシャードメッセージは、同期版の `ShardProcessor` をスレッドで実行する。
+履歴のアーカイブが有効な場合は、起動時（lifespan）に開始するタスクが定期的に履歴をフラッシュする。
+
+起動例:
+    uvicorn async_worker:app --host 0.0.0.0 --port $PORT
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager, suppress
+
+import redis
+import redis.asyncio as aioredis
+from loguru import logger
+from starlette.applications import Starlette
+from starlette.datastructures import State
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from async_processor import AsyncPDFProcessor, save_status_async
+from async_storage import AsyncStorageClient, get_async_storage_client
+from cancellation import CancellationMetrics, JobCancelledError
+from config import Settings
+from history import HistoryArchiver
+from messages import InvalidMessageError, JobMessage, parse_push_envelope
+from processor import build_status_data, configure_status_store
+from sharding import ShardAbortedError, ShardProcessor, ShardSpec
+from tracing import JobTiming, configure_tracing, get_span_exporter, get_tracer
+
+
+async def handle_pubsub_message(request: Request) -> PlainTextResponse:
+    """Pub/SubからのPushメッセージを処理する.
+
+    エンベロープ形式・レスポンスは `worker.handle_pubsub_message` と同一。
+    バッチメッセージの場合は、含まれる全ジョブを同じイベントループ上で並行処理する。
+
+    Args:
+        request: HTTPリクエスト
+
+    Returns:
+        PlainTextResponse: レスポンスメッセージとステータスコード
+    """
+    try:
+        # リクエストボディからPub/Subメッセージを取得
+        received_at = time.time()
+        try:
+            body = await request.body()
+            job_messages = parse_push_envelope(json.loads(body) if body else None)
+        except InvalidMessageError as e:
+            return PlainTextResponse(f"Bad Request: {e}", status_code=400)
+        decoded_at = time.time()
+
+        # 処理実行（ジョブ単位の失敗は _process_job 内で failed として記録される）
+        await asyncio.gather(
+            *(
+                _process_job(
+                    request.app.state,
+                    job_message,
+                    _delivery_timing(job_message, received_at, decoded_at),
+                )
+                for job_message in job_messages
+            )
+        )
+
+        # 成功レスポンス（Pub/Subに ACK を返す）
+        return PlainTextResponse("OK", status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error processing message: {e}", exc_info=True)
+
+        # エラーレスポンス（Pub/Subに ACK を返す。リトライしない）
+        return PlainTextResponse("OK", status_code=200)
+
+
+def _delivery_timing(job_message: JobMessage, received_at: float, decoded_at: float) -> JobTiming:
+    """レイテンシ内訳の計測点を組み立て、キュー待ちとメッセージ解析のスパンを記録する.
+
+    Args:
+        job_message: ジョブメッセージ
+        received_at: リクエストの受信時刻（UNIX時刻）
+        decoded_at: メッセージの解析が完了した時刻（UNIX時刻）
+
+    Returns:
+        JobTiming: レイテンシ内訳の計測点
+    """
+    timing = JobTiming.from_message(job_message.attributes, job_message.publish_time, received_at)
+    tracer = get_tracer()
+    if timing.published_at is not None:
+        tracer.record_span(
+            "pubsub.queue_wait",
+            timing.published_at,
+            received_at,
+            parent=timing.parent,
+            job_id=job_message.job_id,
+        )
+    tracer.record_span(
+        "decode", received_at, decoded_at, parent=timing.parent, job_id=job_message.job_id
+    )
+    return timing
+
+
+async def _process_job(state: State, job_message: JobMessage, timing: JobTiming) -> None:
+    """1ジョブを処理し、失敗した場合はエラーステータスをRedisに記録する.
+
+    Args:
+        state: アプリケーションの状態（共有クライアント）
+        job_message: ジョブメッセージ
+        timing: レイテンシ内訳の計測点
+    """
+    job_id = job_message.job_id
+    settings: Settings = state.settings
+    started = time.monotonic()
+
+    try:
+        if job_message.shard is not None:
+            await _process_shard(state, job_message, timing)
+            return
+
+        logger.info(f"Processing job {job_id}, PDF: {job_message.pdf_path}")
+        processor = AsyncPDFProcessor(
+            job_id,
+            job_message.pdf_path,
+            state.storage_client,
+            state.redis_client,
+            cpu_executor=state.cpu_executor,
+            page_delay_range=(settings.mock_page_delay_min, settings.mock_page_delay_max),
+            page_count_range=(settings.mock_page_count_min, settings.mock_page_count_max),
+            cancel_check_interval=settings.cancel_check_interval_seconds,
+            timing=timing,
+        )
+        with get_tracer().span("process_job", parent=timing.parent, job_id=job_id):
+            result_path = await processor.process()
+
+        logger.info(f"Job {job_id} completed. Result: {result_path}")
+
+    except JobCancelledError as e:
+        # キャンセル済み（ステータスは cancelled として記録済み）
+        if e.pages_done:
+            page_seconds = (time.monotonic() - started) / e.pages_done
+        else:
+            page_seconds = (settings.mock_page_delay_min + settings.mock_page_delay_max) / 2
+        state.cancellation_metrics.record(e, page_seconds)
+
+    except Exception as e:
+        logger.error(f"Error processing job {job_id}: {e}", exc_info=True)
+
+        # エラーステータスをRedisに記録（TTL: 24時間）
+        try:
+            error_status = build_status_data(
+                status="failed", progress=0, message="Error occurred", error_msg=str(e)
+            )
+            # 他のシャードの失敗による中断は、失敗したシャードが件数を数える
+            count = not isinstance(e, ShardAbortedError)
+            await save_status_async(state.redis_client, job_id, error_status, count=count)
+            logger.info(f"Error status saved to Redis for job {job_id}")
+        except Exception as redis_error:
+            logger.error(f"Failed to update error status in Redis: {redis_error}")
+
+
+async def _process_shard(state: State, job_message: JobMessage, timing: JobTiming) -> None:
+    """シャードメッセージを処理する（最後に完了したシャードが結果をマージする）.
+
+    `ShardProcessor` は同期版のため、同期Redisクライアントと非同期アダプターの内部の
+    ストレージクライアントを使い、イベントループを塞がないようスレッドで実行する。
+
+    Args:
+        state: アプリケーションの状態（共有クライアント）
+        job_message: シャードメッセージ
+        timing: レイテンシ内訳の計測点
+
+    Raises:
+        ShardAbortedError: 同じジョブの他のシャードが失敗していた場合
+        JobCancelledError: ジョブがキャンセルされ、ページの区切りで中止した場合
+        Exception: 処理中にエラーが発生した場合
+    """
+    job_id = job_message.job_id
+    settings: Settings = state.settings
+    shard = ShardSpec(**(job_message.shard or {}))
+    logger.info(f"Processing job {job_id}, shard {shard.index + 1}/{shard.count}")
+
+    shard_processor = ShardProcessor(
+        job_id,
+        job_message.pdf_path,
+        shard,
+        state.storage_client.inner,
+        state.sync_redis_client,
+        page_delay_range=(settings.mock_page_delay_min, settings.mock_page_delay_max),
+        cancel_check_interval=settings.cancel_check_interval_seconds,
+        timing=timing,
+    )
+    with get_tracer().span("process_shard", parent=timing.parent, job_id=job_id, shard=shard.index):
+        await asyncio.to_thread(shard_processor.process)
+
+
+async def metrics(request: Request) -> JSONResponse:
+    """ワーカーのメトリクス（キャンセルで解放した処理量）を返す.
+
+    Returns:
+        JSONResponse: メトリクスのJSON
+    """
+    return JSONResponse({"cancellation": request.app.state.cancellation_metrics.stats().to_dict()})
+
+
+async def health_check(request: Request) -> PlainTextResponse:
+    """ヘルスチェックエンドポイント.
+
+    Returns:
+        PlainTextResponse: レスポンスメッセージとステータスコード
+    """
+    return PlainTextResponse("OK", status_code=200)
+
+
+async def run_history_flusher(archiver: HistoryArchiver, interval_seconds: float) -> None:
+    """`interval_seconds` ごとに、条件を満たしていれば履歴を履歴ストアに書き込む.
+
+    フラッシュは同期のRedis・ストレージクライアントで行うため、イベントループを止めないよう
+    スレッドで実行する。失敗はログに記録して次の周期に再実行する。
+
+    Args:
+        archiver: 履歴のアーカイバー
+        interval_seconds: 確認間隔（秒）
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(archiver.maybe_flush)
+        except Exception as e:
+            logger.error(f"Failed to flush job history: {e}")
+
+
+def create_app(
+    settings: Settings,
+    redis_client: aioredis.Redis | None = None,
+    storage_client: AsyncStorageClient | None = None,
+    cpu_executor: Executor | None = None,
+    sync_redis_client: redis.Redis | None = None,
+) -> Starlette:
+    """ASGIアプリケーションを生成する.
+
+    クライアントを指定しない場合は、起動時（lifespan）に設定から生成する。
+
+    Args:
+        settings: アプリケーション設定
+        redis_client: 非同期Redisクライアント
+        storage_client: 非同期ストレージクライアント
+        cpu_executor: ページ解析のCPU処理を実行するexecutor
+        sync_redis_client: シャードメッセージの処理に使う同期Redisクライアント
+
+    Returns:
+        Starlette: ASGIアプリケーション
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        app.state.settings = settings
+        app.state.cancellation_metrics = CancellationMetrics()
+
+        # Redisクライアント初期化（全ジョブで1つのコネクションプールを共有）
+        app.state.redis_client = redis_client or aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                decode_responses=True,
+                max_connections=settings.redis_max_connections,
+            )
+        )
+        # シャード処理（同期版の ShardProcessor）用。接続は最初のシャードの処理時に確立される
+        app.state.sync_redis_client = sync_redis_client or redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            decode_responses=True,
+        )
+        app.state.storage_client = storage_client or get_async_storage_client(settings)
+        app.state.cpu_executor = cpu_executor or ProcessPoolExecutor(
+            max_workers=settings.async_cpu_workers
+        )
+        logger.info("Async worker clients initialized")
+
+        # 履歴のアーカイブ待ちキューをバックグラウンドで定期的にフラッシュする
+        history_task: asyncio.Task[None] | None = None
+        if settings.history_enabled:
+            archiver = HistoryArchiver(
+                app.state.sync_redis_client,
+                app.state.storage_client.inner,
+                batch_size=settings.history_batch_size,
+                max_age_seconds=settings.history_max_age_seconds,
+                check_interval_seconds=settings.history_check_interval_seconds,
+                retention_days=settings.history_retention_days,
+            )
+            history_task = asyncio.create_task(
+                run_history_flusher(archiver, settings.history_check_interval_seconds)
+            )
+
+        try:
+            yield
+        finally:
+            if history_task is not None:
+                history_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await history_task
+            if redis_client is None:
+                await app.state.redis_client.aclose()
+            if sync_redis_client is None:
+                app.state.sync_redis_client.close()
+            if storage_client is None:
+                app.state.storage_client.close()
+            if cpu_executor is None:
+                app.state.cpu_executor.shutdown(wait=False)
+
+    return Starlette(
+        routes=[
+            Route("/", handle_pubsub_message, methods=["POST"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/health", health_check, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+# 設定読み込み
+settings = Settings()
+logger.info("Async worker starting with settings:")
+logger.info(f"  STORAGE_TYPE: {settings.storage_type}")
+logger.info(f"  REDIS_HOST: {settings.redis_host}:{settings.redis_port}")
+logger.info(f"  GCP_PROJECT_ID: {settings.gcp_project_id}")
+
+# トレーシング初期化（TRACE_EXPORTER=none の場合はスパンを記録しない）
+configure_tracing(get_span_exporter(settings))
+
+# 終了ステータスを履歴のアーカイブ待ちキューに積む（フラッシュは lifespan で開始するタスクが行う）
+configure_status_store(settings.history_enabled, settings.terminal_status_ttl_seconds)
+
+app = create_app(settings)
@@ -0,0 +1,4 @@
+"""バッチワーカーのベンチマークスイート.
+
+`apps/batch-worker` をカレントディレクトリとして `python -m benchmarks.<name>` で実行する。
+"""
@@ -0,0 +1,192 @@
+"""スレッド版 / asyncio版ワーカーの同時実行性能比較ベンチマーク.
+
+I/O待ちが支配的なジョブ（ページ解析の待ち時間）を同時に N 件投入し、1インスタンスが
+維持できる同時実行数とスループットを比較する。
+
+- threaded: `worker.app`（gunicorn `--threads 8` 相当のスレッド数で配信）
+- asyncio: `async_worker.create_app()`（1イベントループで全件を配信）
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_async --levels 8,64,256 --output bench_async.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import (
+    PublishedMessage,
+    bind_worker_clients,
+    build_push_envelope,
+    configure_logging,
+    create_redis_client,
+    latency_summary,
+    prepare_worker_env,
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--levels", default="8,64,256", help="同時投入ジョブ数（カンマ区切りで複数指定）"
+    )
+    parser.add_argument("--threads", type=int, default=8, help="スレッド版のスレッド数")
+    parser.add_argument(
+        "--page-delay", type=float, default=0.05, help="1ページあたりのI/O待ち時間（秒）"
+    )
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+def make_envelopes(count: int) -> list[bytes]:
+    """Pushリクエストのボディを生成する."""
+    bodies = []
+    for index in range(count):
+        job_id = str(uuid.uuid4())
+        data = json.dumps({"job_id": job_id, "pdf_path": f"uploads/{job_id}/bench.pdf"})
+        message = PublishedMessage(
+            message_id=str(index + 1),
+            data=data.encode("utf-8"),
+            attributes={},
+            publish_time=datetime.now(UTC),
+        )
+        bodies.append(json.dumps(build_push_envelope(message)).encode("utf-8"))
+    return bodies
+
+
+def summarize(latencies: list[float], busy: float, elapsed: float) -> dict[str, Any]:
+    """1レベル分の結果を集計する.
+
+    `effective_concurrency` は処理中の時間の総和 / 経過時間（Little の法則による平均同時実行数）。
+    """
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "effective_concurrency": round(busy / elapsed, 1) if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+    }
+
+
+def run_threaded(level: int, threads: int) -> dict[str, Any]:
+    """スレッド版ワーカーに `level` 件を同時投入する."""
+    import worker
+
+    bodies = make_envelopes(level)
+    latencies: list[float] = []
+    busy: list[float] = []
+
+    def post(body: bytes, submitted: float) -> None:
+        client = worker.app.test_client()
+        started = time.perf_counter()
+        client.post("/", data=body, content_type="application/json")
+        finished = time.perf_counter()
+        busy.append(finished - started)
+        latencies.append(finished - submitted)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for body in bodies:
+            pool.submit(post, body, start)
+    return summarize(latencies, sum(busy), time.perf_counter() - start)
+
+
+async def run_async(level: int, app: Any) -> dict[str, Any]:
+    """asyncio版ワーカーに `level` 件を同時投入する."""
+    import httpx
+
+    bodies = make_envelopes(level)
+    latencies: list[float] = []
+    busy: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://worker") as client:
+
+        async def post(body: bytes, submitted: float) -> None:
+            started = time.perf_counter()
+            await client.post("/", content=body, headers={"Content-Type": "application/json"})
+            finished = time.perf_counter()
+            busy.append(finished - started)
+            latencies.append(finished - submitted)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(body, start) for body in bodies))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, sum(busy), elapsed)
+
+
+async def run_async_levels(args: argparse.Namespace, levels: list[int]) -> dict[str, Any]:
+    """asyncio版ワーカーを起動し、全レベルを計測する."""
+    import redis.asyncio as aioredis
+
+    import async_worker
+    from async_storage import AsyncStorageClient
+    from storage import LocalStorageClient
+
+    if args.redis_url:
+        redis_client = aioredis.Redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+
+        redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    settings = async_worker.Settings()
+    storage_client = AsyncStorageClient(LocalStorageClient(settings.local_storage_path))
+    with ProcessPoolExecutor(max_workers=settings.async_cpu_workers) as cpu_executor:
+        app = async_worker.create_app(
+            settings,
+            redis_client=redis_client,
+            storage_client=storage_client,
+            cpu_executor=cpu_executor,
+        )
+        results = {}
+        async with app.router.lifespan_context(app):
+            for level in levels:
+                results[str(level)] = await run_async(level, app)
+    storage_client.close()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging()
+    levels = [int(level) for level in args.levels.split(",")]
+    prepare_worker_env(tempfile.mkdtemp(prefix="bench-storage-"), args.page_delay)
+
+    import worker
+
+    bind_worker_clients(worker, create_redis_client(args.redis_url), worker.storage_client)
+
+    threaded = {str(level): run_threaded(level, args.threads) for level in levels}
+    asyncio_results = asyncio.run(run_async_levels(args, levels))
+
+    result = {
+        "benchmark": "async_vs_threaded",
+        "recorded_at": datetime.now(UTC).isoformat(),
+        "config": {
+            "levels": levels,
+            "threads": args.threads,
+            "page_delay_seconds": args.page_delay,
+            "redis": "redis" if args.redis_url else "fakeredis",
+        },
+        "threaded": threaded,
+        "asyncio": asyncio_results,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
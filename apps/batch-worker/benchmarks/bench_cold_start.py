@@ -0,0 +1,323 @@
+"""ワーカーのコールドスタートベンチマーク.
+
+gunicorn でワーカーを新しいプロセスとして起動し、起動から最初のジョブの処理開始
+（Redisのジョブステータスが processing になるまで）の時間を計測する。Cloud Run と同様に、
+プローブが成功してから最初のジョブ（Push リクエスト）を送信する。
+
+- before: import 時にクライアントを生成し、`--preload` なし、/health をプローブ（従来の構成）
+- lazy: クライアントを遅延初期化し、`--preload` あり、ウォームアップなし
+- warm: lazy に加えて post_fork フックでウォームアップを開始し、/health をプローブ
+- warm_probe: warm に加えて /warmup をプローブ（ウォームアップの完了後にジョブを送信）
+
+各シナリオについて以下を出力する（`--runs` 回の要約統計）。
+
+- ready: 起動からプローブが成功するまで
+- first_job_started: 起動から最初のジョブの処理開始まで
+- request_to_started: ジョブの送信から処理開始まで（最初のジョブが待つ初期化の時間を含む）
+
+`--storage gcs` の場合、warm の first_job_started（p50）が before の `--max-start-ratio` 倍を
+超えると終了コード1で終了する（ローカルストレージでは遅延初期化で先送りする処理がほとんど無いため
+判定しない）。
+
+`--storage gcs` の場合は STORAGE_TYPE=GCP とし、認証情報なしでクライアントを生成できるよう
+到達しないエミュレータ（STORAGE_EMULATOR_HOST）を指定する。ジョブは結果の書き込みで失敗するが、
+計測は処理開始までのため影響しない。`--redis-url` を指定しない場合は fakeredis の TCP サーバーを
+ベンチマークのプロセス内で起動する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_cold_start --runs 10 --output bench_cold_start.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+import redis
+
+from benchmarks.harness import PublishedMessage, build_push_envelope, latency_summary
+
+# ワーカーのソースディレクトリ（gunicorn のカレントディレクトリ）
+WORKER_DIR = Path(__file__).resolve().parents[1]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """起動構成."""
+
+    name: str
+    lazy_client_init: bool
+    warmup_on_start: bool
+    preload: bool
+    probe_path: str
+
+
+SCENARIOS = (
+    Scenario("before", False, False, False, "/health"),
+    Scenario("lazy", True, False, True, "/health"),
+    Scenario("warm", True, True, True, "/health"),
+    Scenario("warm_probe", True, True, True, "/warmup"),
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="シナリオごとの起動回数")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(scenario.name for scenario in SCENARIOS),
+        help="計測するシナリオ（カンマ区切り）",
+    )
+    parser.add_argument(
+        "--storage", choices=("local", "gcs"), default="gcs", help="ストレージの種類"
+    )
+    parser.add_argument(
+        "--page-delay", type=float, default=0.2, help="1ページあたりのモック解析時間（秒）"
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="1回の起動の最大待機時間（秒）")
+    parser.add_argument(
+        "--max-start-ratio",
+        type=float,
+        default=1.0,
+        help="warm で許容する before 比の first_job_started（p50）",
+    )
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+def free_port() -> int:
+    """空いているTCPポートを返す."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_redis(redis_url: str | None) -> tuple[str, int]:
+    """計測に使うRedisのホストとポートを返す（未指定の場合は fakeredis の TCP サーバーを起動）.
+
+    Args:
+        redis_url: ローカルRedisのURL
+
+    Returns:
+        tuple[str, int]: ホストとポート
+    """
+    if redis_url:
+        parsed = urlparse(redis_url)
+        return parsed.hostname or "localhost", parsed.port or 6379
+
+    from fakeredis import TcpFakeServer
+
+    address = ("127.0.0.1", free_port())
+    server = TcpFakeServer(address, server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return address
+
+
+def worker_env(
+    scenario: Scenario, args: argparse.Namespace, redis_address: tuple[str, int], storage_dir: str
+) -> dict[str, str]:
+    """gunicorn に渡す環境変数を組み立てる."""
+    env = {
+        **os.environ,
+        "REDIS_HOST": redis_address[0],
+        "REDIS_PORT": str(redis_address[1]),
+        "LAZY_CLIENT_INIT": str(scenario.lazy_client_init).lower(),
+        "WARMUP_ON_START": str(scenario.warmup_on_start).lower(),
+        "MOCK_PAGE_DELAY_MIN": str(args.page_delay),
+        "MOCK_PAGE_DELAY_MAX": str(args.page_delay),
+        "MOCK_PAGE_COUNT_MIN": "3",
+        "MOCK_PAGE_COUNT_MAX": "3",
+        "TRACE_EXPORTER": "none",
+        "PROFILE_ENABLED": "false",
+    }
+    if args.storage == "gcs":
+        env.update(
+            {
+                "STORAGE_TYPE": "GCP",
+                "GCS_BUCKET_NAME": "bench-cold-start",
+                "STORAGE_EMULATOR_HOST": "http://127.0.0.1:9",
+                "GOOGLE_CLOUD_PROJECT": "bench-cold-start",
+            }
+        )
+    else:
+        env.update({"STORAGE_TYPE": "LOCAL", "LOCAL_STORAGE_PATH": storage_dir})
+    return env
+
+
+def http_request(
+    port: int, method: str, path: str, body: bytes | None = None, timeout: float = 5.0
+) -> int:
+    """ワーカーにHTTPリクエストを送信し、ステータスコードを返す（接続できない場合は0）."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except OSError:
+        return 0
+    finally:
+        connection.close()
+
+
+def measure_start(
+    scenario: Scenario,
+    args: argparse.Namespace,
+    redis_client: redis.Redis,
+    env: dict[str, str],
+) -> dict[str, float]:
+    """ワーカーを1回起動し、最初のジョブの処理開始までの時間を計測する.
+
+    Returns:
+        dict[str, float]: 起動からの経過時間（秒）
+
+    Raises:
+        TimeoutError: タイムアウトまでにプローブが成功しない・ジョブが開始しない場合
+    """
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        "1",
+        "--threads",
+        "8",
+        "--log-level",
+        "warning",
+        *(["--preload"] if scenario.preload else []),
+        "worker:app",
+    ]
+    job_id = str(uuid.uuid4())
+    message = PublishedMessage(
+        message_id="1",
+        data=json.dumps({"job_id": job_id, "pdf_path": f"uploads/{job_id}/input.pdf"}).encode(),
+        attributes={},
+        publish_time=datetime.now(UTC),
+    )
+    body = json.dumps(build_push_envelope(message)).encode()
+
+    started = time.perf_counter()
+    deadline = started + args.timeout
+    # ワーカープロセスもまとめて終了できるよう、新しいプロセスグループで起動する
+    process = subprocess.Popen(
+        command,
+        cwd=WORKER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        while http_request(port, "GET", scenario.probe_path, timeout=args.timeout) != 200:
+            if time.perf_counter() > deadline or process.poll() is not None:
+                raise TimeoutError(f"{scenario.name}: probe {scenario.probe_path} did not succeed")
+            time.sleep(0.005)
+        ready = time.perf_counter()
+
+        # Push リクエストはジョブの完了まで返らないため、別スレッドで送信する
+        sender = threading.Thread(
+            target=http_request, args=(port, "POST", "/", body, args.timeout), daemon=True
+        )
+        sender.start()
+        requested = time.perf_counter()
+        while True:
+            job_data_str = redis_client.get(f"job:{job_id}")
+            if job_data_str and json.loads(job_data_str)["status"] != "pending":
+                break
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{scenario.name}: job {job_id} did not start")
+            time.sleep(0.001)
+        job_started = time.perf_counter()
+    finally:
+        # 処理中のジョブの完了は待たない
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+    return {
+        "ready": ready - started,
+        "first_job_started": job_started - started,
+        "request_to_started": job_started - requested,
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    names = [name.strip() for name in args.scenarios.split(",")]
+    scenarios = [scenario for scenario in SCENARIOS if scenario.name in names]
+    redis_address = start_redis(args.redis_url)
+    redis_client = redis.Redis(*redis_address, decode_responses=True)
+
+    samples: dict[str, dict[str, list[float]]] = {
+        scenario.name: {"ready": [], "first_job_started": [], "request_to_started": []}
+        for scenario in scenarios
+    }
+    with tempfile.TemporaryDirectory() as storage_dir:
+        # シナリオを交互に起動し、ディスクキャッシュなどの影響を均等にする
+        for _ in range(args.runs):
+            for scenario in scenarios:
+                env = worker_env(scenario, args, redis_address, storage_dir)
+                for metric, value in measure_start(scenario, args, redis_client, env).items():
+                    samples[scenario.name][metric].append(value)
+
+    modes = {
+        name: {metric: latency_summary(values) for metric, values in metrics.items()}
+        for name, metrics in samples.items()
+    }
+
+    failures = []
+    if args.storage == "gcs" and "before" in modes and "warm" in modes:
+        before = modes["before"]["first_job_started"]["p50_ms"]
+        after = modes["warm"]["first_job_started"]["p50_ms"]
+        if after > before * args.max_start_ratio:
+            failures.append(
+                f"warm first_job_started p50 {after:.1f} ms exceeds "
+                f"{args.max_start_ratio:.2f}x before ({before:.1f} ms)"
+            )
+
+    return {
+        "config": {
+            "runs": args.runs,
+            "storage": args.storage,
+            "page_delay": args.page_delay,
+            "redis": "redis" if args.redis_url else "fakeredis-tcp",
+        },
+        "modes": modes,
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
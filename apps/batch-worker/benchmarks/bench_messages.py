@@ -0,0 +1,197 @@
+"""ジョブメッセージのスキーマ（v1: JSON / v2: msgpack）の比較ベンチマーク.
+
+代表的なメッセージ（単一ジョブ・シャード・バッチ）について、スキーマごとに以下を計測する。
+
+- body_bytes: メッセージ本文のサイズ
+- envelope_bytes: Push エンベロープ（本文の base64 と属性を含むJSON）のサイズ
+- encode_us: `pdf_batch_shared.message_schema.encode_job_message` の処理時間（発行側）
+- decode_us: エンベロープのJSONの解析から `messages.parse_push_envelope` までの処理時間（受信側）
+
+あわせて、未知のスキーマのバージョンのメッセージを拒否するまでの時間（unknown_version_us、
+本文をデコードしない）と、v1 で本文が壊れたメッセージを拒否するまでの時間（malformed_v1_us）を
+比較する。
+v2 の本文がいずれかのメッセージで v1 より大きい場合は終了コード1で終了する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_messages --iterations 20000 --output bench_messages.json
+"""
+
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import configure_logging
+from messages import InvalidMessageError, parse_push_envelope
+from pdf_batch_shared.message_schema import (
+    SCHEMA_VERSION_ATTRIBUTE,
+    SCHEMA_VERSIONS,
+    encode_job_message,
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000, help="計測ごとの繰り返し回数")
+    parser.add_argument("--repeats", type=int, default=5, help="計測の繰り返し（中央値を採用）")
+    parser.add_argument("--batch-jobs", type=int, default=10, help="バッチメッセージのジョブ数")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+def sample_messages(batch_jobs: int) -> dict[str, tuple[dict[str, Any], dict[str, str]]]:
+    """計測に使うメッセージと、発行時に付与するトレース属性を返す."""
+    trace = {
+        "traceparent": f"00-{uuid.uuid4().hex}-{uuid.uuid4().hex[:16]}-01",
+        "submitted_at": datetime.now(UTC).isoformat(),
+        "upload_ms": "12.3",
+    }
+
+    def job() -> dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        return {
+            "job_id": job_id,
+            "pdf_path": f"uploads/{job_id}/quarterly-report.pdf",
+            "bucket_name": "pdf-processing-bucket",
+            "timestamp": datetime.now(UTC).isoformat(),
+            "content_sha256": uuid.uuid4().hex * 2,
+        }
+
+    single = job()
+    shard = {
+        "job_id": single["job_id"],
+        "pdf_path": single["pdf_path"],
+        "shard": {"index": 3, "count": 8, "start_page": 76, "end_page": 100, "page_count": 200},
+    }
+    batch = {
+        "jobs": [{**job(), "trace": trace} for _ in range(batch_jobs)],
+        "timestamp": datetime.now(UTC).isoformat(),
+    }
+    return {"single": (single, trace), "shard": (shard, trace), "batch": (batch, {})}
+
+
+def build_envelope(body: bytes, attributes: dict[str, str]) -> str:
+    """Push エンベロープのJSON文字列を組み立てる."""
+    return json.dumps(
+        {
+            "message": {
+                "data": base64.b64encode(body).decode("ascii"),
+                "attributes": attributes,
+                "messageId": "1",
+                "publishTime": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+            },
+            "subscription": "projects/local-dev/subscriptions/pdf-processing-subscription",
+        }
+    )
+
+
+def time_per_call(func: Callable[[], object], iterations: int, repeats: int) -> float:
+    """1回あたりの処理時間（マイクロ秒、繰り返しの中央値）を返す."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        samples.append((time.perf_counter() - started) / iterations)
+    return round(statistics.median(samples) * 1e6, 3)
+
+
+def expect_rejected(envelope_text: str) -> None:
+    """エンベロープが InvalidMessageError で拒否されることを確認する."""
+    try:
+        parse_push_envelope(json.loads(envelope_text))
+    except InvalidMessageError:
+        return
+    raise AssertionError("message was not rejected")
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    results: dict[str, dict[str, Any]] = {}
+    failures = []
+    for name, (message, trace) in sample_messages(args.batch_jobs).items():
+        results[name] = {}
+        for schema_version in SCHEMA_VERSIONS:
+            body, routing_attributes = encode_job_message(message, schema_version)
+            attributes = {**trace, **routing_attributes}
+            envelope_text = build_envelope(body, attributes)
+            decoded = parse_push_envelope(json.loads(envelope_text))
+            source_jobs = message.get("jobs", [message])
+            if [job.job_id for job in decoded] != [job["job_id"] for job in source_jobs]:
+                failures.append(f"{name} v{schema_version} did not round-trip")
+
+            results[name][f"v{schema_version}"] = {
+                "body_bytes": len(body),
+                "envelope_bytes": len(envelope_text.encode("utf-8")),
+                "attributes": sorted(attributes),
+                "encode_us": time_per_call(
+                    lambda message=message, schema_version=schema_version: encode_job_message(
+                        message, schema_version
+                    ),
+                    args.iterations,
+                    args.repeats,
+                ),
+                "decode_us": time_per_call(
+                    lambda envelope_text=envelope_text: parse_push_envelope(
+                        json.loads(envelope_text)
+                    ),
+                    args.iterations,
+                    args.repeats,
+                ),
+            }
+        v1, v2 = results[name]["v1"], results[name]["v2"]
+        v2["body_ratio"] = round(v2["body_bytes"] / v1["body_bytes"], 3)
+        if v2["body_bytes"] >= v1["body_bytes"]:
+            failures.append(f"{name} v2 body ({v2['body_bytes']} B) is not smaller than v1")
+
+    # 拒否までの時間: 未知のバージョン（本文をデコードしない）と、壊れた v1 の本文
+    batch_message = sample_messages(args.batch_jobs)["batch"][0]
+    v1_body, _ = encode_job_message(batch_message, "1")
+    unknown_version = build_envelope(v1_body, {SCHEMA_VERSION_ATTRIBUTE: "99"})
+    malformed_v1 = build_envelope(v1_body[:-1], {})
+    rejection = {
+        "unknown_version_us": time_per_call(
+            lambda: expect_rejected(unknown_version), args.iterations, args.repeats
+        ),
+        "malformed_v1_us": time_per_call(
+            lambda: expect_rejected(malformed_v1), args.iterations, args.repeats
+        ),
+    }
+
+    return {
+        "config": {
+            "iterations": args.iterations,
+            "repeats": args.repeats,
+            "batch_jobs": args.batch_jobs,
+        },
+        "messages": results,
+        "rejection": rejection,
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging("CRITICAL")
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""エンドツーエンド パイプラインベンチマーク.
+
+ジョブ登録（アップロード + PubSubClient での発行）から、Push配信、`worker.app` の
+ハンドラによる処理完了までを計測する。Redis はローカルRedisまたは fakeredis、
+Pub/Sub はインプロセスの代替を使用する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_pipeline --jobs 200 --concurrency 8 --output bench.json
+    python -m benchmarks.bench_pipeline --baseline bench.json  # 前回結果との比較
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import (
+    CountingRedis,
+    CountingStorageClient,
+    InProcessPublisher,
+    bind_worker_clients,
+    build_push_envelope,
+    compare_with_baseline,
+    configure_logging,
+    create_pubsub_client,
+    create_redis_client,
+    higher_is_better,
+    job_ids_of,
+    latency_summary,
+    load_streamlit_module,
+    lower_is_better,
+    prepare_worker_env,
+)
+from processor import job_key
+
+# 429（同時実行数制限）で拒否されたメッセージを再配信するまでの待ち時間
+REDELIVERY_BACKOFF_SECONDS = 0.01
+
+# ベースライン比較の対象メトリクス
+REGRESSION_METRICS = {
+    "throughput.jobs_per_sec": higher_is_better,
+    "latency.end_to_end.p95_ms": lower_is_better,
+    "latency.end_to_end.p99_ms": lower_is_better,
+    "per_job.redis_ops": lower_is_better,
+    "per_job.redis_round_trips": lower_is_better,
+    "per_job.bytes_moved": lower_is_better,
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100, help="投入するジョブ数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時Push配信数")
+    parser.add_argument(
+        "--page-delay", type=float, default=0.005, help="1ページあたりのモック解析時間（秒）"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="1メッセージにまとめる最大ジョブ数（2以上で有効）"
+    )
+    parser.add_argument("--linger", type=float, default=0.05, help="バッチのリンガー時間（秒）")
+    parser.add_argument("--pdf-size", type=int, default=256 * 1024, help="ダミーPDFのサイズ")
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    parser.add_argument("--baseline", type=Path, default=None, help="比較するベースラインJSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="許容する劣化率")
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    storage_dir = tempfile.mkdtemp(prefix="bench-storage-")
+    prepare_worker_env(storage_dir, args.page_delay)
+
+    import worker
+
+    # ワーカーのクライアントを計測用ラッパーに差し替える
+    redis_client = CountingRedis(create_redis_client(args.redis_url))
+    storage_client = CountingStorageClient(worker.storage_client)
+    bind_worker_clients(worker, redis_client, storage_client)
+
+    publisher = InProcessPublisher()
+    pubsub_client = create_pubsub_client(publisher)
+    batching_publisher = None
+    if args.batch_size > 1:
+        pubsub_client_module = load_streamlit_module("pubsub_client")
+        batching_publisher = pubsub_client_module.BatchingPublisher(
+            pubsub_client, linger_seconds=args.linger, max_jobs=args.batch_size
+        )
+    pdf_bytes = b"%PDF-1.7\n" + b"0" * max(0, args.pdf_size - 9)
+
+    submitted_at: dict[str, float] = {}
+    finished_at: dict[str, float] = {}
+    handler_latencies: list[float] = []
+    envelope_bytes = 0
+    rejected = 0
+    results_lock = threading.Lock()
+    all_finished = threading.Event()
+
+    def deliver() -> None:
+        nonlocal envelope_bytes, rejected
+        client = worker.app.test_client()
+        while True:
+            message = publisher.messages.get()
+            if message is None:
+                return
+            envelope = build_push_envelope(message)
+            body = json.dumps(envelope).encode("utf-8")
+            started = time.perf_counter()
+            response = client.post("/", data=body, content_type="application/json")
+            finished = time.perf_counter()
+            if response.status_code == 429:
+                # Pub/Sub と同様にバックオフ後に再配信する
+                with results_lock:
+                    rejected += 1
+                time.sleep(REDELIVERY_BACKOFF_SECONDS)
+                publisher.messages.put(message)
+                continue
+            if response.status_code != 200:
+                print(f"unexpected status {response.status_code}", file=sys.stderr)
+            with results_lock:
+                for job_id in job_ids_of(message):
+                    finished_at[job_id] = finished
+                handler_latencies.append(finished - started)
+                envelope_bytes += len(body)
+                if len(finished_at) == args.jobs:
+                    all_finished.set()
+
+    consumers = [threading.Thread(target=deliver, daemon=True) for _ in range(args.concurrency)]
+    bench_start = time.perf_counter()
+    for consumer in consumers:
+        consumer.start()
+
+    # ジョブ登録（タブ1と同じ手順: アップロード → メッセージ発行）
+    for _ in range(args.jobs):
+        job_id = str(uuid.uuid4())
+        submitted_at[job_id] = time.perf_counter()
+        destination_path = f"uploads/{job_id}/bench.pdf"
+        storage_client.upload_file(pdf_bytes, destination_path)
+        message = {
+            "job_id": job_id,
+            "pdf_path": destination_path,
+            "bucket_name": "local",
+            "timestamp": datetime.now(UTC).isoformat(),
+        }
+        if batching_publisher:
+            batching_publisher.submit(message)
+        else:
+            pubsub_client.publish_message(message)
+
+    all_finished.wait()
+    publisher.close(args.concurrency)
+    for consumer in consumers:
+        consumer.join()
+    elapsed = time.perf_counter() - bench_start
+
+    end_to_end = [finished_at[job_id] - submitted_at[job_id] for job_id in finished_at]
+    completed = 0
+    for job_id in submitted_at:
+        raw = redis_client._client.get(job_key(job_id))
+        if raw and json.loads(raw).get("status") == "completed":
+            completed += 1
+
+    jobs = max(1, len(finished_at))
+    bytes_moved = (
+        storage_client.bytes_uploaded.value + storage_client.bytes_downloaded.value + envelope_bytes
+    )
+    return {
+        "benchmark": "pipeline",
+        "recorded_at": datetime.now(UTC).isoformat(),
+        "config": {
+            "jobs": args.jobs,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "page_delay_seconds": args.page_delay,
+            "pdf_size_bytes": args.pdf_size,
+            "redis": "redis" if args.redis_url else "fakeredis",
+        },
+        "throughput": {
+            "elapsed_seconds": round(elapsed, 3),
+            "jobs_per_sec": round(len(finished_at) / elapsed, 2) if elapsed else 0.0,
+            "completed": completed,
+            "failed": args.jobs - completed,
+            "rejected_deliveries": rejected,
+        },
+        "latency": {
+            "end_to_end": latency_summary(end_to_end),
+            "handler": latency_summary(handler_latencies),
+        },
+        "per_job": {
+            "redis_ops": round(redis_client.ops.value / jobs, 2),
+            "redis_round_trips": round(redis_client.round_trips.value / jobs, 2),
+            "bytes_moved": round(bytes_moved / jobs),
+            "bytes_uploaded": round(storage_client.bytes_uploaded.value / jobs),
+            "bytes_downloaded": round(storage_client.bytes_downloaded.value / jobs),
+            "bytes_published": round(publisher.bytes_published.value / jobs),
+            "bytes_pushed": round(envelope_bytes / jobs),
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging()
+    result = run(args)
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        check = compare_with_baseline(result, baseline, args.tolerance, REGRESSION_METRICS)
+        if not check.ok:
+            print("Regressions detected:", file=sys.stderr)
+            for line in check.regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
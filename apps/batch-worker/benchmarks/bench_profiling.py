@@ -0,0 +1,205 @@
+"""ジョブ単位プロファイリングのオーバーヘッド計測ベンチマーク.
+
+`worker._profile_reason` と `worker._run_processor`（プロファイリングの判定とプロファイラの
+呼び出し箇所）を経由した `PDFProcessor.process` の処理時間を、以下のモードで比較する。
+
+- direct: `processor.process()` を直接呼び出す（フックなしの基準値）
+- off: `PROFILE_ENABLED=false`（判定処理を呼び出さない）
+- idle: `PROFILE_ENABLED=true`、サンプリング率0（属性・フラグの確認のみ）
+- sampled: 全ジョブでプロファイルを取得
+
+direct と off は1ジョブずつ交互に実行し、off について以下を確認する。
+
+- 処理時間（p50）の増加率が `--max-off-overhead` 以下であること
+- Redisコマンド数が direct と同じであること
+- プロファイラが一度も有効にならないこと
+
+いずれかを満たさない場合は終了コード1で終了する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_profiling --jobs 200 --pages 10 --output bench_profiling.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import (
+    CountingRedis,
+    CountingStorageClient,
+    bind_worker_clients,
+    configure_logging,
+    create_redis_client,
+    latency_summary,
+    prepare_worker_env,
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200, help="モードごとのジョブ数")
+    parser.add_argument("--pages", type=int, default=10, help="1ジョブあたりのページ数")
+    parser.add_argument(
+        "--page-delay", type=float, default=0.0, help="1ページあたりのモック解析時間（秒）"
+    )
+    parser.add_argument("--sampled-jobs", type=int, default=20, help="sampled モードのジョブ数")
+    parser.add_argument(
+        "--max-off-overhead",
+        type=float,
+        default=0.02,
+        help="off モードで許容する direct 比の処理時間増加率（p50）",
+    )
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+class _ModeStats:
+    """モードごとの計測値."""
+
+    def __init__(self) -> None:
+        self.durations: list[float] = []
+        self.redis_ops = 0
+        self.profiler_active = False
+
+    def to_dict(self) -> dict[str, Any]:
+        jobs = len(self.durations)
+        return {
+            "jobs": jobs,
+            "mean_ms": round(statistics.fmean(self.durations) * 1000, 3) if jobs else 0.0,
+            **latency_summary(self.durations),
+            "redis_ops_per_job": round(self.redis_ops / jobs, 2) if jobs else 0.0,
+            "profiler_active": self.profiler_active,
+        }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    storage_dir = tempfile.mkdtemp(prefix="bench-profiling-")
+    prepare_worker_env(storage_dir, args.page_delay)
+
+    import profiling
+    import worker
+    from messages import JobMessage
+    from processor import PDFProcessor
+
+    redis_client: Any = CountingRedis(create_redis_client(args.redis_url))
+    storage_client = CountingStorageClient(worker.storage_client)
+    bind_worker_clients(worker, redis_client, storage_client)
+
+    def profiler_active() -> bool:
+        return profiling._profile_lock.locked() or tracemalloc.is_tracing()
+
+    def run_job(mode: _ModeStats, call: Callable[[PDFProcessor, JobMessage], Any]) -> None:
+        job_id = str(uuid.uuid4())
+        job_message = JobMessage(job_id=job_id, pdf_path=f"uploads/{job_id}/bench.pdf")
+        processor = PDFProcessor(
+            job_id,
+            job_message.pdf_path,
+            storage_client,
+            redis_client,
+            page_delay_range=(args.page_delay, args.page_delay),
+            page_count_range=(args.pages, args.pages),
+        )
+        analyze_page = processor.analyze_page
+
+        def observed_analyze_page(page_num: int) -> dict[str, Any]:
+            mode.profiler_active |= profiler_active()
+            return analyze_page(page_num)
+
+        processor.analyze_page = observed_analyze_page  # type: ignore[method-assign]
+        ops_before = redis_client.ops.value
+        started = time.perf_counter()
+        call(processor, job_message)
+        mode.durations.append(time.perf_counter() - started)
+        mode.redis_ops += redis_client.ops.value - ops_before
+
+    def direct(processor: PDFProcessor, job_message: JobMessage) -> Any:
+        return processor.process()
+
+    def hooked(processor: PDFProcessor, job_message: JobMessage) -> Any:
+        return worker._run_processor(processor, job_message, worker._profile_reason(job_message))
+
+    modes = {name: _ModeStats() for name in ("direct", "off", "idle", "sampled")}
+
+    # ウォームアップ（初回のディレクトリ作成・import の影響を除く）
+    for _ in range(5):
+        run_job(_ModeStats(), direct)
+
+    # direct と off は交互に実行して、計測環境の揺らぎを両方に均等に乗せる
+    worker.profiling_policy = None
+    for _ in range(args.jobs):
+        run_job(modes["direct"], direct)
+        run_job(modes["off"], hooked)
+
+    worker.profiling_policy = profiling.ProfilingPolicy(redis_client, sample_rate=0.0)
+    for _ in range(args.jobs):
+        run_job(modes["idle"], hooked)
+
+    uploaded_before = storage_client.bytes_uploaded.value
+    worker.profiling_policy = profiling.ProfilingPolicy(redis_client, sample_rate=1.0)
+    for _ in range(args.sampled_jobs):
+        run_job(modes["sampled"], hooked)
+    profile_bytes = storage_client.bytes_uploaded.value - uploaded_before
+    worker.profiling_policy = None
+
+    results = {name: mode.to_dict() for name, mode in modes.items()}
+    direct_p50 = results["direct"]["p50_ms"]
+    off_overhead = (results["off"]["p50_ms"] - direct_p50) / direct_p50 if direct_p50 else 0.0
+    sampled_overhead = (
+        (results["sampled"]["p50_ms"] - direct_p50) / direct_p50 if direct_p50 else 0.0
+    )
+
+    failures = []
+    if off_overhead > args.max_off_overhead:
+        failures.append(
+            f"off overhead {off_overhead:.2%} exceeds {args.max_off_overhead:.2%} (p50 vs direct)"
+        )
+    if results["off"]["redis_ops_per_job"] != results["direct"]["redis_ops_per_job"]:
+        failures.append("off mode issued extra Redis commands")
+    if results["off"]["profiler_active"]:
+        failures.append("profiler was active in off mode")
+    if not results["sampled"]["profiler_active"]:
+        failures.append("profiler was not active in sampled mode")
+
+    return {
+        "config": {
+            "jobs": args.jobs,
+            "pages": args.pages,
+            "page_delay": args.page_delay,
+            "sampled_jobs": args.sampled_jobs,
+        },
+        "modes": results,
+        "off_overhead_ratio": round(off_overhead, 4),
+        "sampled_overhead_ratio": round(sampled_overhead, 4),
+        "profile_bytes_per_job": profile_bytes // max(1, args.sampled_jobs),
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging()
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""ストレージGCのベンチマーク.
+
+一時ディレクトリの `LocalStorageClient` に `--jobs` 件のジョブのオブジェクト
+（`uploads/{job_id}/input.pdf`・`results/{job_id}/result.json`）を作成し、以下のモードで期限切れのジョブのオブジェクトを削除する。
+
+- naive: 一覧全体をリストに読み込み、オブジェクトごとにステータスを確認して `delete_file` で削除する
+- gc: `storage_gc.StorageGarbageCollector`（一覧を順次読み込み、バッチごとにステータスを確認して
+  `delete_many` を並列に実行する）
+
+ジョブのうち `--live-ratio` はステータスを残し、`--recent-ratio` はステータスが無いが更新から
+最小経過時間が経っていないジョブとする（どちらも削除しない）。各モードについて以下を出力する。
+
+- seconds / objects_per_second: 処理時間とスループット（tracemalloc の分だけ遅くなる）
+- redis_round_trips: Redisのラウンドトリップ数
+- estimated_seconds: ネットワーク越しのRedisを想定した推定時間
+  （seconds + redis_round_trips × `--redis-rtt-ms`。fakeredis はプロセス内のため往復の遅延が無い）
+- peak_memory_mb: メモリのピーク（tracemalloc）
+- empty_directories: 削除後に残った空のジョブのディレクトリ数
+
+以下を確認する。
+
+- 期限切れのジョブのオブジェクトが全て削除され、それ以外のオブジェクトが残っていること
+- gc が空のジョブのディレクトリを残さないこと
+- gc のメモリのピークが naive より小さいこと
+
+いずれかを満たさない場合は終了コード1で終了する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.bench_storage_gc --jobs 20000 --output bench_storage_gc.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import redis
+
+from benchmarks.harness import CountingRedis, configure_logging, create_redis_client
+from processor import job_key
+from storage import LocalStorageClient
+from storage_gc import StorageGarbageCollector, job_id_from_path
+
+PREFIXES = ("uploads/", "results/")
+
+# 期限切れのジョブのオブジェクトの更新時刻（最小経過時間より十分前）
+EXPIRED_AGE = timedelta(days=2)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000, help="ジョブ数")
+    parser.add_argument(
+        "--live-ratio", type=float, default=0.2, help="ステータスを残すジョブの割合"
+    )
+    parser.add_argument(
+        "--recent-ratio", type=float, default=0.05, help="更新から間もないジョブの割合"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="GCのバッチサイズ")
+    parser.add_argument("--concurrency", type=int, default=8, help="GCの同時削除バッチ数")
+    parser.add_argument(
+        "--redis-rtt-ms", type=float, default=0.5, help="推定時間に使うRedisの往復時間（ミリ秒）"
+    )
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+def populate(
+    base_path: Path, redis_client: redis.Redis, args: argparse.Namespace
+) -> dict[str, str]:
+    """ジョブのオブジェクトとステータスを作成する.
+
+    Returns:
+        dict[str, str]: ジョブIDと種類（live / recent / expired）
+    """
+    redis_client.flushdb()
+    live_count = int(args.jobs * args.live_ratio)
+    recent_count = int(args.jobs * args.recent_ratio)
+    expired_at = (datetime.now(UTC) - EXPIRED_AGE).timestamp()
+
+    kinds = {}
+    pipe = redis_client.pipeline(transaction=False)
+    for index in range(args.jobs):
+        job_id = str(uuid.uuid4())
+        if index < live_count:
+            kind = "live"
+        elif index < live_count + recent_count:
+            kind = "recent"
+        else:
+            kind = "expired"
+        kinds[job_id] = kind
+        for path in (f"uploads/{job_id}/input.pdf", f"results/{job_id}/result.json"):
+            full_path = base_path / path
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            full_path.write_bytes(b"x" * 64)
+            if kind != "recent":
+                os.utime(full_path, (expired_at, expired_at))
+        if kind == "live":
+            pipe.set(job_key(job_id), "{}")
+    pipe.execute()
+    return kinds
+
+
+def run_naive(
+    storage_client: LocalStorageClient, redis_client: redis.Redis, cutoff: datetime
+) -> int:
+    """一覧全体を読み込み、オブジェクトごとに確認・削除する（比較用の基準値）."""
+    objects = [obj for prefix in PREFIXES for obj in storage_client.list_prefix(prefix)]
+    deleted = 0
+    for obj in objects:
+        prefix = next(prefix for prefix in PREFIXES if obj.path.startswith(prefix))
+        job_id = job_id_from_path(obj.path, prefix)
+        if job_id is None or obj.updated >= cutoff:
+            continue
+        if not redis_client.exists(job_key(job_id)):
+            deleted += storage_client.delete_file(obj.path)
+    return deleted
+
+
+def verify(base_path: Path, kinds: dict[str, str]) -> tuple[list[str], int]:
+    """削除結果を確認する.
+
+    Returns:
+        tuple[list[str], int]: 問題点の一覧と、空のジョブのディレクトリ数
+    """
+    problems = []
+    empty_directories = 0
+    expected = {job_id for job_id, kind in kinds.items() if kind != "expired"}
+    for prefix in PREFIXES:
+        remaining = set()
+        for entry in os.scandir(base_path / prefix):
+            if any(os.scandir(entry.path)):
+                remaining.add(entry.name)
+            else:
+                empty_directories += 1
+        if remaining != expected:
+            problems.append(
+                f"{prefix}: objects of {len(remaining - expected)} expired jobs remain, "
+                f"{len(expected - remaining)} kept jobs were deleted"
+            )
+    return problems, empty_directories
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    base_redis = create_redis_client(args.redis_url)
+    modes: dict[str, dict[str, Any]] = {}
+    failures = []
+    for mode in ("naive", "gc"):
+        with tempfile.TemporaryDirectory() as storage_dir:
+            base_path = Path(storage_dir)
+            kinds = populate(base_path, base_redis, args)
+            storage_client = LocalStorageClient(storage_dir)
+            redis_client = CountingRedis(base_redis)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            if mode == "naive":
+                cutoff = datetime.now(UTC) - timedelta(hours=1)
+                deleted = run_naive(storage_client, redis_client, cutoff)
+            else:
+                collector = StorageGarbageCollector(
+                    redis_client,
+                    storage_client,
+                    prefixes=PREFIXES,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                )
+                stats = collector.run()
+                assert stats is not None
+                deleted = stats.deleted
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            problems, empty_directories = verify(base_path, kinds)
+            scanned = len(kinds) * len(PREFIXES)
+            round_trips = redis_client.round_trips.value
+            modes[mode] = {
+                "seconds": round(seconds, 3),
+                "objects_per_second": round(scanned / seconds),
+                "deleted": deleted,
+                "redis_round_trips": round_trips,
+                "estimated_seconds": round(seconds + round_trips * args.redis_rtt_ms / 1000, 3),
+                "peak_memory_mb": round(peak / 1024 / 1024, 2),
+                "empty_directories": empty_directories,
+            }
+            expected_deleted = sum(kind == "expired" for kind in kinds.values()) * len(PREFIXES)
+            if deleted != expected_deleted:
+                failures.append(f"{mode}: deleted {deleted} objects (expected {expected_deleted})")
+            failures.extend(f"{mode}: {problem}" for problem in problems)
+
+    if modes["gc"]["empty_directories"]:
+        failures.append(f"gc left {modes['gc']['empty_directories']} empty job directories")
+
+    if modes["gc"]["peak_memory_mb"] >= modes["naive"]["peak_memory_mb"]:
+        failures.append(
+            f"gc peak memory {modes['gc']['peak_memory_mb']} MB is not lower than "
+            f"naive ({modes['naive']['peak_memory_mb']} MB)"
+        )
+
+    return {
+        "config": {
+            "jobs": args.jobs,
+            "objects": args.jobs * len(PREFIXES),
+            "live_ratio": args.live_ratio,
+            "recent_ratio": args.recent_ratio,
+            "batch_size": args.batch_size,
+            "concurrency": args.concurrency,
+            "redis_rtt_ms": args.redis_rtt_ms,
+            "redis": "redis" if args.redis_url else "fakeredis",
+        },
+        "modes": modes,
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging()
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""ベンチマーク共通ハーネス.
+
+実際の Flask ハンドラ・PDFProcessor・ストレージクライアントをそのまま動かすための
+ローカル代替（インプロセス Pub/Sub、計測用ラッパー）と統計ユーティリティを提供する。
+"""
+
+import base64
+import importlib.util
+import itertools
+import math
+import os
+import queue
+import sys
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import redis
+from loguru import logger
+
+from messages import decode_message_body
+from storage import StorageClient, StorageObject
+
+# streamlit-app のソースディレクトリ（PubSubClient を読み込むために使用）
+STREAMLIT_APP_DIR = Path(__file__).resolve().parents[2] / "streamlit-app"
+
+
+def configure_logging(level: str = "ERROR") -> None:
+    """ベンチマーク中のログ出力を抑制する.
+
+    Args:
+        level: 出力する最小ログレベル
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+
+def prepare_worker_env(storage_path: str, page_delay: float) -> None:
+    """`worker` モジュールの import 前にローカル実行用の環境変数を設定する.
+
+    Args:
+        storage_path: LocalStorageClient のベースディレクトリ
+        page_delay: 1ページあたりのモック解析時間（秒）
+    """
+    os.environ["STORAGE_TYPE"] = "LOCAL"
+    os.environ["LOCAL_STORAGE_PATH"] = storage_path
+    os.environ["MOCK_PAGE_DELAY_MIN"] = str(page_delay)
+    os.environ["MOCK_PAGE_DELAY_MAX"] = str(page_delay)
+
+
+def bind_worker_clients(worker: ModuleType, redis_client: Any, storage_client: Any) -> None:
+    """`worker` モジュールのRedis・ストレージクライアントを差し替える.
+
+    import 時に生成され、クライアントを保持しているコンポーネント（履歴のアーカイバー・
+    プロファイリングの判定）も同じクライアントを使うように差し替える。
+
+    Args:
+        worker: `worker` モジュール
+        redis_client: 差し替えるRedisクライアント
+        storage_client: 差し替えるストレージクライアント
+    """
+    worker.redis_client = redis_client
+    worker.storage_client = storage_client
+    if worker.history_archiver is not None:
+        worker.history_archiver.redis_client = redis_client
+        worker.history_archiver.storage_client = storage_client
+    if worker.profiling_policy is not None:
+        worker.profiling_policy.redis_client = redis_client
+
+
+def create_redis_client(redis_url: str | None) -> redis.Redis:
+    """ベンチマーク用のRedisクライアントを生成する.
+
+    Args:
+        redis_url: ローカルRedisのURL（未指定の場合は fakeredis を使用）
+
+    Returns:
+        redis.Redis: Redisクライアント
+    """
+    if redis_url:
+        return redis.Redis.from_url(redis_url, decode_responses=True)
+
+    import fakeredis
+
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+class _CountingPipeline:
+    """パイプライン内のコマンドもカウントするプロキシ（execute は1往復として計上）."""
+
+    def __init__(self, pipeline: Any, counter: "OpCounter", round_trips: "OpCounter") -> None:
+        self._pipeline = pipeline
+        self._counter = counter
+        self._round_trips = round_trips
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._pipeline, name)
+        if name == "execute":
+            self._round_trips.increment()
+            return attr
+        if not callable(attr) or name == "reset":
+            return attr
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self._counter.increment()
+            result = attr(*args, **kwargs)
+            # チェーン呼び出し（pipe.set(...).expire(...)）でもプロキシを維持する
+            return self if result is self._pipeline else result
+
+        return wrapper
+
+    def __enter__(self) -> "_CountingPipeline":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._pipeline.reset()
+
+
+class OpCounter:
+    """スレッドセーフなカウンタ."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def increment(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class CountingRedis:
+    """Redisコマンド数とネットワーク往復数を計測するプロキシ.
+
+    直接呼び出しとパイプライン内のコマンドを1コマンドずつ `ops` に、直接呼び出しと
+    パイプラインの execute を1往復ずつ `round_trips` にカウントする。
+    """
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+        self.ops = OpCounter()
+        self.round_trips = OpCounter()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        if name == "pipeline":
+
+            def pipeline(*args: Any, **kwargs: Any) -> _CountingPipeline:
+                return _CountingPipeline(attr(*args, **kwargs), self.ops, self.round_trips)
+
+            return pipeline
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.ops.increment()
+            self.round_trips.increment()
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+class CountingStorageClient(StorageClient):
+    """転送バイト数を計測するストレージクライアントのラッパー."""
+
+    def __init__(self, inner: StorageClient) -> None:
+        """初期化.
+
+        Args:
+            inner: 実際の処理を行うストレージクライアント
+        """
+        self.inner = inner
+        self.bytes_uploaded = OpCounter()
+        self.bytes_downloaded = OpCounter()
+
+    def upload_file(self, file_bytes: bytes, destination_path: str) -> str:
+        """アップロードしたバイト数を記録して委譲する."""
+        self.bytes_uploaded.increment(len(file_bytes))
+        return self.inner.upload_file(file_bytes, destination_path)
+
+    def download_file(self, source_path: str) -> bytes:
+        """ダウンロードしたバイト数を記録して委譲する."""
+        file_bytes = self.inner.download_file(source_path)
+        self.bytes_downloaded.increment(len(file_bytes))
+        return file_bytes
+
+    def download_with_generation(self, source_path: str) -> tuple[bytes, int]:
+        """ダウンロードしたバイト数を記録して委譲する."""
+        file_bytes, generation = self.inner.download_with_generation(source_path)
+        self.bytes_downloaded.increment(len(file_bytes))
+        return file_bytes, generation
+
+    def upload_if_generation(
+        self, file_bytes: bytes, destination_path: str, generation: int
+    ) -> str:
+        """アップロードしたバイト数を記録して委譲する."""
+        self.bytes_uploaded.increment(len(file_bytes))
+        return self.inner.upload_if_generation(file_bytes, destination_path, generation)
+
+    def delete_file(self, path: str) -> bool:
+        """委譲する."""
+        return self.inner.delete_file(path)
+
+    def list_prefix(self, prefix: str) -> Iterator[StorageObject]:
+        """委譲する."""
+        return self.inner.list_prefix(prefix)
+
+    def delete_many(self, paths: Sequence[str]) -> int:
+        """委譲する."""
+        return self.inner.delete_many(paths)
+
+
+@dataclass
+class PublishedMessage:
+    """インプロセス Pub/Sub に発行されたメッセージ."""
+
+    message_id: str
+    data: bytes
+    attributes: dict[str, str]
+    publish_time: datetime
+
+
+class _ResolvedFuture:
+    """`publisher.publish()` の戻り値を模擬する完了済み Future."""
+
+    def __init__(self, value: str) -> None:
+        self._value = value
+
+    def result(self, timeout: float | None = None) -> str:
+        return self._value
+
+
+class InProcessPublisher:
+    """`pubsub_v1.PublisherClient` のインプロセス代替（Pub/Subエミュレータの代わり）.
+
+    発行されたメッセージはキューに積まれ、Push配信ドライバーが取り出す。
+    """
+
+    def __init__(self) -> None:
+        self.messages: queue.Queue[PublishedMessage | None] = queue.Queue()
+        self._ids = itertools.count(1)
+        self.bytes_published = OpCounter()
+
+    def topic_path(self, project: str, topic: str) -> str:
+        return f"projects/{project}/topics/{topic}"
+
+    def publish(self, topic: str, data: bytes, **attributes: str) -> _ResolvedFuture:
+        message_id = str(next(self._ids))
+        self.bytes_published.increment(len(data))
+        self.messages.put(
+            PublishedMessage(
+                message_id=message_id,
+                data=data,
+                attributes=dict(attributes),
+                publish_time=datetime.now(UTC),
+            )
+        )
+        return _ResolvedFuture(message_id)
+
+    def close(self, consumers: int) -> None:
+        """配信ドライバーのスレッドに終了を通知する."""
+        for _ in range(consumers):
+            self.messages.put(None)
+
+    def drain(self) -> Iterator[PublishedMessage]:
+        """キューに残っているメッセージを全て取り出す."""
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                return
+            if message is not None:
+                yield message
+
+
+def load_streamlit_module(name: str) -> ModuleType:
+    """streamlit-app のモジュールを別名で読み込む.
+
+    両アプリに同名モジュール（config, storage）があるため、`app_{name}` として登録する。
+
+    Args:
+        name: モジュール名（例: "pubsub_client"）
+
+    Returns:
+        ModuleType: 読み込んだモジュール
+    """
+    module_name = f"app_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, STREAMLIT_APP_DIR / f"{name}.py")
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load {name} from {STREAMLIT_APP_DIR}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_pubsub_client(publisher: InProcessPublisher, topic: str = "pdf-processing-topic") -> Any:
+    """streamlit-app の PubSubClient をインプロセス Publisher に接続して生成する.
+
+    Args:
+        publisher: インプロセス Publisher
+        topic: トピック名
+
+    Returns:
+        PubSubClient: 発行先をインプロセス Publisher に差し替えたクライアント
+    """
+    # 実クライアント生成時に認証情報を要求されないようエミュレータ指定にしておく
+    os.environ.setdefault("PUBSUB_EMULATOR_HOST", "localhost:8085")
+    pubsub_client_module = load_streamlit_module("pubsub_client")
+    client = pubsub_client_module.PubSubClient("local-dev", topic)
+    client.publisher = publisher
+    client.topic_path = publisher.topic_path("local-dev", topic)
+    return client
+
+
+def build_push_envelope(message: PublishedMessage) -> dict[str, Any]:
+    """Push型 Pub/Sub が送信するJSONエンベロープを組み立てる.
+
+    Args:
+        message: 発行済みメッセージ
+
+    Returns:
+        dict[str, Any]: Pushリクエストのボディ
+    """
+    pubsub_message: dict[str, Any] = {
+        "data": base64.b64encode(message.data).decode("ascii"),
+        "messageId": message.message_id,
+        "publishTime": message.publish_time.isoformat().replace("+00:00", "Z"),
+    }
+    if message.attributes:
+        pubsub_message["attributes"] = message.attributes
+    return {
+        "message": pubsub_message,
+        "subscription": "projects/local-dev/subscriptions/pdf-processing-subscription",
+    }
+
+
+def job_ids_of(message: PublishedMessage) -> list[str]:
+    """メッセージ本文からジョブIDを取り出す（バッチメッセージの場合は全ジョブ分）."""
+    body = decode_message_body(message.data, message.attributes)
+    jobs = body["jobs"] if "jobs" in body else [body]
+    return [str(job["job_id"]) for job in jobs]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """最近傍法でパーセンタイルを計算する.
+
+    Args:
+        values: 観測値
+        pct: パーセンタイル（0〜100）
+
+    Returns:
+        float: パーセンタイル値（値が無い場合は0）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+    """レイテンシの要約統計（ミリ秒）を返す."""
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values, default=0.0) * 1000, 2),
+    }
+
+
+@dataclass
+class RegressionCheck:
+    """ベースラインとの比較結果."""
+
+    regressions: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.regressions
+
+
+def compare_with_baseline(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+    metrics: dict[str, Callable[[float, float, float], bool]],
+) -> RegressionCheck:
+    """結果JSONをベースラインと比較し、許容範囲を超えた劣化を列挙する.
+
+    Args:
+        current: 今回の結果（`metrics` のキーはドット区切りのパス）
+        baseline: 比較対象の結果
+        tolerance: 許容する劣化率（例: 0.1 = 10%）
+        metrics: メトリクスパス → 劣化判定関数 (current, baseline, tolerance) -> bool
+
+    Returns:
+        RegressionCheck: 比較結果
+    """
+
+    def lookup(data: dict[str, Any], path: str) -> float | None:
+        value: Any = data
+        for part in path.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return float(value)
+
+    check = RegressionCheck()
+    for path, is_regression in metrics.items():
+        now = lookup(current, path)
+        before = lookup(baseline, path)
+        if now is None or before is None:
+            continue
+        if is_regression(now, before, tolerance):
+            check.regressions.append(f"{path}: {before} -> {now}")
+    return check
+
+
+def higher_is_better(now: float, before: float, tolerance: float) -> bool:
+    """値が大きいほど良いメトリクスの劣化判定."""
+    return now < before * (1 - tolerance)
+
+
+def lower_is_better(now: float, before: float, tolerance: float) -> bool:
+    """値が小さいほど良いメトリクスの劣化判定."""
+    return now > before * (1 + tolerance)
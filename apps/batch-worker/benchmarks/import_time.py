@@ -0,0 +1,196 @@
+"""import 時間のプロファイリングレポート.
+
+`python -X importtime` で対象モジュールを新しいプロセスで import し、import 時間の
+内訳を集計する。コールドスタート時にワーカープロセスが import に費やす時間と、遅延初期化で
+最初の利用時まで先送りしているモジュール（GCS・Pub/Sub のクライアントライブラリ）の
+import 時間を確認するために使う。
+
+対象モジュールごとに以下を出力する（各値は `--runs` 回の中央値）。
+
+- total_ms: 対象モジュールの import 全体の時間（cumulative）
+- top_level: 対象モジュールが直接 import したモジュールのうち、時間の長いもの（cumulative）
+- top_self: 自身の処理時間（self、子モジュールを除く）の長いモジュール
+
+`--max-total-ms` を指定した場合、最初の対象モジュールの total_ms が上限を超えると
+終了コード1で終了する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.import_time --output import_time.json
+    python -m benchmarks.import_time --modules worker --max-total-ms 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# ワーカーのソースディレクトリ（サブプロセスのカレントディレクトリ）
+WORKER_DIR = Path(__file__).resolve().parents[1]
+
+# 既定の対象モジュール（ワーカー本体と、遅延初期化で import を先送りしているライブラリ）
+DEFAULT_MODULES = "worker,google.cloud.storage,google.cloud.pubsub_v1"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="対象モジュール（カンマ区切り）")
+    parser.add_argument("--runs", type=int, default=5, help="モジュールごとの計測回数")
+    parser.add_argument("--top", type=int, default=15, help="出力するモジュール数")
+    parser.add_argument(
+        "--max-total-ms",
+        type=float,
+        default=None,
+        help="最初の対象モジュールで許容する import 時間（ミリ秒、中央値）",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    """`-X importtime` の1行（時間はマイクロ秒）."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """`-X importtime` の出力を解析する.
+
+    Args:
+        stderr: サブプロセスの標準エラー出力（import time 以外の行は無視する）
+
+    Returns:
+        list[ImportRecord]: import したモジュール（import が完了した順）
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        stripped = name.lstrip(" ")
+        # モジュール名の前の空白は、2文字ごとに import の入れ子の深さを表す
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportRecord(stripped, int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def profile_module(module: str, env: dict[str, str]) -> list[ImportRecord]:
+    """新しいプロセスで対象モジュールを import し、import 時間を取得する.
+
+    Args:
+        module: 対象モジュール
+        env: サブプロセスの環境変数
+
+    Returns:
+        list[ImportRecord]: import したモジュール
+
+    Raises:
+        RuntimeError: import に失敗した場合
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WORKER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip()[-500:]}")
+    return parse_importtime(completed.stderr)
+
+
+def summarize(runs: list[list[ImportRecord]], module: str, top: int) -> dict[str, Any]:
+    """複数回の計測結果を、モジュールごとの中央値で集計する.
+
+    Args:
+        runs: 計測ごとの import 記録
+        module: 対象モジュール
+        top: 出力するモジュール数
+
+    Returns:
+        dict[str, Any]: 集計結果（時間はミリ秒）
+    """
+    totals = []
+    modules_imported = []
+    top_level: dict[str, list[int]] = defaultdict(list)
+    self_times: dict[str, list[int]] = defaultdict(list)
+    for records in runs:
+        index = next(i for i, record in enumerate(records) if record.module == module)
+        target = records[index]
+        totals.append(target.cumulative_us)
+        # 子モジュールは親より前に出力されるため、対象の直前から深さが浅くなるまで遡る
+        start = index
+        while start > 0 and records[start - 1].depth > target.depth:
+            start -= 1
+        modules_imported.append(index + 1 - start)
+        for record in records[start : index + 1]:
+            self_times[record.module].append(record.self_us)
+            if record.depth == target.depth + 1:
+                top_level[record.module].append(record.cumulative_us)
+
+    def ranked(times: dict[str, list[int]]) -> list[dict[str, Any]]:
+        medians = {name: statistics.median(values) for name, values in times.items()}
+        names = sorted(medians, key=medians.__getitem__, reverse=True)[:top]
+        return [{"module": name, "ms": round(medians[name] / 1000, 2)} for name in names]
+
+    return {
+        "total_ms": round(statistics.median(totals) / 1000, 2),
+        "modules_imported": round(statistics.median(modules_imported)),
+        "top_level": ranked(top_level),
+        "top_self": ranked(self_times),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """レポートを作成し、結果を辞書で返す."""
+    modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    # STORAGE_TYPE が未設定の場合はローカル実行の設定で import する
+    env = {"STORAGE_TYPE": "LOCAL", **os.environ}
+
+    results = {}
+    for module in modules:
+        runs = [profile_module(module, env) for _ in range(args.runs)]
+        results[module] = summarize(runs, module, args.top)
+
+    failures = []
+    if args.max_total_ms is not None and modules:
+        total_ms = results[modules[0]]["total_ms"]
+        if total_ms > args.max_total_ms:
+            failures.append(
+                f"import {modules[0]} took {total_ms:.1f} ms (max {args.max_total_ms:.1f} ms)"
+            )
+
+    return {
+        "config": {"runs": args.runs, "python": sys.version.split()[0]},
+        "modules": results,
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""適応型同時実行数リミッターの過負荷シミュレーション.
+
+1インスタンス（CPUコア数 `--cores`）に対して、通常負荷 → 過負荷 → 通常負荷 の順にジョブを
+到着させ、受け入れ戦略ごとにスループットとレイテンシを比較する。リミッターは実装
+（`limiter.AdaptiveConcurrencyLimiter`）をそのまま使い、時間は仮想時計で進める。
+
+- unbounded: 全て受け入れる（Cloud Run の既定 concurrency=80 相当）
+- fixed: 同時実行数を `--threads` で固定（gunicorn `--threads 8` 相当）
+- adaptive: AdaptiveConcurrencyLimiter（拒否分は Pub/Sub のバックオフ後に再配信）
+
+同時実行数がコア数を超えるとコンテキストスイッチやメモリ圧迫で全体の処理効率が落ちる
+（`--contention`）ため、受け入れすぎるとスループットが低下し、タイムアウトが発生する。
+
+実行例（apps/batch-worker で実行）:
+    python -m benchmarks.sim_limiter --output sim_limiter.json
+"""
+
+import argparse
+import heapq
+import json
+import random
+import sys
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import configure_logging, latency_summary
+from limiter import AdaptiveConcurrencyLimiter
+
+# Pub/Sub Push のリトライバックオフ（最小10秒、最大600秒）
+MIN_BACKOFF_SECONDS = 10.0
+MAX_BACKOFF_SECONDS = 600.0
+
+
+@dataclass
+class SimJob:
+    """シミュレーション上のジョブ."""
+
+    job_id: int
+    pages: int
+    work: float
+    arrived_at: float
+    attempts: int = 0
+    started_at: float = 0.0
+    remaining: float = 0.0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cores", type=int, default=2, help="インスタンスのCPUコア数")
+    parser.add_argument("--threads", type=int, default=8, help="fixed 戦略の同時実行数")
+    parser.add_argument("--page-cpu", type=float, default=4.0, help="1ページのCPU時間（秒）")
+    parser.add_argument("--contention", type=float, default=0.15, help="過剰並列時の効率低下係数")
+    parser.add_argument("--overload", type=float, default=3.0, help="過負荷時の到着率（容量比）")
+    parser.add_argument("--phase", type=float, default=3600.0, help="各フェーズの長さ（秒）")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="リクエストタイムアウト")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+def generate_arrivals(args: argparse.Namespace) -> list[SimJob]:
+    """通常 → 過負荷 → 通常 の3フェーズでポアソン到着を生成する."""
+    rng = random.Random(args.seed)
+    mean_work = 12.5 * args.page_cpu
+    capacity = args.cores / mean_work
+    rates = [0.5 * capacity, args.overload * capacity, 0.5 * capacity]
+
+    jobs: list[SimJob] = []
+    now = 0.0
+    for phase_index, rate in enumerate(rates):
+        phase_end = (phase_index + 1) * args.phase
+        while True:
+            now += rng.expovariate(rate)
+            if now >= phase_end:
+                now = phase_end
+                break
+            pages = rng.randint(5, 20)
+            jobs.append(SimJob(len(jobs), pages, pages * args.page_cpu, now))
+    return jobs
+
+
+def simulate(args: argparse.Namespace, strategy: str) -> dict[str, Any]:
+    """1つの受け入れ戦略でシミュレーションを実行する."""
+    limiter = AdaptiveConcurrencyLimiter(max_limit=args.threads) if strategy == "adaptive" else None
+    pending: list[tuple[float, int, SimJob]] = [
+        (job.arrived_at, job.job_id, job) for job in generate_arrivals(args)
+    ]
+    heapq.heapify(pending)
+    total_jobs = len(pending)
+    end_time = 3 * args.phase + args.timeout
+
+    running: list[SimJob] = []
+    completed: list[tuple[float, float]] = []  # (完了時刻, 到着から完了までの時間)
+    timeouts = 0
+    rejections = 0
+    limit_trace: list[int] = []
+    dt = 1.0
+    now = 0.0
+
+    def admit(job: SimJob) -> bool:
+        if strategy == "unbounded":
+            return True
+        if strategy == "fixed":
+            return len(running) < args.threads
+        assert limiter is not None
+        return limiter.try_acquire()
+
+    while now < end_time and (pending or running):
+        # 到着・再配信の受け付け
+        while pending and pending[0][0] <= now:
+            _, _, job = heapq.heappop(pending)
+            if admit(job):
+                job.started_at = now
+                job.remaining = job.work
+                running.append(job)
+            else:
+                rejections += 1
+                job.attempts += 1
+                backoff = min(MAX_BACKOFF_SECONDS, MIN_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+                heapq.heappush(pending, (now + backoff, job.job_id, job))
+
+        # 処理の進行（コア数を超える並列は効率が低下する）
+        if running:
+            excess = max(0, len(running) - args.cores) / args.cores
+            total_rate = min(args.cores, len(running)) / (1 + args.contention * excess)
+            share = total_rate / len(running) * dt
+            still_running = []
+            for job in running:
+                job.remaining -= share
+                elapsed = now + dt - job.started_at
+                if job.remaining <= 0:
+                    completed.append((now + dt, now + dt - job.arrived_at))
+                    if limiter:
+                        limiter.release(elapsed / job.pages)
+                elif elapsed >= args.timeout:
+                    timeouts += 1
+                    if limiter:
+                        limiter.release(None)
+                else:
+                    still_running.append(job)
+            running = still_running
+
+        if limiter and int(now) % 60 == 0:
+            limit_trace.append(limiter.limit)
+        now += dt
+
+    phases = {}
+    for index, name in enumerate(["normal_before", "overload", "normal_after"]):
+        start, end = index * args.phase, (index + 1) * args.phase
+        done = [latency for finished, latency in completed if start <= finished < end]
+        phases[name] = {
+            "jobs_per_hour": round(len(done) / args.phase * 3600, 1),
+            "latency_seconds": {
+                key.replace("_ms", "_s"): round(value / 1000, 1)
+                for key, value in latency_summary(done).items()
+            },
+        }
+
+    result: dict[str, Any] = {
+        "arrived": total_jobs,
+        "completed": len(completed),
+        "timeouts": timeouts,
+        "rejections": rejections,
+        "phases": phases,
+    }
+    if limiter:
+        stats = limiter.stats()
+        result["final_limit"] = stats.limit
+        result["limit_range"] = [min(limit_trace), max(limit_trace)] if limit_trace else []
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    configure_logging()
+    result = {
+        "benchmark": "limiter_simulation",
+        "recorded_at": datetime.now(UTC).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "strategies": {
+            strategy: simulate(args, strategy) for strategy in ("unbounded", "fixed", "adaptive")
+        },
+    }
+    print(json.dumps(result, indent=2, default=str))
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, default=str), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""ジョブのキャンセル（協調的中止）モジュール.
+
+フロントエンドが `cancel:{job_id}` キーをRedisに書き込み、処理中のワーカーはページの区切りで
+そのフラグを確認して処理を中止する。フラグはローカルにキャッシュし、Redisへの問い合わせは
+`check_interval` 秒に1回までに抑える。
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import redis
+import redis.asyncio as aioredis
+
+
+def cancel_key(job_id: str) -> str:
+    """キャンセルフラグのRedisキーを返す."""
+    return f"cancel:{job_id}"
+
+
+class JobCancelledError(Exception):
+    """ジョブがキャンセルされたため、処理を中止した場合の例外."""
+
+    def __init__(self, job_id: str, pages_done: int, page_count: int) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            pages_done: 中止までに処理したページ数
+            page_count: 総ページ数
+        """
+        super().__init__(f"Job {job_id} cancelled at page {pages_done}/{page_count}")
+        self.job_id = job_id
+        self.pages_done = pages_done
+        self.page_count = page_count
+
+    @property
+    def pages_skipped(self) -> int:
+        """中止により処理しなかったページ数."""
+        return self.page_count - self.pages_done
+
+    @property
+    def progress(self) -> int:
+        """中止時点の進捗率（0〜100）."""
+        return int((self.pages_done / self.page_count) * 100) if self.page_count else 0
+
+
+class _CachedFlag:
+    """問い合わせ間隔を制限したキャンセルフラグのキャッシュ."""
+
+    def __init__(self, check_interval: float, clock: Callable[[], float]) -> None:
+        self.check_interval = check_interval
+        self._clock = clock
+        self._checked_at: float | None = None
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        """最後に確認したキャンセル状態."""
+        return self._cancelled
+
+    def needs_refresh(self) -> bool:
+        """Redisへの問い合わせが必要か（一度キャンセルを検知した後は不要）."""
+        if self._cancelled:
+            return False
+        return self._checked_at is None or self._clock() - self._checked_at >= self.check_interval
+
+    def update(self, cancelled: bool) -> None:
+        """問い合わせ結果を記録する."""
+        self._checked_at = self._clock()
+        self._cancelled = cancelled
+
+
+class CancellationToken:
+    """ジョブのキャンセルフラグを確認するトークン."""
+
+    def __init__(
+        self,
+        job_id: str,
+        redis_client: redis.Redis,
+        check_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            redis_client: Redisクライアント
+            check_interval: Redisに問い合わせる最小間隔（秒）
+            clock: 経過時間の計測に使う時計
+        """
+        self.job_id = job_id
+        self.redis_client = redis_client
+        self._flag = _CachedFlag(check_interval, clock)
+
+    def is_cancelled(self, refresh: bool = False) -> bool:
+        """ジョブがキャンセルされているかを返す.
+
+        Args:
+            refresh: True の場合はキャッシュの有効期間に関わらずRedisに問い合わせる
+
+        Returns:
+            bool: キャンセルされている場合は True
+        """
+        if refresh or self._flag.needs_refresh():
+            self._flag.update(bool(self.redis_client.exists(cancel_key(self.job_id))))
+        return self._flag.cancelled
+
+
+class AsyncCancellationToken:
+    """ジョブのキャンセルフラグを確認するトークン（asyncio版）."""
+
+    def __init__(
+        self,
+        job_id: str,
+        redis_client: aioredis.Redis,
+        check_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            redis_client: 非同期Redisクライアント
+            check_interval: Redisに問い合わせる最小間隔（秒）
+            clock: 経過時間の計測に使う時計
+        """
+        self.job_id = job_id
+        self.redis_client = redis_client
+        self._flag = _CachedFlag(check_interval, clock)
+
+    async def is_cancelled(self, refresh: bool = False) -> bool:
+        """ジョブがキャンセルされているかを返す.
+
+        Args:
+            refresh: True の場合はキャッシュの有効期間に関わらずRedisに問い合わせる
+
+        Returns:
+            bool: キャンセルされている場合は True
+        """
+        if refresh or self._flag.needs_refresh():
+            self._flag.update(bool(await self.redis_client.exists(cancel_key(self.job_id))))
+        return self._flag.cancelled
+
+
+@dataclass(frozen=True)
+class CancellationStats:
+    """キャンセルにより解放した処理量のスナップショット."""
+
+    cancelled_jobs: int
+    pages_skipped: int
+    seconds_freed: float
+
+    def to_dict(self) -> dict[str, int | float]:
+        """メトリクス出力用の辞書を返す."""
+        return {
+            "cancelled_jobs": self.cancelled_jobs,
+            "pages_skipped": self.pages_skipped,
+            "seconds_freed": round(self.seconds_freed, 2),
+        }
+
+
+class CancellationMetrics:
+    """キャンセルされたジョブと、それにより解放した処理時間を集計する."""
+
+    def __init__(self) -> None:
+        """初期化."""
+        self._lock = threading.Lock()
+        self._cancelled_jobs = 0
+        self._pages_skipped = 0
+        self._seconds_freed = 0.0
+
+    def record(self, error: JobCancelledError, page_seconds: float) -> None:
+        """キャンセルを記録する.
+
+        Args:
+            error: キャンセル時の例外（処理済み・未処理のページ数）
+            page_seconds: 1ページあたりの処理時間（解放した時間の推定に使用）
+        """
+        with self._lock:
+            self._cancelled_jobs += 1
+            self._pages_skipped += error.pages_skipped
+            self._seconds_freed += error.pages_skipped * page_seconds
+
+    def stats(self) -> CancellationStats:
+        """現在の集計値を返す."""
+        with self._lock:
+            return CancellationStats(
+                cancelled_jobs=self._cancelled_jobs,
+                pages_skipped=self._pages_skipped,
+                seconds_freed=self._seconds_freed,
+            )
@@ -0,0 +1,102 @@
+"""外部クライアントの遅延初期化モジュール.
+
+Redis・ストレージなどのクライアントを import 時ではなく最初の利用時に生成するプロキシを提供する。
+生成したプロセスのPIDを記録し、fork 後の子プロセスで最初に利用された時点で作り直すため、
+gunicorn の `--preload`（マスタープロセスでアプリを import してから fork する）と併用できる。
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+class LazyClient:
+    """最初の属性アクセス時にファクトリでクライアントを生成するプロキシ.
+
+    属性アクセスはすべて生成したクライアントに委譲する。クライアントを生成したプロセスと
+    現在のプロセスが異なる場合（fork 後）は、親プロセスのクライアント（ソケットなど）を使わずに
+    作り直す。生成はスレッド間で1回だけ行う。
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]) -> None:
+        """初期化.
+
+        Args:
+            name: クライアント名（ログ・メトリクス用）
+            factory: クライアントを生成する関数
+        """
+        self._name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self._pid: int | None = None
+        self._init_seconds: float | None = None
+        # fork 時に他のスレッドが生成中だった場合に備え、子プロセスではロックを作り直す
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self) -> None:
+        """fork 後の子プロセスでロックを作り直す."""
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        """クライアント名."""
+        return self._name
+
+    @property
+    def initialized(self) -> bool:
+        """現在のプロセスでクライアントを生成済みかどうか."""
+        return self._client is not None and self._pid == os.getpid()
+
+    @property
+    def init_seconds(self) -> float | None:
+        """現在のクライアントの生成にかかった時間（秒、未生成の場合は None）."""
+        return self._init_seconds if self.initialized else None
+
+    def get(self) -> Any:
+        """クライアントを返す（未生成・fork 後の場合は生成する）.
+
+        Returns:
+            Any: クライアント
+        """
+        if self.initialized:
+            return self._client
+        with self._lock:
+            if not self.initialized:
+                started = time.perf_counter()
+                self._client = self._factory()
+                self._init_seconds = time.perf_counter() - started
+                self._pid = os.getpid()
+        return self._client
+
+    def reset(self) -> None:
+        """生成済みのクライアントを破棄する（次の利用時に作り直す）."""
+        with self._lock:
+            self._client = None
+            self._pid = None
+            self._init_seconds = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        state = "initialized" if self.initialized else "uninitialized"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+def initialize(client: Any) -> Any:
+    """遅延初期化のプロキシであればクライアントを生成し、実体を返す.
+
+    ベンチマークなどでプロキシ以外のクライアントに差し替えられている場合はそのまま返す。
+
+    Args:
+        client: `LazyClient` またはクライアント
+
+    Returns:
+        Any: クライアントの実体
+    """
+    if isinstance(client, LazyClient):
+        return client.get()
+    return client
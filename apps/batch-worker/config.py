@@ -18,11 +18,72 @@ class Settings(BaseSettings):
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
+    redis_max_connections: int = 64
+
+    # 起動設定（Redis・ストレージクライアントを最初の利用時に生成し、gunicorn のワーカー起動直後に
+    # バックグラウンドでウォームアップする。/warmup はタイムアウトまでウォームアップの完了を待つ）
+    lazy_client_init: bool = True
+    warmup_on_start: bool = True
+    warmup_timeout_seconds: float = 30.0
+
+    # asyncio版ワーカー設定
+    async_storage_io_workers: int = 32
+    async_cpu_workers: int = 2
 
     # Pub/Sub設定
     pubsub_emulator_host: str | None = None
     pubsub_subscription: str = "pdf-processing-subscription"
+    pubsub_topic: str = "pdf-processing-topic"
     gcp_project_id: str | None = None
+    # 再発行するメッセージ本文のスキーマ（"1": JSON / "2": msgpack。受信はどちらも受け付ける）
+    # 全てのワーカーが v2 を受信できるようになってから "2" にする
+    message_schema_version: str = "1"
+
+    # 同時実行数制御（適応型リミッター、上限は gunicorn のスレッド数以下）
+    concurrency_limit_enabled: bool = True
+    concurrency_limit_initial: int = 4
+    concurrency_limit_min: int = 1
+    concurrency_limit_max: int = 8
+    concurrency_latency_tolerance: float = 2.0
+
+    # シャード分割設定（大きなPDFをページ範囲ごとのメッセージに分割して並列処理）
+    shard_enabled: bool = True
+    shard_min_pages: int = 100
+    shard_pages: int = 25
+
+    # トレーシング設定（TRACE_EXPORTER: none / console / file）
+    trace_exporter: str = "none"
+    trace_file_path: str = "./traces/worker-spans.jsonl"
+
+    # ジョブ単位のプロファイリング（無効時は判定も行わない。属性 profile=1 / フラグでも取得）
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0
+
+    # ジョブ履歴のアーカイブ（終了したジョブを history/ にまとめて書き込む）
+    history_enabled: bool = True
+    history_batch_size: int = 500
+    history_max_age_seconds: float = 300.0
+    history_check_interval_seconds: float = 30.0
+    # 履歴を保持する日数（0の場合は削除しない。前日以前のセグメントは1日1つにまとめる）
+    history_retention_days: int = 365
+    # 終了ステータスのRedis TTL（履歴をアーカイブする場合は短縮してメモリを削減できる）
+    terminal_status_ttl_seconds: int = 86400
+
+    # ストレージのGC（Redisのジョブステータスが期限切れになったジョブのオブジェクトを削除する）
+    # アップロードはステータスの登録より先に行われるため、最小経過時間より新しいオブジェクトは残す
+    storage_gc_prefixes: str = "uploads/,results/"
+    storage_gc_min_age_seconds: float = 3600.0
+    storage_gc_batch_size: int = 1000
+    storage_gc_concurrency: int = 8
+
+    # キャンセルフラグを確認する最小間隔（秒、ページの区切りでキャッシュを更新）
+    cancel_check_interval_seconds: float = 2.0
+
+    # モック処理設定（1ページあたりの解析時間、秒）
+    mock_page_delay_min: float = 3.0
+    mock_page_delay_max: float = 5.0
+    mock_page_count_min: int = 5
+    mock_page_count_max: int = 20
 
     model_config = SettingsConfigDict(
         env_file=".env",
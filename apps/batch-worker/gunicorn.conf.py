@@ -0,0 +1,27 @@
+"""gunicorn 設定.
+
+gunicorn はカレントディレクトリの `gunicorn.conf.py` を自動で読み込む。起動オプションは
+Dockerfile の CMD で指定し、ここではワーカープロセスのフックだけを定義する。
+
+CMD の `--preload` により、マスタープロセスで `worker` を import してから fork する。
+Redis・ストレージクライアントは遅延初期化のため fork 前には生成されず（生成済みでも子プロセスで
+作り直す）、ワーカープロセスの起動直後にバックグラウンドでウォームアップする。
+履歴のフラッシュスレッドも fork 後のワーカープロセスで開始する。
+"""
+
+from typing import Any
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """ワーカープロセスの起動直後に、ウォームアップと履歴のフラッシュスレッドを開始する.
+
+    Args:
+        server: gunicorn のアービター
+        worker: gunicorn のワーカー
+    """
+    import worker as app_module
+
+    if app_module.settings.warmup_on_start:
+        app_module.warm_up.start()
+    if app_module.history_archiver is not None:
+        app_module.history_flusher.start()
@@ -0,0 +1,495 @@
+"""ジョブ履歴のアーカイブモジュール.
+
+Redisのジョブステータスは TTL 付きで保持するため、長期の履歴はオブジェクトストレージに保存する。
+ワーカーは終了ステータス（completed / failed / cancelled）をステータスと同じパイプラインで
+アーカイブ待ちキュー（`history:queue`）に積み、`HistoryArchiver` がまとめて
+日付パーティションごとの gzip 圧縮 NDJSON セグメント（追記のみ）としてアップロードする。
+
+```
+history/
+├── index.json                               # セグメント一覧（日付・件数・ステータス別件数）
+└── dt=2026-10-19/
+    └── 20261019T120000Z-1a2b3c4d.ndjson.gz  # 1行1ジョブの履歴レコード
+```
+
+ジョブごとに最初の終了ステータスだけをキューに積む（`queue_history_record`）。再配信や
+シャードの中断で同じジョブの終了ステータスが再度書き込まれても、履歴は重複しない。
+
+フラッシュは Redis のロックで同時に1つまでに制限し、バッチごとにロックの有効期限を延長する
+（ロックを失った場合はそこで中止する）。セグメントのアップロードと索引の更新が完了してから、
+ロックを保持している場合だけキューを切り詰める（途中で失敗した場合は次回に同じレコードを
+再度書き込む）。索引は読み込んだ時の世代を指定して書き込み、他のプロセスが先に書き込んでいた
+場合は上書きせずに中止する。
+
+索引は書き込みのたびに全体を読み込み・書き直すため、大きさを制限する。前日以前の日付で
+複数のセグメントがある場合は1つのセグメントにまとめ（コンパクション）、保持期間
+（`retention_days`）より古い日付のセグメントは索引とストレージから削除する。索引のエントリ数は
+「保持期間の日数 + 当日のセグメント数」程度に収まる。
+
+Flask版ワーカーは `HistoryFlushThread` でバックグラウンドから定期的にフラッシュし、
+Pub/Sub の Push リクエストの処理ではフラッシュしない。
+
+実行例（キューを全てフラッシュする。Cloud Scheduler 等から定期実行する場合）:
+    python -m history flush
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import redis
+from loguru import logger
+
+from config import Settings
+from storage import PreconditionFailedError, StorageClient, get_storage_client
+
+# アーカイブ待ちキュー（list）と、フラッシュの排他ロック
+HISTORY_QUEUE_KEY = "history:queue"
+HISTORY_LOCK_KEY = "history:flush_lock"
+
+# 履歴ストアのパス
+HISTORY_PREFIX = "history/"
+HISTORY_INDEX_PATH = f"{HISTORY_PREFIX}index.json"
+
+# ロックの有効期限（バッチごとに延長する。フラッシュ中にワーカーが停止した場合の解放）
+FLUSH_LOCK_TTL_SECONDS = 120
+
+# 履歴キューに積んだジョブの印（`{prefix}{job_id}`）と、同じジョブの終了ステータスを積まない期間
+HISTORY_RECORDED_KEY_PREFIX = "history:recorded:"
+HISTORY_RECORDED_TTL_SECONDS = 86400
+
+# ロックの解放・延長とキューの切り詰めは、取得時のトークンと一致する場合だけ行う
+# （有効期限切れの後に他のプロセスが取得したロックを削除・延長せず、書き込んでいないレコードを
+# キューから取り除かない）
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+EXTEND_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+TRIM_QUEUE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    redis.call("LTRIM", KEYS[2], ARGV[2], -1)
+    return 1
+end
+return 0
+"""
+
+# ジョブの印が無い場合だけ印を付けて履歴レコードを積む
+QUEUE_RECORD_SCRIPT = """
+if redis.call("SET", KEYS[1], 1, "NX", "EX", ARGV[2]) then
+    return redis.call("RPUSH", KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+# 値が空の場合は履歴レコードから省略するフィールド
+_OPTIONAL_FIELDS = ("result_url", "error_msg", "latency")
+
+
+def history_record(job_id: str, status_data: dict[str, Any]) -> dict[str, Any]:
+    """終了ステータスから履歴レコードを組み立てる（空のフィールドは省略する）.
+
+    Args:
+        job_id: ジョブID
+        status_data: ステータスデータ（`processor.build_status_data` の戻り値）
+
+    Returns:
+        dict[str, Any]: 履歴レコード
+    """
+    record = {
+        "job_id": job_id,
+        "status": status_data["status"],
+        "progress": status_data["progress"],
+        "message": status_data["message"],
+        "updated_at": status_data["updated_at"],
+    }
+    for field in _OPTIONAL_FIELDS:
+        if status_data.get(field):
+            record[field] = status_data[field]
+    return record
+
+
+def queue_history_record(pipe: Any, job_id: str, status_data: dict[str, Any]) -> None:
+    """ジョブの最初の終了ステータスを履歴キューに積む処理をパイプラインに積む.
+
+    同期・非同期どちらのパイプラインにも使用できる。
+
+    Args:
+        pipe: Redisパイプライン
+        job_id: ジョブID
+        status_data: 終了ステータスのデータ（`processor.build_status_data` の戻り値）
+    """
+    pipe.eval(
+        QUEUE_RECORD_SCRIPT,
+        2,
+        f"{HISTORY_RECORDED_KEY_PREFIX}{job_id}",
+        HISTORY_QUEUE_KEY,
+        json.dumps(history_record(job_id, status_data)),
+        HISTORY_RECORDED_TTL_SECONDS,
+    )
+
+
+def segment_path(day: str, now: datetime) -> str:
+    """セグメントのストレージパスを返す.
+
+    Args:
+        day: 日付パーティション（YYYY-MM-DD）
+        now: 書き込み時刻
+
+    Returns:
+        str: セグメントのパス
+    """
+    return f"{HISTORY_PREFIX}dt={day}/{now:%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+
+
+class HistoryArchiver:
+    """アーカイブ待ちキューの履歴レコードを、まとめて履歴ストアに書き込む."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        storage_client: StorageClient,
+        batch_size: int = 500,
+        max_age_seconds: float = 300.0,
+        check_interval_seconds: float = 30.0,
+        retention_days: int = 365,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化.
+
+        Args:
+            redis_client: Redisクライアント
+            storage_client: ストレージクライアント（履歴ストアの書き込み先）
+            batch_size: 1セグメントにまとめる最大レコード数
+            max_age_seconds: バッチサイズに達していなくてもフラッシュする、最古のレコードの経過時間
+            check_interval_seconds: `maybe_flush` がキューを確認する最小間隔（インスタンスごと）
+            retention_days: 履歴を保持する日数（0の場合は削除しない）
+            clock: 確認間隔の計測に使う時計
+        """
+        self.redis_client = redis_client
+        self.storage_client = storage_client
+        self.batch_size = batch_size
+        self.max_age_seconds = max_age_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.retention_days = retention_days
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._checked_at: float | None = None
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._extend_lock_script = redis_client.register_script(EXTEND_LOCK_SCRIPT)
+        self._trim_queue = redis_client.register_script(TRIM_QUEUE_SCRIPT)
+
+    def maybe_flush(self) -> int:
+        """フラッシュの条件を満たしていればフラッシュする.
+
+        キューの確認は `check_interval_seconds` に1回まで。キューがバッチサイズに達しているか、
+        最古のレコードが `max_age_seconds` 以上経過している場合にフラッシュする。
+
+        Returns:
+            int: アーカイブしたレコード数
+        """
+        with self._lock:
+            now = self._clock()
+            checked_at = self._checked_at
+            if checked_at is not None and now - checked_at < self.check_interval_seconds:
+                return 0
+            self._checked_at = now
+
+        pending = self.redis_client.llen(HISTORY_QUEUE_KEY)
+        if not pending:
+            return 0
+        if pending < self.batch_size:
+            oldest = self.redis_client.lindex(HISTORY_QUEUE_KEY, 0)
+            if oldest is None:
+                return 0
+            updated_at = datetime.fromisoformat(json.loads(oldest)["updated_at"])
+            if (datetime.now(UTC) - updated_at).total_seconds() < self.max_age_seconds:
+                return 0
+        return self.flush(max_batches=1)
+
+    def flush(self, max_batches: int | None = None) -> int:
+        """キューの履歴レコードをバッチ単位で履歴ストアに書き込む.
+
+        Args:
+            max_batches: 書き込む最大バッチ数（None の場合はキューが空になるまで）
+
+        Returns:
+            int: アーカイブしたレコード数（他のインスタンスがフラッシュ中の場合は0）
+        """
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(HISTORY_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TTL_SECONDS):
+            return 0
+
+        archived = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                if batches and not self._extend_lock(token):
+                    logger.warning("Lost history flush lock, stopping")
+                    break
+                raw_records = self.redis_client.lrange(HISTORY_QUEUE_KEY, 0, self.batch_size - 1)
+                if not raw_records:
+                    break
+                try:
+                    self._write_batch([json.loads(raw) for raw in raw_records])
+                except PreconditionFailedError as e:
+                    logger.warning(f"History index was updated by another flusher, stopping: {e}")
+                    break
+                # 書き込みが完了したレコードだけを、ロックを保持している場合だけキューから取り除く
+                trimmed = self._trim_queue(
+                    keys=[HISTORY_LOCK_KEY, HISTORY_QUEUE_KEY], args=[token, len(raw_records)]
+                )
+                if not trimmed:
+                    logger.warning("Lost history flush lock before trimming the queue, stopping")
+                    break
+                archived += len(raw_records)
+                batches += 1
+                if len(raw_records) < self.batch_size:
+                    break
+        finally:
+            self._release_lock(keys=[HISTORY_LOCK_KEY], args=[token])
+
+        if archived:
+            logger.info(f"Archived {archived} job records to history ({batches} batches)")
+        return archived
+
+    def load_index(self) -> dict[str, Any]:
+        """履歴ストアの索引を読み込む（未作成の場合は空の索引）.
+
+        Returns:
+            dict[str, Any]: 索引（`segments` にセグメントの一覧）
+        """
+        return self._load_index_with_generation()[0]
+
+    def _load_index_with_generation(self) -> tuple[dict[str, Any], int]:
+        """索引と、その世代（未作成の場合は 0）を読み込む."""
+        try:
+            data, generation = self.storage_client.download_with_generation(HISTORY_INDEX_PATH)
+        except FileNotFoundError:
+            return {"version": 1, "segments": []}, 0
+        return json.loads(data), generation
+
+    def _extend_lock(self, token: str) -> bool:
+        """ロックを保持している場合は有効期限を延長する.
+
+        Returns:
+            bool: ロックを保持している場合は True
+        """
+        return bool(
+            self._extend_lock_script(keys=[HISTORY_LOCK_KEY], args=[token, FLUSH_LOCK_TTL_SECONDS])
+        )
+
+    def _write_batch(self, records: list[dict[str, Any]]) -> None:
+        """1バッチ分のレコードを日付ごとのセグメントに書き込み、索引に追加する.
+
+        Raises:
+            PreconditionFailedError: 索引を読み込んだ後に他のプロセスが索引を書き込んだ場合
+                （このバッチでアップロードしたセグメントは削除する）
+        """
+        # 再配信などで同じジョブが複数回終了した場合は、最後のレコードだけを残す
+        latest = {record["job_id"]: record for record in records}
+
+        by_day: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for record in latest.values():
+            by_day[record["updated_at"][:10]].append(record)
+
+        now = datetime.now(UTC)
+        entries = [
+            self._upload_segment(day, day_records, now)
+            for day, day_records in sorted(by_day.items())
+        ]
+
+        index, generation = self._load_index_with_generation()
+        indexed = {segment["path"] for segment in index["segments"]}
+        index["segments"].extend(entries)
+        retired = self._compact_index(index, now)
+        index["updated_at"] = now.isoformat()
+        try:
+            self.storage_client.upload_if_generation(
+                json.dumps(index).encode("utf-8"), HISTORY_INDEX_PATH, generation
+            )
+        except PreconditionFailedError:
+            # 索引に載らなかったセグメント（追加分・コンパクションの結果）は削除する
+            self.storage_client.delete_many(
+                [segment["path"] for segment in index["segments"] if segment["path"] not in indexed]
+            )
+            raise
+
+        # 索引から外したセグメントは、索引の書き込み後に削除する
+        if retired:
+            self.storage_client.delete_many(retired)
+
+    def _upload_segment(
+        self, day: str, records: list[dict[str, Any]], now: datetime
+    ) -> dict[str, Any]:
+        """1日分のレコードを1つのセグメントとしてアップロードする.
+
+        Args:
+            day: 日付パーティション（YYYY-MM-DD）
+            records: 履歴レコード（ジョブIDの重複なし）
+            now: 書き込み時刻
+
+        Returns:
+            dict[str, Any]: 索引のセグメント情報
+        """
+        records = sorted(records, key=lambda record: record["updated_at"], reverse=True)
+        path = segment_path(day, now)
+        body = "".join(json.dumps(record) + "\n" for record in records)
+        self.storage_client.upload_file(gzip.compress(body.encode("utf-8")), path)
+        return {
+            "path": path,
+            "date": day,
+            "count": len(records),
+            "first": records[-1]["updated_at"],
+            "last": records[0]["updated_at"],
+            "statuses": dict(Counter(record["status"] for record in records)),
+        }
+
+    def _compact_index(self, index: dict[str, Any], now: datetime) -> list[str]:
+        """索引の大きさを制限する（保持期間外の削除と、前日以前のセグメントのコンパクション）.
+
+        Args:
+            index: 索引（`segments` を置き換える）
+            now: 書き込み時刻
+
+        Returns:
+            list[str]: 索引から外したセグメントのパス
+        """
+        today = now.date().isoformat()
+        oldest = None
+        if self.retention_days > 0:
+            oldest = (now - timedelta(days=self.retention_days)).date().isoformat()
+
+        retired = []
+        by_day: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for segment in index["segments"]:
+            if oldest is not None and segment["date"] < oldest:
+                retired.append(segment["path"])
+            else:
+                by_day[segment["date"]].append(segment)
+
+        segments = []
+        for day, day_segments in sorted(by_day.items()):
+            if day < today and len(day_segments) > 1:
+                segments.append(self._merge_segments(day, day_segments, now))
+                retired.extend(segment["path"] for segment in day_segments)
+            else:
+                segments.extend(day_segments)
+        index["segments"] = segments
+        return retired
+
+    def _merge_segments(
+        self, day: str, segments: list[dict[str, Any]], now: datetime
+    ) -> dict[str, Any]:
+        """1日分の複数のセグメントを1つのセグメントにまとめる（1日分のレコードをメモリに読み込む）.
+
+        Args:
+            day: 日付パーティション（YYYY-MM-DD）
+            segments: 索引のセグメント情報
+            now: 書き込み時刻
+
+        Returns:
+            dict[str, Any]: まとめたセグメントの索引のセグメント情報
+        """
+        latest: dict[str, dict[str, Any]] = {}
+        # 古いセグメントから順に読み込み、同じジョブは新しいセグメントのレコードを残す
+        for segment in sorted(segments, key=lambda segment: segment["path"]):
+            body = gzip.decompress(self.storage_client.download_file(segment["path"]))
+            for line in body.decode("utf-8").splitlines():
+                if line:
+                    record = json.loads(line)
+                    latest[record["job_id"]] = record
+        logger.info(f"Compacted {len(segments)} history segments of {day}")
+        return self._upload_segment(day, list(latest.values()), now)
+
+
+class HistoryFlushThread:
+    """フラッシュ関数をバックグラウンドスレッドで定期的に呼び出す（プロセスごとに1つ）.
+
+    fork 後の子プロセスではスレッドを引き継がないため、子プロセスで再度 `start` する。
+    """
+
+    def __init__(self, flush: Callable[[], object], interval_seconds: float) -> None:
+        """初期化.
+
+        Args:
+            flush: フラッシュ関数（例外はログに記録して次の周期に再実行する）
+            interval_seconds: 呼び出し間隔（秒）
+        """
+        self._flush = flush
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._started = False
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        """fork 後の子プロセスで未開始の状態に戻す."""
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> bool:
+        """未開始の場合はスレッドを開始する.
+
+        Returns:
+            bool: スレッドを開始した場合は True
+        """
+        if self._started:
+            return False
+        with self._lock:
+            if self._started:
+                return False
+            threading.Thread(target=self._run, name="history-flush", daemon=True).start()
+            self._started = True
+            return True
+
+    def _run(self) -> None:
+        """`interval_seconds` ごとにフラッシュ関数を呼び出す."""
+        while True:
+            time.sleep(self.interval_seconds)
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Failed to flush job history: {e}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """アーカイブ待ちキューを全てフラッシュする（定期実行用のエントリーポイント）."""
+    parser = argparse.ArgumentParser(description="Flush archived job records to history storage")
+    parser.add_argument("command", choices=["flush"])
+    parser.parse_args(argv)
+
+    settings = Settings()
+    redis_client = redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+    archiver = HistoryArchiver(
+        redis_client,
+        get_storage_client(settings),
+        batch_size=settings.history_batch_size,
+        retention_days=settings.history_retention_days,
+    )
+    archived = archiver.flush()
+    print(f"Archived {archived} job records")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
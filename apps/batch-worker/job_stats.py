@@ -0,0 +1,80 @@
+"""ジョブ一覧のダッシュボード用カウンタモジュール.
+
+`job:*` を走査せずに件数や絞り込みを求められるよう、ステータスの書き込みと同じパイプラインで
+以下を更新する。
+
+- `stats:{bucket}`（hash）: 5分単位の時間バケットごとの submitted / completed / failed /
+  cancelled の件数、処理ページ数（pages）、完了ジョブの処理時間の合計（processing_ms）
+- `status:{status}`（sorted set）: ステータスごとのジョブID（スコアは最終更新時刻）。
+  ジョブは常に現在のステータスの集合だけに含まれる
+
+submitted と `status:pending` はフロントエンドがジョブ登録時に更新する。
+"""
+
+import time
+from typing import Any
+
+# 時間バケットの幅（秒）と、カウンタ・ステータス集合の保持期間
+STATS_BUCKET_SECONDS = 300
+STATS_RETENTION_SECONDS = 86400
+
+# ステータス集合を持つステータス
+JOB_STATUSES = ("pending", "processing", "completed", "failed", "cancelled")
+
+# 件数をカウンタに加算する終了ステータス
+COUNTED_STATUSES = ("completed", "failed", "cancelled")
+
+
+def stats_bucket_key(timestamp: float) -> str:
+    """時刻を含む時間バケットのRedisキーを返す."""
+    return f"stats:{int(timestamp) // STATS_BUCKET_SECONDS * STATS_BUCKET_SECONDS}"
+
+
+def status_set_key(status: str) -> str:
+    """ステータス集合のRedisキーを返す."""
+    return f"status:{status}"
+
+
+def queue_job_counters(
+    pipe: Any,
+    job_id: str,
+    status: str,
+    pages: int = 0,
+    processing_seconds: float | None = None,
+    count: bool = True,
+    now: float | None = None,
+) -> None:
+    """ステータスの遷移に伴うカウンタとステータス集合の更新をパイプラインに積む.
+
+    Args:
+        pipe: Redisパイプライン（同期・非同期どちらでも可）
+        job_id: ジョブID
+        status: 書き込むステータス
+        pages: この書き込みまでに新たに処理したページ数
+        processing_seconds: 完了ジョブの処理時間（秒）
+        count: False の場合は終了ステータスの件数を加算しない（同じジョブを複数回数えない場合）
+        now: 現在時刻（UNIX時刻、省略時は time.time()）
+    """
+    now = time.time() if now is None else now
+    bucket_key = stats_bucket_key(now)
+    counted = count and status in COUNTED_STATUSES
+    if pages:
+        pipe.hincrby(bucket_key, "pages", pages)
+    if counted:
+        pipe.hincrby(bucket_key, status, 1)
+        if processing_seconds is not None and status == "completed":
+            pipe.hincrby(bucket_key, "processing_ms", int(processing_seconds * 1000))
+    if pages or counted:
+        pipe.expire(bucket_key, STATS_RETENTION_SECONDS + STATS_BUCKET_SECONDS)
+
+    pipe.zadd(status_set_key(status), {job_id: now})
+    if status == "processing":
+        # 処理中の更新はページごとに行われるため、処理待ちからの移動だけを反映する
+        pipe.zrem(status_set_key("pending"), job_id)
+        return
+    for other in JOB_STATUSES:
+        if other != status:
+            pipe.zrem(status_set_key(other), job_id)
+    # 保持期間を過ぎたメンバー（停止したワーカーの処理中ジョブなど）を削除する
+    for other in JOB_STATUSES:
+        pipe.zremrangebyscore(status_set_key(other), "-inf", now - STATS_RETENTION_SECONDS)
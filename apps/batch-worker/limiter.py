@@ -0,0 +1,142 @@
+"""適応型同時実行数リミッター.
+
+観測したページ単位の処理レイテンシから AIMD（加算増加・乗算減少）で同時実行数の上限を調整する。
+上限に達した場合はリクエストを拒否し、Pub/Sub にリトライ可能なステータスを返して再配信させる。
+"""
+
+import threading
+from dataclasses import dataclass
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class LimiterStats:
+    """リミッターの状態スナップショット."""
+
+    limit: int
+    in_flight: int
+    accepted: int
+    rejected: int
+    baseline_latency: float | None
+    last_latency: float | None
+
+    def to_dict(self) -> dict[str, int | float | None]:
+        """メトリクス出力用の辞書を返す."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "baseline_latency": self.baseline_latency,
+            "last_latency": self.last_latency,
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD方式の適応型同時実行数リミッター.
+
+    - レイテンシが基準値（観測最小値を緩やかに追従）× `latency_tolerance` 以下で、かつ上限付近まで
+      使われている場合は上限を +1 する（加算増加）
+    - 基準値 × `latency_tolerance` を超えた場合は上限に `backoff_ratio` を掛ける（乗算減少）
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.9,
+        baseline_drift: float = 0.01,
+    ) -> None:
+        """初期化.
+
+        Args:
+            initial_limit: 初期上限
+            min_limit: 上限の最小値
+            max_limit: 上限の最大値（gunicorn のスレッド数以下にする）
+            latency_tolerance: 基準レイテンシに対して許容する倍率
+            backoff_ratio: 乗算減少の係数（0〜1）
+            baseline_drift: 基準レイテンシを1サンプルごとに引き上げる割合（環境変化への追従用）
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.baseline_drift = baseline_drift
+
+        self._lock = threading.Lock()
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._baseline: float | None = None
+        self._last_latency: float | None = None
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限."""
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        """実行枠を確保する.
+
+        Returns:
+            bool: 確保できた場合は True、上限に達している場合は False
+        """
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                self._rejected += 1
+                return False
+            self._in_flight += 1
+            self._accepted += 1
+            return True
+
+    def release(self, latency: float | None = None) -> None:
+        """実行枠を解放し、レイテンシのサンプルで上限を調整する.
+
+        Args:
+            latency: ページ単位の処理レイテンシ（秒）。失敗時など計測値が無い場合は None
+        """
+        with self._lock:
+            in_flight = self._in_flight
+            self._in_flight = max(0, self._in_flight - 1)
+            if latency is None or latency <= 0:
+                return
+
+            self._last_latency = latency
+            if self._baseline is None:
+                self._baseline = latency
+            else:
+                self._baseline = min(latency, self._baseline * (1 + self.baseline_drift))
+
+            previous = int(self._limit)
+            if latency > self._baseline * self.latency_tolerance:
+                self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+            elif in_flight * 2 >= previous:
+                # 上限の半分以上を使っている場合のみ増やす（空き枠があるのに上限だけ伸びるのを防ぐ）
+                self._limit = min(float(self.max_limit), self._limit + 1)
+
+            if int(self._limit) != previous:
+                logger.info(
+                    f"Concurrency limit changed: {previous} -> {int(self._limit)} "
+                    f"(latency={latency:.3f}s, baseline={self._baseline:.3f}s)"
+                )
+
+    def stats(self) -> LimiterStats:
+        """現在の状態を返す."""
+        with self._lock:
+            return LimiterStats(
+                limit=int(self._limit),
+                in_flight=self._in_flight,
+                accepted=self._accepted,
+                rejected=self._rejected,
+                baseline_latency=self._baseline,
+                last_latency=self._last_latency,
+            )
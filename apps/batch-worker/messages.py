@@ -0,0 +1,193 @@
+"""Pub/Sub Pushメッセージ解析モジュール.
+
+Flask版（worker.py）とasyncio版（async_worker.py）で共通のエンベロープ形式を扱う。
+
+メッセージ本文のスキーマ（v1: JSON / v2: msgpack）のエンコード・デコードは、フロントエンドと
+共有する `pdf_batch_shared.message_schema` で行う。
+"""
+
+import base64
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+from pdf_batch_shared.message_schema import (
+    JOB_COUNT_ATTRIBUTE,
+    SCHEMA_VERSION_ATTRIBUTE,
+    SCHEMA_VERSIONS,
+    MessageSchemaError,
+)
+from pdf_batch_shared.message_schema import decode_message_body as decode_schema_body
+
+
+class InvalidMessageError(Exception):
+    """Pushエンベロープまたはメッセージ本文が不正な場合の例外（400を返す）."""
+
+
+@dataclass(frozen=True)
+class JobMessage:
+    """ジョブメッセージ."""
+
+    job_id: str
+    pdf_path: str
+    # シャードメッセージの場合のページ範囲（`sharding.ShardSpec` のフィールド）
+    shard: dict[str, int] | None = None
+    # トレースコンテキストなどのメッセージ属性（traceparent, submitted_at, upload_ms）
+    attributes: dict[str, str] = field(default_factory=dict)
+    # Pub/Sub の publishTime（キュー待ち時間の計測に使用）
+    publish_time: str | None = None
+
+
+def decode_message_body(data: bytes, attributes: dict[str, str]) -> dict[str, Any]:
+    """メッセージ本文をスキーマのバージョンに従ってデコードする.
+
+    Args:
+        data: メッセージ本文
+        attributes: メッセージ属性
+
+    Returns:
+        dict[str, Any]: 単一ジョブ形式またはバッチ形式のメッセージ（v1 と同じキー）
+
+    Raises:
+        InvalidMessageError: 未知のスキーマのバージョン、または本文をデコードできない場合
+    """
+    try:
+        return decode_schema_body(data, attributes)
+    except MessageSchemaError as e:
+        raise InvalidMessageError(str(e)) from e
+
+
+def parse_push_envelope(envelope: Any) -> list[JobMessage]:
+    """Push型 Pub/Sub のエンベロープからジョブメッセージを取り出す.
+
+    Push型 Pub/Sub は以下のJSONフォーマットでPOSTリクエストを送信:
+    {
+        "message": {
+            "data": "base64エンコードされたメッセージ",
+            "attributes": {"traceparent": "...", ...},
+            "messageId": "...",
+            "publishTime": "..."
+        },
+        "subscription": "..."
+    }
+
+    メッセージ本文は v1（JSON）と v2（msgpack）の両方を受け付け、属性 `schema_version` が未知の
+    バージョンの場合は本文をデコードせずに拒否する。`schema_version` を設定する発行元
+    （`encode_job_message`）のメッセージは、ルーティング属性 `job_id`（単一ジョブ）または
+    `job_count`（バッチ）も本文をデコードする前に検証し、デコード後に本文と一致することを確認する。
+    メッセージ本文は単一ジョブ形式 `{"job_id": ..., "pdf_path": ...}` と、複数の小さなジョブを
+    まとめたバッチ形式 `{"jobs": [{"job_id": ..., "pdf_path": ...}, ...]}` の両方を受け付ける。
+    大きなPDFを分割したシャードメッセージは、単一ジョブ形式に `"shard": {...}` が加わる。
+    トレースコンテキストは単一ジョブ形式ではメッセージ属性、バッチ形式ではジョブごとの
+    `"trace": {...}` から取り出す。
+
+    Args:
+        envelope: リクエストボディ（JSONをパースしたもの）
+
+    Returns:
+        list[JobMessage]: ジョブメッセージ（単一ジョブ形式の場合は1件）
+
+    Raises:
+        InvalidMessageError: 必須フィールドが欠けている・本文をデコードできない場合
+    """
+    if not envelope:
+        logger.error("No JSON body received")
+        raise InvalidMessageError("no JSON body")
+
+    # Pub/Subメッセージを抽出
+    if "message" not in envelope:
+        logger.error("Invalid Pub/Sub message format: missing 'message' field")
+        raise InvalidMessageError("missing message field")
+
+    pubsub_message = envelope["message"]
+
+    # Base64エンコードされたデータをデコード
+    if "data" not in pubsub_message:
+        logger.error("Invalid Pub/Sub message: missing 'data' field")
+        raise InvalidMessageError("missing data field")
+
+    # スキーマのバージョンは本文をデコードする前に確認する
+    attributes = pubsub_message.get("attributes") or {}
+    schema_version = attributes.get(SCHEMA_VERSION_ATTRIBUTE, "1")
+    if schema_version not in SCHEMA_VERSIONS:
+        logger.error(f"Unsupported message schema version: {schema_version}")
+        raise InvalidMessageError(f"unsupported schema version: {schema_version}")
+
+    expected_job_id, expected_job_count = _routing_attributes(attributes)
+
+    publish_time = pubsub_message.get("publishTime")
+    message_dict = decode_message_body(base64.b64decode(pubsub_message["data"]), attributes)
+    logger.info(f"Received message (schema v{schema_version}): {message_dict}")
+
+    # メッセージパース
+    if "jobs" in message_dict:
+        job_dicts = message_dict["jobs"]
+        if not isinstance(job_dicts, list) or not job_dicts:
+            logger.error(f"Invalid batch message format: {message_dict}")
+            raise InvalidMessageError("jobs must be a non-empty list")
+    else:
+        job_dicts = [message_dict]
+
+    if expected_job_count is not None and len(job_dicts) != expected_job_count:
+        logger.error(f"Job count mismatch: attribute {expected_job_count}, body {len(job_dicts)}")
+        raise InvalidMessageError("job_count attribute does not match message body")
+    if expected_job_id is not None and job_dicts[0].get("job_id") != expected_job_id:
+        logger.error(f"Job ID mismatch: attribute {expected_job_id}, body {job_dicts[0]}")
+        raise InvalidMessageError("job_id attribute does not match message body")
+
+    jobs = []
+    for job_dict in job_dicts:
+        job_id = job_dict.get("job_id")
+        pdf_path = job_dict.get("pdf_path")
+
+        if not job_id or not pdf_path:
+            logger.error(f"Invalid message format: {job_dict}")
+            raise InvalidMessageError("missing job_id or pdf_path")
+
+        shard = job_dict.get("shard")
+        if shard is not None and not isinstance(shard, dict):
+            logger.error(f"Invalid shard format: {job_dict}")
+            raise InvalidMessageError("shard must be an object")
+
+        jobs.append(
+            JobMessage(
+                job_id=job_id,
+                pdf_path=pdf_path,
+                shard=shard,
+                attributes=job_dict.get("trace") or attributes,
+                publish_time=publish_time,
+            )
+        )
+    return jobs
+
+
+def _routing_attributes(attributes: dict[str, str]) -> tuple[str | None, int | None]:
+    """本文をデコードする前に、ルーティング属性を検証して取り出す.
+
+    属性 `schema_version` の無いメッセージ（ルーティング属性を設定しない発行元）は検証しない。
+
+    Args:
+        attributes: メッセージ属性
+
+    Returns:
+        tuple[str | None, int | None]: 単一ジョブのジョブIDとバッチのジョブ数（該当しない方は None）
+
+    Raises:
+        InvalidMessageError: ジョブIDもジョブ数も無い、またはジョブ数が正の整数でない場合
+    """
+    if SCHEMA_VERSION_ATTRIBUTE not in attributes:
+        return None, None
+
+    job_count = attributes.get(JOB_COUNT_ATTRIBUTE)
+    if job_count is None:
+        job_id = attributes.get("job_id")
+        if not job_id:
+            logger.error(f"Missing job_id attribute: {attributes}")
+            raise InvalidMessageError("missing job_id attribute")
+        return job_id, None
+
+    if not job_count.isdigit() or int(job_count) < 1:
+        logger.error(f"Invalid job_count attribute: {job_count}")
+        raise InvalidMessageError("job_count attribute must be a positive integer")
+    return None, int(job_count)
@@ -3,22 +3,200 @@
 PDFのページ数をランダム生成し、各ページの処理を模擬してRedisステータスを更新する。
 """
 
+import contextvars
 import json
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import UTC, datetime
+from typing import Any
 
 import redis
 from loguru import logger
 
+from cancellation import CancellationToken, JobCancelledError
+from history import queue_history_record
+from job_stats import queue_job_counters
 from storage import StorageClient
+from tracing import JobTiming, get_tracer
+
+# ジョブステータスのTTL（24時間）
+STATUS_TTL_SECONDS = 86400
+
+# 終了ステータス（履歴ストアへのアーカイブ対象）
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# 終了ステータスのTTLと履歴キューへの追加有無（`configure_status_store` で設定）
+_terminal_status_ttl = STATUS_TTL_SECONDS
+_archive_history = False
+
+
+def configure_status_store(
+    archive_history: bool, terminal_status_ttl: int = STATUS_TTL_SECONDS
+) -> None:
+    """終了ステータスの書き込み方法を設定する.
+
+    Args:
+        archive_history: True の場合は終了ステータスを履歴のアーカイブ待ちキューにも積む
+        terminal_status_ttl: 終了ステータスのTTL（秒、履歴をアーカイブする場合は短縮できる）
+    """
+    global _terminal_status_ttl, _archive_history
+    _archive_history = archive_history
+    _terminal_status_ttl = terminal_status_ttl
+
+
+def job_key(job_id: str) -> str:
+    """ジョブステータスのRedisキーを返す."""
+    return f"job:{job_id}"
+
+
+def result_path_for(job_id: str) -> str:
+    """結果ファイルのストレージパスを返す."""
+    return f"results/{job_id}/result.json"
+
+
+def queue_status(
+    pipe: Any,
+    job_id: str,
+    status_data: dict[str, Any],
+    pages: int = 0,
+    processing_seconds: float | None = None,
+    count: bool = True,
+) -> None:
+    """ステータスの書き込みをパイプラインに積む.
+
+    ダッシュボード用のカウンタとステータス集合（`job_stats.queue_job_counters`）も同じパイプラインで
+    更新する。終了ステータスは短縮したTTLで書き込み、ジョブの最初の終了ステータスだけを
+    履歴のアーカイブ待ちキューにも積む（`history.queue_history_record`）。
+    同期・非同期どちらのパイプラインにも使用できる。
+
+    Args:
+        pipe: Redisパイプライン
+        job_id: ジョブID
+        status_data: ステータスデータ（`build_status_data` の戻り値）
+        pages: 前回の書き込み以降に処理したページ数
+        processing_seconds: 完了ジョブの処理時間（秒）
+        count: False の場合は終了ステータスの件数をカウンタに加算しない
+    """
+    status = status_data["status"]
+    queue_job_counters(pipe, job_id, status, pages, processing_seconds, count)
+    if status not in TERMINAL_STATUSES:
+        pipe.setex(job_key(job_id), STATUS_TTL_SECONDS, json.dumps(status_data))
+        return
+    pipe.setex(job_key(job_id), _terminal_status_ttl, json.dumps(status_data))
+    if _archive_history:
+        queue_history_record(pipe, job_id, status_data)
+
+
+def save_status(
+    redis_client: redis.Redis,
+    job_id: str,
+    status_data: dict[str, Any],
+    pages: int = 0,
+    processing_seconds: float | None = None,
+    count: bool = True,
+) -> None:
+    """ステータスを書き込む（カウンタ・履歴キューの更新と1回のパイプラインで書き込む）.
+
+    Args:
+        redis_client: Redisクライアント
+        job_id: ジョブID
+        status_data: ステータスデータ（`build_status_data` の戻り値）
+        pages: 前回の書き込み以降に処理したページ数
+        processing_seconds: 完了ジョブの処理時間（秒）
+        count: False の場合は終了ステータスの件数をカウンタに加算しない
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    queue_status(pipe, job_id, status_data, pages, processing_seconds, count)
+    pipe.execute()
+
+
+def build_status_data(
+    status: str,
+    progress: int,
+    message: str,
+    result_url: str = "",
+    error_msg: str = "",
+    latency: dict[str, float | None] | None = None,
+) -> dict[str, Any]:
+    """Redisに保存するステータスデータを組み立てる.
+
+    Args:
+        status: ステータス（processing, completed, failed, cancelled）
+        progress: 進捗率（0〜100）
+        message: ステータスメッセージ
+        result_url: 結果ファイルのURL（完了時のみ）
+        error_msg: エラーメッセージ（失敗時のみ）
+        latency: レイテンシ内訳（完了時のみ、`tracing.JobTiming.breakdown` を参照）
+
+    Returns:
+        dict[str, Any]: ステータスデータ
+    """
+    status_data: dict[str, Any] = {
+        "status": status,
+        "progress": progress,
+        "message": message,
+        "result_url": result_url,
+        "error_msg": error_msg,
+        "updated_at": datetime.now(UTC).isoformat(),
+    }
+    if latency is not None:
+        status_data["latency"] = latency
+    return status_data
+
+
+def build_cancelled_status(pages_done: int, page_count: int) -> dict[str, Any]:
+    """キャンセル時のステータスデータを組み立てる.
+
+    Args:
+        pages_done: 中止までに処理したページ数
+        page_count: 総ページ数
+
+    Returns:
+        dict[str, Any]: ステータスデータ
+    """
+    progress = int((pages_done / page_count) * 100) if page_count else 0
+    return build_status_data(
+        status="cancelled",
+        progress=progress,
+        message=f"Cancelled at page {pages_done}/{page_count}",
+    )
+
+
+def build_result_data(job_id: str, page_count: int, processing_time: float) -> bytes:
+    """結果ファイル（JSON）のバイトデータを組み立てる.
+
+    Args:
+        job_id: ジョブID
+        page_count: ページ数
+        processing_time: 処理時間（秒）
+
+    Returns:
+        bytes: 結果ファイルのバイトデータ
+    """
+    result_data = {
+        "job_id": job_id,
+        "pages": page_count,
+        "processed_at": datetime.now(UTC).isoformat(),
+        "processing_time_seconds": round(processing_time, 2),
+    }
+    return json.dumps(result_data, indent=2).encode("utf-8")
 
 
 class PDFProcessor:
     """PDF処理クラス（モック実装）."""
 
     def __init__(
-        self, job_id: str, pdf_path: str, storage_client: StorageClient, redis_client: redis.Redis
+        self,
+        job_id: str,
+        pdf_path: str,
+        storage_client: StorageClient,
+        redis_client: redis.Redis,
+        page_delay_range: tuple[float, float] = (3.0, 5.0),
+        page_count_range: tuple[int, int] = (5, 20),
+        cancel_check_interval: float | None = None,
+        timing: JobTiming | None = None,
     ) -> None:
         """初期化.
 
@@ -27,13 +205,24 @@ class PDFProcessor:
             pdf_path: PDFファイルのストレージパス
             storage_client: ストレージクライアント
             redis_client: Redisクライアント
+            page_delay_range: 1ページあたりの解析時間の範囲（秒, 最小〜最大）
+            page_count_range: モックのページ数の範囲（最小〜最大）
+            cancel_check_interval: キャンセルフラグを確認する最小間隔（秒, None の場合は確認しない）
+            timing: レイテンシ内訳の計測点（完了ステータスに内訳を記録する場合に指定）
         """
         self.job_id = job_id
         self.pdf_path = pdf_path
         self.storage_client = storage_client
         self.redis_client = redis_client
+        self.page_delay_range = page_delay_range
+        self.timing = timing
+        self.cancel_token = (
+            CancellationToken(job_id, redis_client, cancel_check_interval)
+            if cancel_check_interval is not None
+            else None
+        )
         # モック: ランダムにページ数を生成
-        self.page_count = random.randint(5, 20)
+        self.page_count = random.randint(*page_count_range)
         logger.info(f"[{self.job_id}] PDF has {self.page_count} pages (mock)")
 
     def process(self) -> str:
@@ -43,42 +232,46 @@ class PDFProcessor:
             str: 結果ファイルのパス（例: "results/{job_id}/result.json"）
 
         Raises:
+            JobCancelledError: ジョブがキャンセルされ、ページの区切りで中止した場合
             Exception: 処理中にエラーが発生した場合
         """
         start_time = time.time()
 
-        # 処理開始ステータス更新
-        self._update_status(status="processing", progress=0, message="Processing started...")
+        try:
+            # 処理待ちの間にキャンセルされたジョブは開始しない
+            self.check_cancelled(0)
 
-        # 各ページ処理
-        for page_num in range(1, self.page_count + 1):
-            # ページ解析シミュレーション（3〜5秒のスリープ）
-            sleep_duration = random.uniform(3, 5)
-            time.sleep(sleep_duration)
+            # 処理開始ステータス更新
+            self._update_status(status="processing", progress=0, message="Processing started...")
+
+            # 各ページ処理
+            for page_num in range(1, self.page_count + 1):
+                self.analyze_page(page_num)
 
-            # 進捗率計算
-            progress = int((page_num / self.page_count) * 100)
-            message = f"Page {page_num}/{self.page_count} analyzing..."
+                # 進捗率計算
+                progress, message = self.page_progress(page_num)
 
-            # Redis更新
-            self._update_status(status="processing", progress=progress, message=message)
-            logger.info(f"[{self.job_id}] {message} ({progress}%)")
+                # Redis更新
+                self._update_status(
+                    status="processing", progress=progress, message=message, pages=1
+                )
+                logger.info(f"[{self.job_id}] {message} ({progress}%)")
+
+                if page_num < self.page_count:
+                    self.check_cancelled(page_num)
+        except JobCancelledError as e:
+            save_status(
+                self.redis_client, self.job_id, build_cancelled_status(e.pages_done, e.page_count)
+            )
+            logger.info(f"[{self.job_id}] {e}")
+            raise
 
         # 処理完了
         end_time = time.time()
         processing_time = end_time - start_time
 
         # 結果ファイル生成
-        result_data = {
-            "job_id": self.job_id,
-            "pages": self.page_count,
-            "processed_at": datetime.now(UTC).isoformat(),
-            "processing_time_seconds": round(processing_time, 2),
-        }
-
-        result_path = f"results/{self.job_id}/result.json"
-        result_bytes = json.dumps(result_data, indent=2).encode("utf-8")
-        self.storage_client.upload_file(result_bytes, result_path)
+        result_path = self.write_result(processing_time)
 
         # 完了ステータス更新
         self._update_status(
@@ -86,11 +279,83 @@ class PDFProcessor:
             progress=100,
             message="Processing completed!",
             result_url=result_path,
+            latency=self.latency_breakdown(processing_time),
+            processing_seconds=processing_time,
         )
 
         logger.info(f"[{self.job_id}] Processing completed in {processing_time:.2f}s")
         return result_path
 
+    def analyze_page(self, page_num: int) -> None:
+        """1ページを解析する（モック: デフォルト3〜5秒のスリープ）.
+
+        Args:
+            page_num: ページ番号
+        """
+        with get_tracer().span("analyze_page", job_id=self.job_id, page=page_num):
+            sleep_duration = random.uniform(*self.page_delay_range)
+            time.sleep(sleep_duration)
+
+    def latency_breakdown(self, processing_time: float) -> dict[str, float | None] | None:
+        """完了ステータスに記録するレイテンシ内訳を返す.
+
+        Args:
+            processing_time: ワーカーでの処理時間（秒）
+
+        Returns:
+            dict[str, float | None] | None: レイテンシ内訳（計測点が無い場合は None）
+        """
+        if self.timing is None:
+            return None
+        return self.timing.breakdown(processing_time, time.time())
+
+    def check_cancelled(self, pages_done: int) -> None:
+        """キャンセルされていれば途中結果を削除して処理を中止する.
+
+        キャンセルフラグはローカルにキャッシュされ、Redisへの問い合わせは一定間隔に1回のみ。
+
+        Args:
+            pages_done: 処理済みのページ数
+
+        Raises:
+            JobCancelledError: ジョブがキャンセルされている場合
+        """
+        if self.cancel_token is None or not self.cancel_token.is_cancelled():
+            return
+        self.cleanup_partial_results()
+        raise JobCancelledError(self.job_id, pages_done, self.page_count)
+
+    def cleanup_partial_results(self) -> None:
+        """途中まで出力した結果ファイルを削除する."""
+        self.storage_client.delete_file(result_path_for(self.job_id))
+
+    def page_progress(self, page_num: int) -> tuple[int, str]:
+        """ページ処理後の進捗率とステータスメッセージを返す.
+
+        Args:
+            page_num: 処理済みのページ番号
+
+        Returns:
+            tuple[int, str]: 進捗率（0〜100）とメッセージ
+        """
+        progress = int((page_num / self.page_count) * 100)
+        return progress, f"Page {page_num}/{self.page_count} analyzing..."
+
+    def write_result(self, processing_time: float) -> str:
+        """結果ファイルをストレージに保存し、パスを返す.
+
+        Args:
+            processing_time: 処理時間（秒）
+
+        Returns:
+            str: 結果ファイルのパス
+        """
+        result_path = result_path_for(self.job_id)
+        result_bytes = build_result_data(self.job_id, self.page_count, processing_time)
+        with get_tracer().span("upload_result", job_id=self.job_id, bytes=len(result_bytes)):
+            self.storage_client.upload_file(result_bytes, result_path)
+        return result_path
+
     def _update_status(
         self,
         status: str,
@@ -98,25 +363,199 @@ class PDFProcessor:
         message: str,
         result_url: str = "",
         error_msg: str = "",
+        latency: dict[str, float | None] | None = None,
+        pages: int = 0,
+        processing_seconds: float | None = None,
     ) -> None:
-        """Redisにステータスを書き込む（TTL: 24時間）.
+        """Redisにステータスを書き込む（TTL: 24時間、終了ステータスは `save_status` を参照）.
 
         Args:
-            status: ステータス（processing, completed, failed）
+            status: ステータス（processing, completed, failed, cancelled）
             progress: 進捗率（0〜100）
             message: ステータスメッセージ
             result_url: 結果ファイルのURL（完了時のみ）
             error_msg: エラーメッセージ（失敗時のみ）
+            latency: レイテンシ内訳（完了時のみ）
+            pages: 前回の書き込み以降に処理したページ数（カウンタに加算）
+            processing_seconds: 処理時間（完了時のみ、カウンタに加算）
         """
-        job_key = f"job:{self.job_id}"
-        status_data = {
-            "status": status,
-            "progress": progress,
-            "message": message,
-            "result_url": result_url,
-            "error_msg": error_msg,
-            "updated_at": datetime.now(UTC).isoformat(),
-        }
-        # TTL 24時間（86400秒）を設定
-        self.redis_client.setex(job_key, 86400, json.dumps(status_data))
+        status_data = build_status_data(status, progress, message, result_url, error_msg, latency)
+        with get_tracer().span("redis.set_status", job_id=self.job_id, status=status):
+            save_status(self.redis_client, self.job_id, status_data, pages, processing_seconds)
         logger.debug(f"[{self.job_id}] Status updated: {status} ({progress}%)")
+
+
+@dataclass
+class _BatchJobState:
+    """バッチ内の1ジョブの処理状態."""
+
+    processor: PDFProcessor
+    start_time: float
+    next_page: int = 1
+    result_path: str | None = None
+    error: Exception | None = None
+    # 次のステータス書き込みでカウンタに加算する値
+    pages_pending: int = 0
+    processing_time: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.result_path is not None or self.error is not None
+
+
+class BatchPDFProcessor:
+    """複数の小さなPDFを1回の配信でまとめて処理するクラス（モック実装）.
+
+    バッチ内のジョブはジョブごとのスレッドで並行に処理する。各ティックで未完了のジョブを
+    1ページずつ並行に進め、そのティックのステータス更新を1回のパイプラインでまとめて書き込む。
+    ストレージ・Redisのクライアントは全ジョブで共有し、ステータスと結果ファイルはジョブごとに
+    出力する。
+
+    ティックは最も遅いページの完了を待つため、ページの解析時間のばらつきが大きいほど
+    単一ジョブの配信より各ジョブの完了が遅れる（Redisの往復回数の削減とのトレードオフ）。
+    """
+
+    def __init__(
+        self,
+        jobs: list[tuple[str, str]],
+        storage_client: StorageClient,
+        redis_client: redis.Redis,
+        page_delay_range: tuple[float, float] = (3.0, 5.0),
+        page_count_range: tuple[int, int] = (5, 20),
+        cancel_check_interval: float | None = None,
+        timings: dict[str, JobTiming] | None = None,
+    ) -> None:
+        """初期化.
+
+        Args:
+            jobs: (ジョブID, PDFファイルのストレージパス) のリスト
+            storage_client: ストレージクライアント
+            redis_client: Redisクライアント
+            page_delay_range: 1ページあたりの解析時間の範囲（秒, 最小〜最大）
+            page_count_range: モックのページ数の範囲（最小〜最大）
+            cancel_check_interval: キャンセルフラグを確認する最小間隔（秒, None の場合は確認しない）
+            timings: ジョブID → レイテンシ内訳の計測点
+        """
+        timings = timings or {}
+        self.processors = [
+            PDFProcessor(
+                job_id,
+                pdf_path,
+                storage_client,
+                redis_client,
+                page_delay_range,
+                page_count_range,
+                cancel_check_interval,
+                timings.get(job_id),
+            )
+            for job_id, pdf_path in jobs
+        ]
+        self.redis_client = redis_client
+
+    @property
+    def page_count(self) -> int:
+        """バッチ全体のページ数."""
+        return sum(processor.page_count for processor in self.processors)
+
+    @property
+    def tick_count(self) -> int:
+        """バッチ全体の処理に要するティック数（最もページ数の多いジョブのページ数）."""
+        return max((processor.page_count for processor in self.processors), default=0)
+
+    def process(self) -> dict[str, str | Exception]:
+        """バッチ内の全ジョブを処理する.
+
+        1ジョブの失敗は他のジョブに影響せず、そのジョブのステータスのみ failed になる。
+        キャンセルされたジョブはページの区切りで中止し、ステータスは cancelled になる。
+
+        Returns:
+            dict[str, str | Exception]: ジョブID → 結果ファイルのパス
+                （失敗時は例外、キャンセル時は JobCancelledError）
+        """
+        start_time = time.time()
+        states = [_BatchJobState(processor, start_time) for processor in self.processors]
+
+        # 処理開始ステータス更新（全ジョブ分を1回で書き込む）
+        self._write_statuses(
+            [
+                (
+                    state,
+                    build_status_data(
+                        status="processing", progress=0, message="Processing started..."
+                    ),
+                )
+                for state in states
+            ]
+        )
+
+        with ThreadPoolExecutor(
+            max_workers=max(len(states), 1), thread_name_prefix="batch-job"
+        ) as executor:
+            while not all(state.done for state in states):
+                # 各スレッドにはこのスレッドのコンテキストを渡す（スパンの親子関係を保つ）
+                active = [state for state in states if not state.done]
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._advance, state)
+                    for state in active
+                ]
+                results = [future.result() for future in futures]
+                self._write_statuses(list(zip(active, results, strict=True)))
+
+        logger.info(f"Batch of {len(states)} jobs completed in {time.time() - start_time:.2f}s")
+        return {
+            state.processor.job_id: state.result_path if state.error is None else state.error
+            for state in states
+        }
+
+    def _advance(self, state: _BatchJobState) -> dict[str, Any]:
+        """ジョブを1ページ進め、書き込むべきステータスを返す."""
+        processor = state.processor
+        try:
+            processor.check_cancelled(state.next_page - 1)
+            processor.analyze_page(state.next_page)
+            state.pages_pending += 1
+            progress, message = processor.page_progress(state.next_page)
+            logger.info(f"[{processor.job_id}] {message} ({progress}%)")
+            state.next_page += 1
+            if state.next_page <= processor.page_count:
+                return build_status_data(status="processing", progress=progress, message=message)
+
+            processing_time = time.time() - state.start_time
+            state.processing_time = processing_time
+            state.result_path = processor.write_result(processing_time)
+            logger.info(f"[{processor.job_id}] Processing completed in {processing_time:.2f}s")
+            return build_status_data(
+                status="completed",
+                progress=100,
+                message="Processing completed!",
+                result_url=state.result_path,
+                latency=processor.latency_breakdown(processing_time),
+            )
+        except JobCancelledError as e:
+            logger.info(f"[{processor.job_id}] {e}")
+            state.error = e
+            return build_cancelled_status(e.pages_done, e.page_count)
+        except Exception as e:
+            logger.error(f"[{processor.job_id}] Error processing job in batch: {e}")
+            state.error = e
+            return build_status_data(
+                status="failed", progress=0, message="Error occurred", error_msg=str(e)
+            )
+
+    def _write_statuses(self, updates: list[tuple[_BatchJobState, dict[str, Any]]]) -> None:
+        """複数ジョブのステータスを1回のパイプラインで書き込む（TTL: 24時間）."""
+        if not updates:
+            return
+        with get_tracer().span("redis.set_status_batch", jobs=len(updates)):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for state, status_data in updates:
+                queue_status(
+                    pipe,
+                    state.processor.job_id,
+                    status_data,
+                    pages=state.pages_pending,
+                    processing_seconds=state.processing_time,
+                )
+                state.pages_pending = 0
+            pipe.execute()
+        logger.debug(f"Status updated for {len(updates)} jobs in one pipeline")
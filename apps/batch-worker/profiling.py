@@ -0,0 +1,302 @@
+"""ジョブ単位のプロファイリングモジュール.
+
+処理が極端に遅いPDFを本番環境で調査するため、`PDFProcessor.process` の実行中だけ
+CPUプロファイル（cProfile）とメモリスナップショット（tracemalloc）を取得し、
+`profiles/{job_id}/` にアップロードする。
+
+取得対象は以下のいずれかで決まる（`PROFILE_ENABLED=true` の場合のみ判定する）。
+
+- メッセージ属性 `profile=1`
+- サンプリング（`PROFILE_SAMPLE_RATE` の確率）
+- ジョブ単位のフラグ（`profile_request:{job_id}` キー、プロファイルの取得を開始した時点で消費する）
+
+取得対象のジョブはシャード分割・バッチ処理の対象外とし、1インスタンスで単一ジョブとして処理する
+（サンプリングの場合はシャード分割を優先し、プロファイルは取得しない）。
+無効時はワーカーが判定処理自体を呼び出さないため、通常のジョブには一切オーバーヘッドを加えない。
+"""
+
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime
+from types import TracebackType
+from typing import Any
+
+import redis
+from loguru import logger
+
+from storage import StorageClient
+
+# プロファイル取得を要求するメッセージ属性
+PROFILE_ATTRIBUTE = "profile"
+
+# プロファイル結果（サマリー）の保持期間（ジョブステータスと同じ24時間）
+PROFILE_TTL_SECONDS = 86400
+
+# cpu.txt / memory.txt に出力する上位件数
+CPU_REPORT_LIMIT = 40
+MEMORY_REPORT_LIMIT = 25
+
+# tracemalloc が記録するスタックの深さ
+TRACEMALLOC_FRAMES = 10
+
+# cProfile はプロセス内で同時に1つしか有効にできないため、取得中のジョブは1件までに制限する
+_profile_lock = threading.Lock()
+
+
+def profile_request_key(job_id: str) -> str:
+    """ジョブ単位のプロファイル要求フラグのRedisキーを返す."""
+    return f"profile_request:{job_id}"
+
+
+def profile_key(job_id: str) -> str:
+    """プロファイル結果（サマリー）のRedisキーを返す."""
+    return f"profile:{job_id}"
+
+
+def profile_prefix(job_id: str) -> str:
+    """プロファイルファイルのストレージパスのプレフィックスを返す."""
+    return f"profiles/{job_id}/"
+
+
+def profile_requested(attributes: Mapping[str, str]) -> bool:
+    """メッセージ属性でプロファイルの取得が要求されているかを返す."""
+    return attributes.get(PROFILE_ATTRIBUTE, "").lower() in ("1", "true")
+
+
+class ProfilingPolicy:
+    """ジョブのプロファイルを取得するかを判定する."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        sample_rate: float = 0.0,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """初期化.
+
+        Args:
+            redis_client: Redisクライアント（ジョブ単位のフラグの確認に使用）
+            sample_rate: ランダムに取得する確率（0〜1）
+            rng: 0以上1未満の乱数を返す関数
+        """
+        self.redis_client = redis_client
+        self.sample_rate = sample_rate
+        self._rng = rng
+
+    def reason(self, job_id: str, attributes: Mapping[str, str]) -> str | None:
+        """プロファイルを取得する理由を返す.
+
+        Args:
+            job_id: ジョブID
+            attributes: Pub/Sub メッセージ属性
+
+        Returns:
+            str | None: "attribute" / "sampled" / "flag"（取得しない場合は None）
+        """
+        if profile_requested(attributes):
+            return "attribute"
+        if self.sample_rate > 0 and self._rng() < self.sample_rate:
+            return "sampled"
+        # フラグはここでは消費しない（他のジョブの取得中でスキップした場合に残すため、
+        # `JobProfiler` が取得を開始した時点で削除する）
+        if self.redis_client.exists(profile_request_key(job_id)):
+            return "flag"
+        return None
+
+
+class JobProfiler:
+    """処理中のCPUプロファイルとメモリスナップショットを取得するコンテキストマネージャ.
+
+    CPUプロファイルは呼び出し元スレッドのみが対象。tracemalloc はプロセス全体の割り当てを
+    記録するため、同時に処理中の他のジョブの割り当ても含まれる。
+    処理が例外で終了した場合もプロファイルをアップロードし、例外はそのまま送出する。
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        storage_client: StorageClient,
+        redis_client: redis.Redis,
+        reason: str,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            storage_client: ストレージクライアント（プロファイルのアップロード先）
+            redis_client: Redisクライアント（サマリーの記録先）
+            reason: 取得理由（`ProfilingPolicy.reason` の戻り値）
+        """
+        self.job_id = job_id
+        self.storage_client = storage_client
+        self.redis_client = redis_client
+        self.reason = reason
+        self.active = False
+        self._profile: cProfile.Profile | None = None
+        self._started_tracemalloc = False
+        self._wall_started = 0.0
+        self._cpu_started = 0.0
+
+    def __enter__(self) -> "JobProfiler":
+        if not _profile_lock.acquire(blocking=False):
+            logger.warning(f"[{self.job_id}] Another job is being profiled, skipping profile")
+            return self
+
+        if self.reason == "flag":
+            # 取得を開始したジョブのフラグだけを消費する（再配信時に再取得しない）
+            try:
+                self.redis_client.delete(profile_request_key(self.job_id))
+            except Exception as e:
+                logger.warning(f"[{self.job_id}] Failed to consume profile request flag: {e}")
+
+        self.active = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._profile = cProfile.Profile()
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.thread_time()
+        self._profile.enable()
+        logger.info(f"[{self.job_id}] Profiling started ({self.reason})")
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if not self.active or self._profile is None:
+            return
+
+        try:
+            self._profile.disable()
+            wall_seconds = time.perf_counter() - self._wall_started
+            cpu_seconds = time.thread_time() - self._cpu_started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            _profile_lock.release()
+
+        try:
+            self._upload(
+                self._profile,
+                snapshot,
+                wall_seconds=wall_seconds,
+                cpu_seconds=cpu_seconds,
+                peak_bytes=peak_bytes,
+                outcome="error" if exc_type else "ok",
+            )
+        except Exception as e:
+            # プロファイルの保存失敗でジョブを失敗させない
+            logger.error(f"[{self.job_id}] Failed to upload profile: {e}")
+
+    def _upload(
+        self,
+        profile: cProfile.Profile,
+        snapshot: tracemalloc.Snapshot,
+        wall_seconds: float,
+        cpu_seconds: float,
+        peak_bytes: int,
+        outcome: str,
+    ) -> None:
+        """プロファイルをアップロードし、サマリーをRedisに記録する."""
+        prefix = profile_prefix(self.job_id)
+        files = {
+            "cpu_profile": f"{prefix}cpu.prof",
+            "cpu_report": f"{prefix}cpu.txt",
+            "memory_report": f"{prefix}memory.txt",
+        }
+
+        # cpu.prof は `pstats.Stats` / snakeviz 等で読み込める形式（dump_stats と同じ）
+        profile.create_stats()
+        cpu_stats = profile.stats  # type: ignore[attr-defined]
+        self.storage_client.upload_file(marshal.dumps(cpu_stats), files["cpu_profile"])
+        self.storage_client.upload_file(
+            format_cpu_report(profile).encode("utf-8"), files["cpu_report"]
+        )
+        self.storage_client.upload_file(
+            format_memory_report(snapshot, peak_bytes).encode("utf-8"), files["memory_report"]
+        )
+
+        summary: dict[str, Any] = {
+            "job_id": self.job_id,
+            "reason": self.reason,
+            "outcome": outcome,
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "peak_memory_bytes": peak_bytes,
+            "prefix": prefix,
+            "files": files,
+            "profiled_at": datetime.now(UTC).isoformat(),
+        }
+        summary_json = json.dumps(summary)
+        self.storage_client.upload_file(summary_json.encode("utf-8"), f"{prefix}summary.json")
+        self.redis_client.setex(profile_key(self.job_id), PROFILE_TTL_SECONDS, summary_json)
+        logger.info(
+            f"[{self.job_id}] Profile saved to {prefix} "
+            f"(wall {wall_seconds:.2f}s, cpu {cpu_seconds:.2f}s, peak {peak_bytes} bytes)"
+        )
+
+
+def format_cpu_report(profile: cProfile.Profile, limit: int = CPU_REPORT_LIMIT) -> str:
+    """累積時間の上位関数をテキストで返す.
+
+    Args:
+        profile: 取得済みのCPUプロファイル
+        limit: 出力する関数の数
+
+    Returns:
+        str: `pstats` の出力
+    """
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return stream.getvalue()
+
+
+def format_memory_report(
+    snapshot: tracemalloc.Snapshot, peak_bytes: int, limit: int = MEMORY_REPORT_LIMIT
+) -> str:
+    """割り当てサイズの上位行をテキストで返す.
+
+    Args:
+        snapshot: 処理終了時点のメモリスナップショット
+        peak_bytes: 処理中のピークメモリ（バイト）
+        limit: 出力する行数
+
+    Returns:
+        str: メモリレポート
+    """
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+    )
+    stats = snapshot.statistics("lineno")
+    lines = [
+        f"Peak traced memory: {peak_bytes / 1024:.1f} KiB",
+        f"Live traced memory: {sum(stat.size for stat in stats) / 1024:.1f} KiB",
+        "(tracemalloc traces the whole process, including other concurrent jobs)",
+        "",
+        f"Top {limit} allocations by line:",
+    ]
+    for index, stat in enumerate(stats[:limit], start=1):
+        frame = stat.traceback[0]
+        lines.append(
+            f"#{index}: {frame.filename}:{frame.lineno}: "
+            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks"
+        )
+    return "\n".join(lines) + "\n"
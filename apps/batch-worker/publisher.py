@@ -0,0 +1,74 @@
+"""Pub/Sub 発行モジュール（ワーカー側）.
+
+シャード分割などワーカーからメッセージを再発行する場合に使用する。
+ローカル開発時は PUBSUB_EMULATOR_HOST 環境変数でエミュレータに接続する。
+"""
+
+from typing import Any, Protocol
+
+from loguru import logger
+
+from pdf_batch_shared.message_schema import DEFAULT_SCHEMA_VERSION, encode_job_message
+
+
+class MessagePublisher(Protocol):
+    """メッセージ発行インターフェース."""
+
+    def publish_message(
+        self, message: dict[str, Any], attributes: dict[str, str] | None = None
+    ) -> str:
+        """メッセージを発行し、メッセージIDを返す."""
+        ...
+
+
+class PubSubPublisher:
+    """Pub/Sub メッセージ発行クライアント."""
+
+    def __init__(
+        self, project_id: str, topic_name: str, schema_version: str = DEFAULT_SCHEMA_VERSION
+    ) -> None:
+        """初期化.
+
+        Args:
+            project_id: GCPプロジェクトID
+            topic_name: Pub/Subトピック名（例: "pdf-processing-topic"）
+            schema_version: メッセージ本文のスキーマのバージョン（"1": JSON / "2": msgpack）
+        """
+        from google.cloud import pubsub_v1
+
+        self.schema_version = schema_version
+        self.publisher = pubsub_v1.PublisherClient()
+        self.topic_path = self.publisher.topic_path(project_id, topic_name)
+        logger.info(f"PubSubPublisher initialized with topic: {self.topic_path}")
+
+    def publish_message(
+        self, message: dict[str, Any], attributes: dict[str, str] | None = None
+    ) -> str:
+        """メッセージを発行し、メッセージIDを返す.
+
+        本文は `schema_version` のスキーマでエンコードし、ルーティング用の属性
+        （`pdf_batch_shared.message_schema.encode_job_message` を参照）を `attributes` に加える
+        （同名の属性は上書きする）。
+
+        Args:
+            message: 発行するメッセージ（辞書形式）
+            attributes: メッセージ属性（トレースコンテキストなど）
+
+        Returns:
+            str: 発行されたメッセージID
+
+        Raises:
+            Exception: メッセージ発行に失敗した場合
+        """
+        message_bytes, routing_attributes = encode_job_message(message, self.schema_version)
+
+        try:
+            future = self.publisher.publish(
+                self.topic_path, message_bytes, **{**(attributes or {}), **routing_attributes}
+            )
+            message_id: str = future.result()
+            logger.info(f"Published message {message_id}: {message}")
+            return message_id
+        except Exception as e:
+            logger.error(f"Failed to publish message: {e}")
+            raise
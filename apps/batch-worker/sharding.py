@@ -0,0 +1,430 @@
+"""大きなPDFのシャード分割処理モジュール（map/reduce）.
+
+コーディネーターがPDFをページ範囲ごとのシャードに分割して個別のメッセージとして発行し、
+各ワーカーがシャードを処理する。最後に完了したシャードが全シャードの結果をマージして
+最終的な `result.json` を出力する。
+
+Redisキー:
+- `shards:{job_id}` (hash): fanned_out, count, page_count, pages_per_shard, pages_done, started_at,
+  failed, cancelled
+- `shards:{job_id}:done` (set): 完了したシャード番号
+
+`job:*` のSCAN（ジョブ一覧）に含まれないよう、ジョブステータスとは別のプレフィックスを使う。
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+
+import redis
+from loguru import logger
+
+from cancellation import CancellationToken, JobCancelledError, cancel_key
+from processor import (
+    STATUS_TTL_SECONDS,
+    PDFProcessor,
+    build_cancelled_status,
+    build_status_data,
+    queue_status,
+    result_path_for,
+    save_status,
+)
+from publisher import MessagePublisher
+from storage import StorageClient
+from tracing import JobTiming, get_tracer, inject
+
+
+class ShardAbortedError(Exception):
+    """同じジョブの他のシャードが失敗したため、処理を中断した場合の例外."""
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """シャード（ページ範囲）の定義."""
+
+    index: int
+    count: int
+    start_page: int
+    end_page: int
+    page_count: int
+
+    @property
+    def pages(self) -> int:
+        """シャード内のページ数."""
+        return self.end_page - self.start_page + 1
+
+
+def shard_meta_key(job_id: str) -> str:
+    """シャード管理情報のRedisキーを返す."""
+    return f"shards:{job_id}"
+
+
+def shard_done_key(job_id: str) -> str:
+    """完了シャード集合のRedisキーを返す."""
+    return f"shards:{job_id}:done"
+
+
+def shard_result_path(job_id: str, index: int) -> str:
+    """シャード結果ファイルのストレージパスを返す."""
+    return f"results/{job_id}/shards/{index:04d}.json"
+
+
+def plan_shards(page_count: int, pages_per_shard: int) -> list[ShardSpec]:
+    """ページ数をシャードに分割する.
+
+    Args:
+        page_count: PDFの総ページ数
+        pages_per_shard: 1シャードあたりのページ数
+
+    Returns:
+        list[ShardSpec]: シャード定義（ページ番号は1始まり）
+    """
+    starts = list(range(1, page_count + 1, pages_per_shard))
+    return [
+        ShardSpec(
+            index=index,
+            count=len(starts),
+            start_page=start,
+            end_page=min(start + pages_per_shard - 1, page_count),
+            page_count=page_count,
+        )
+        for index, start in enumerate(starts)
+    ]
+
+
+class ShardCoordinator:
+    """PDFをシャードに分割し、シャードごとのメッセージを発行するクラス."""
+
+    def __init__(
+        self,
+        job_id: str,
+        pdf_path: str,
+        redis_client: redis.Redis,
+        publisher: MessagePublisher,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            pdf_path: PDFファイルのストレージパス
+            redis_client: Redisクライアント
+            publisher: シャードメッセージの発行に使用するクライアント
+        """
+        self.job_id = job_id
+        self.pdf_path = pdf_path
+        self.redis_client = redis_client
+        self.publisher = publisher
+
+    def fan_out(
+        self,
+        page_count: int,
+        pages_per_shard: int,
+        attributes: dict[str, str] | None = None,
+    ) -> list[ShardSpec]:
+        """シャード管理情報をRedisに登録し、シャードメッセージを発行する.
+
+        ファンアウト済みの印（`fanned_out`）を HSETNX で付けたコーディネーターだけが発行する。
+        元メッセージが再配信された場合は、シャード管理情報と完了シャードをそのまま残し、
+        登録済みのシャードを返す（再発行しない）。
+
+        Args:
+            page_count: PDFの総ページ数
+            pages_per_shard: 1シャードあたりのページ数
+            attributes: 元メッセージの属性（シャードメッセージに引き継ぐ）
+
+        Returns:
+            list[ShardSpec]: 発行したシャード（ファンアウト済みの場合は登録済みのシャード）
+
+        Raises:
+            JobCancelledError: ファンアウト前にジョブがキャンセルされている場合
+                （ステータスは cancelled にする）
+            Exception: シャードメッセージの発行に失敗した場合（シャード管理情報は failed にする）
+        """
+        meta_key = shard_meta_key(self.job_id)
+
+        # 処理待ちの間にキャンセルされたジョブはシャードを発行しない
+        if self.redis_client.exists(cancel_key(self.job_id)):
+            save_status(self.redis_client, self.job_id, build_cancelled_status(0, page_count))
+            raise JobCancelledError(self.job_id, 0, page_count)
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hsetnx(meta_key, "fanned_out", 1)
+        pipe.expire(meta_key, STATUS_TTL_SECONDS)
+        claimed, _ = pipe.execute()
+        if not claimed:
+            meta = self.redis_client.hmget(meta_key, "page_count", "pages_per_shard")
+            logger.info(f"[{self.job_id}] Already fanned out, not republishing shards")
+            if meta[0] is None or meta[1] is None:
+                # 印を付けたコーディネーターが登録を終えていない
+                return []
+            return plan_shards(int(meta[0]), int(meta[1]))
+
+        shards = plan_shards(page_count, pages_per_shard)
+        status_data = build_status_data(
+            status="processing",
+            progress=0,
+            message=f"Split into {len(shards)} shards ({page_count} pages)",
+        )
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.delete(shard_done_key(self.job_id))
+        pipe.hset(
+            meta_key,
+            mapping={
+                "count": len(shards),
+                "page_count": page_count,
+                "pages_per_shard": pages_per_shard,
+                "pages_done": 0,
+                "started_at": time.time(),
+                "failed": 0,
+            },
+        )
+        pipe.expire(meta_key, STATUS_TTL_SECONDS)
+        queue_status(pipe, self.job_id, status_data)
+        pipe.execute()
+
+        # トレースコンテキストは実行中のスパン（ファンアウト）を親として引き継ぐ
+        # （ルーティング用の属性は発行時にシャードのメッセージの値で上書きされる）
+        shard_attributes = inject(dict(attributes or {}))
+        try:
+            for shard in shards:
+                self.publisher.publish_message(
+                    {
+                        "job_id": self.job_id,
+                        "pdf_path": self.pdf_path,
+                        "shard": asdict(shard),
+                    },
+                    shard_attributes,
+                )
+        except Exception:
+            # 発行済みのシャードは失敗を検知して中断する（ジョブの失敗は呼び出し元が記録する）
+            self.redis_client.hset(meta_key, "failed", 1)
+            raise
+
+        logger.info(f"[{self.job_id}] Fanned out {page_count} pages into {len(shards)} shards")
+        return shards
+
+
+class ShardProcessor:
+    """1シャード（ページ範囲）を処理するクラス."""
+
+    def __init__(
+        self,
+        job_id: str,
+        pdf_path: str,
+        shard: ShardSpec,
+        storage_client: StorageClient,
+        redis_client: redis.Redis,
+        page_delay_range: tuple[float, float] = (3.0, 5.0),
+        cancel_check_interval: float | None = None,
+        timing: JobTiming | None = None,
+    ) -> None:
+        """初期化.
+
+        Args:
+            job_id: ジョブID
+            pdf_path: PDFファイルのストレージパス
+            shard: 処理するシャード
+            storage_client: ストレージクライアント
+            redis_client: Redisクライアント
+            page_delay_range: 1ページあたりの解析時間の範囲（秒, 最小〜最大）
+            cancel_check_interval: キャンセルフラグを確認する最小間隔（秒, None の場合は確認しない）
+            timing: レイテンシ内訳の計測点（マージ時に完了ステータスへ内訳を記録する）
+        """
+        self.job_id = job_id
+        self.shard = shard
+        self.timing = timing
+        self.storage_client = storage_client
+        self.redis_client = redis_client
+        self.cancel_token = (
+            CancellationToken(job_id, redis_client, cancel_check_interval)
+            if cancel_check_interval is not None
+            else None
+        )
+        # ページ解析は PDFProcessor の実装を使う（ページ数はシャードの定義に合わせる）
+        self.page_processor = PDFProcessor(
+            job_id,
+            pdf_path,
+            storage_client,
+            redis_client,
+            page_delay_range=page_delay_range,
+            page_count_range=(shard.page_count, shard.page_count),
+        )
+
+    @property
+    def page_count(self) -> int:
+        """シャード内のページ数."""
+        return self.shard.pages
+
+    def process(self) -> str | None:
+        """シャードを処理し、最後のシャードの場合は結果をマージする.
+
+        Returns:
+            str | None: マージした場合は結果ファイルのパス、それ以外は None
+
+        Raises:
+            ShardAbortedError: 同じジョブの他のシャードが失敗していた場合
+            JobCancelledError: ジョブがキャンセルされ、ページの区切りで中止した場合
+            Exception: 処理中にエラーが発生した場合
+        """
+        label = f"shard {self.shard.index + 1}/{self.shard.count}"
+        # 完了済みのシャードの再配信は処理しない（処理済みページ数の重複加算を防ぐ）
+        if self.redis_client.sismember(shard_done_key(self.job_id), self.shard.index):
+            logger.info(f"[{self.job_id}] {label} was already completed, skipping redelivery")
+            return None
+
+        logger.info(
+            f"[{self.job_id}] Processing {label} "
+            f"(pages {self.shard.start_page}-{self.shard.end_page})"
+        )
+
+        try:
+            start_time = time.time()
+            for page_num in range(self.shard.start_page, self.shard.end_page + 1):
+                self._check_cancelled(page_num - self.shard.start_page)
+                self.page_processor.analyze_page(page_num)
+                self._record_page_done()
+
+            shard_result = {
+                "index": self.shard.index,
+                "start_page": self.shard.start_page,
+                "end_page": self.shard.end_page,
+                "processing_time_seconds": round(time.time() - start_time, 2),
+            }
+            self.storage_client.upload_file(
+                json.dumps(shard_result).encode("utf-8"),
+                shard_result_path(self.job_id, self.shard.index),
+            )
+        except (ShardAbortedError, JobCancelledError):
+            raise
+        except Exception:
+            # 他のシャードに失敗を伝え、以降の進捗更新・マージを止める
+            self.redis_client.hset(shard_meta_key(self.job_id), "failed", 1)
+            raise
+
+        if not self._mark_shard_done():
+            logger.info(f"[{self.job_id}] {label} completed")
+            return None
+
+        return self._merge()
+
+    def _check_cancelled(self, pages_done: int, refresh: bool = False) -> None:
+        """キャンセルされていれば全シャードの途中結果を削除して処理を中止する.
+
+        Args:
+            pages_done: このシャードで処理済みのページ数
+            refresh: True の場合はキャッシュに関わらずRedisに問い合わせる
+
+        Raises:
+            JobCancelledError: ジョブがキャンセルされている場合
+        """
+        if self.cancel_token is None or not self.cancel_token.is_cancelled(refresh=refresh):
+            return
+
+        # 先に完了したシャードの結果も含めて削除する（他のシャードは各自の区切りで中止する）
+        for index in range(self.shard.count):
+            self.storage_client.delete_file(shard_result_path(self.job_id, index))
+        self.storage_client.delete_file(result_path_for(self.job_id))
+
+        # 各シャードが cancelled を書き込むため、件数のカウントは最初に中止したシャードだけが行う
+        meta_key = shard_meta_key(self.job_id)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hsetnx(meta_key, "cancelled", 1)
+        pipe.hget(meta_key, "pages_done")
+        first, job_pages_done = pipe.execute()
+        save_status(
+            self.redis_client,
+            self.job_id,
+            build_cancelled_status(int(job_pages_done or 0), self.shard.page_count),
+            count=bool(first),
+        )
+
+        error = JobCancelledError(self.job_id, pages_done, self.shard.pages)
+        logger.info(f"[{self.job_id}] shard {self.shard.index + 1}/{self.shard.count}: {error}")
+        raise error
+
+    def _record_page_done(self) -> None:
+        """処理済みページ数を加算し、ジョブ全体の進捗を更新する."""
+        meta_key = shard_meta_key(self.job_id)
+        with get_tracer().span("redis.record_shard_page", job_id=self.job_id):
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.hincrby(meta_key, "pages_done", 1)
+            pipe.hget(meta_key, "failed")
+            pages_done, failed = pipe.execute()
+
+        if failed and int(failed):
+            raise ShardAbortedError(f"Another shard of job {self.job_id} failed")
+
+        page_count = self.shard.page_count
+        progress = int((pages_done / page_count) * 100)
+        # 全ページ完了時の100%はマージ完了時のみ表示する
+        progress = min(progress, 99)
+        message = f"Page {pages_done}/{page_count} analyzing... ({self.shard.count} shards)"
+        status_data = build_status_data(status="processing", progress=progress, message=message)
+        save_status(self.redis_client, self.job_id, status_data, pages=1)
+        logger.debug(f"[{self.job_id}] {message} ({progress}%)")
+
+    def _mark_shard_done(self) -> bool:
+        """シャードの完了を記録し、このシャードがマージを担当するかを返す.
+
+        SADD と SCARD をトランザクションで実行するため、全シャード完了を観測するのは
+        最後に完了したシャード1つだけになる。再配信で同じシャードが再度完了した場合
+        （SADD の戻り値が0）はマージしない。
+
+        Returns:
+            bool: このシャードがマージを担当する場合は True
+        """
+        done_key = shard_done_key(self.job_id)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.sadd(done_key, self.shard.index)
+        pipe.scard(done_key)
+        pipe.expire(done_key, STATUS_TTL_SECONDS)
+        added, done_count, _ = pipe.execute()
+        return bool(added) and done_count == self.shard.count
+
+    def _merge(self) -> str:
+        """全シャードの結果をマージして最終結果ファイルを出力する.
+
+        Returns:
+            str: 結果ファイルのパス
+        """
+        with get_tracer().span("merge_shards", job_id=self.job_id, shards=self.shard.count):
+            return self._merge_results()
+
+    def _merge_results(self) -> str:
+        meta = self.redis_client.hgetall(shard_meta_key(self.job_id))
+        if int(meta.get("failed", 0)):
+            raise ShardAbortedError(f"Another shard of job {self.job_id} failed")
+        self._check_cancelled(self.shard.pages, refresh=True)
+
+        shards = [
+            json.loads(self.storage_client.download_file(shard_result_path(self.job_id, index)))
+            for index in range(self.shard.count)
+        ]
+        processing_time = time.time() - float(meta.get("started_at", time.time()))
+        result_data = {
+            "job_id": self.job_id,
+            "pages": self.shard.page_count,
+            "processed_at": datetime.now(UTC).isoformat(),
+            "processing_time_seconds": round(processing_time, 2),
+            "shards": shards,
+        }
+        result_path = result_path_for(self.job_id)
+        self.storage_client.upload_file(
+            json.dumps(result_data, indent=2).encode("utf-8"), result_path
+        )
+
+        status_data = build_status_data(
+            status="completed",
+            progress=100,
+            message="Processing completed!",
+            result_url=result_path,
+            # シャードの場合、キュー待ちはマージを担当したシャードのメッセージの値
+            latency=(self.timing.breakdown(processing_time, time.time()) if self.timing else None),
+        )
+        save_status(self.redis_client, self.job_id, status_data, processing_seconds=processing_time)
+        logger.info(
+            f"[{self.job_id}] Merged {self.shard.count} shards in {processing_time:.2f}s total"
+        )
+        return result_path
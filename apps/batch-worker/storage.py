@@ -4,7 +4,15 @@
 環境変数 STORAGE_TYPE で動作を切り替える。
 """
 
+import os
+import threading
+import uuid
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from pathlib import Path
 
 from loguru import logger
@@ -12,6 +20,19 @@ from loguru import logger
 from config import Settings
 
 
+class PreconditionFailedError(Exception):
+    """条件付きの書き込みで、オブジェクトの世代が指定した世代と一致しない場合の例外."""
+
+
+@dataclass(frozen=True)
+class StorageObject:
+    """一覧取得したオブジェクト."""
+
+    path: str
+    size: int
+    updated: datetime
+
+
 class StorageClient(ABC):
     """ストレージクライアントの抽象基底クラス."""
 
@@ -38,17 +59,85 @@ class StorageClient(ABC):
             bytes: ファイルのバイトデータ
         """
 
+    @abstractmethod
+    def download_with_generation(self, source_path: str) -> tuple[bytes, int]:
+        """ファイルをダウンロードし、バイトデータと世代を返す.
+
+        Args:
+            source_path: ダウンロード元パス
+
+        Returns:
+            tuple[bytes, int]: ファイルのバイトデータと世代（`upload_if_generation` に渡す）
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+        """
+
+    @abstractmethod
+    def upload_if_generation(
+        self, file_bytes: bytes, destination_path: str, generation: int
+    ) -> str:
+        """ファイルの世代が generation と一致する場合だけアップロードする.
+
+        Args:
+            file_bytes: アップロードするファイルのバイトデータ
+            destination_path: 保存先パス
+            generation: `download_with_generation` で取得した世代（0 の場合は存在しない場合だけ）
+
+        Returns:
+            str: 保存されたファイルのパス
+
+        Raises:
+            PreconditionFailedError: ファイルの世代が一致しない場合
+        """
+
+    @abstractmethod
+    def delete_file(self, path: str) -> bool:
+        """ファイルを削除する（存在しない場合は何もしない）.
+
+        Args:
+            path: 削除するファイルのパス
+
+        Returns:
+            bool: ファイルを削除した場合は True
+        """
+
+    @abstractmethod
+    def list_prefix(self, prefix: str) -> Iterator[StorageObject]:
+        """パスが prefix で始まるオブジェクトを順次返す（一覧全体をメモリに保持しない）.
+
+        Args:
+            prefix: パスの接頭辞（例: "uploads/"）
+
+        Returns:
+            Iterator[StorageObject]: オブジェクト（順序は実装による）
+        """
+
+    @abstractmethod
+    def delete_many(self, paths: Sequence[str]) -> int:
+        """複数のファイルをまとめて削除する（存在しないファイルは無視する）.
+
+        Args:
+            paths: 削除するファイルのパス
+
+        Returns:
+            int: 削除したファイル数
+        """
+
 
 class LocalStorageClient(StorageClient):
     """ローカルファイルシステムを使用するストレージクライアント."""
 
-    def __init__(self, base_path: str) -> None:
+    def __init__(self, base_path: str, scan_workers: int = 8) -> None:
         """初期化.
 
         Args:
             base_path: ベースディレクトリパス（例: "./local_storage"）
+            scan_workers: `list_prefix` でサブディレクトリを並列に走査するスレッド数
         """
         self.base_path = Path(base_path)
+        self.scan_workers = scan_workers
+        self._write_lock = threading.Lock()
         self.base_path.mkdir(parents=True, exist_ok=True)
         logger.info(f"LocalStorageClient initialized with base_path: {self.base_path}")
 
@@ -93,10 +182,168 @@ class LocalStorageClient(StorageClient):
 
         return file_bytes
 
+    def download_with_generation(self, source_path: str) -> tuple[bytes, int]:
+        """ローカルファイルシステムからファイルを読み込み、更新時刻（ナノ秒）を世代として返す.
+
+        Args:
+            source_path: 相対パス（base_path からの相対）
+
+        Returns:
+            tuple[bytes, int]: ファイルのバイトデータと世代
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+        """
+        full_path = self.base_path / source_path
+        with self._write_lock:
+            try:
+                generation = full_path.stat().st_mtime_ns
+                file_bytes = full_path.read_bytes()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"File not found: {source_path}") from None
+        return file_bytes, generation
+
+    def upload_if_generation(
+        self, file_bytes: bytes, destination_path: str, generation: int
+    ) -> str:
+        """ファイルの更新時刻が generation と一致する場合だけ保存する.
+
+        世代の確認と置き換えはプロセス内のロックで排他する（ローカル実行は単一プロセスを想定）。
+
+        Args:
+            file_bytes: ファイルのバイトデータ
+            destination_path: 相対パス（base_path からの相対）
+            generation: `download_with_generation` で取得した世代（0 の場合は存在しない場合だけ）
+
+        Returns:
+            str: 保存されたファイルの相対パス
+
+        Raises:
+            PreconditionFailedError: ファイルの世代が一致しない場合
+        """
+        full_path = self.base_path / destination_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write_lock:
+            try:
+                current = full_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                current = 0
+            if current != generation:
+                raise PreconditionFailedError(
+                    f"Generation mismatch for {destination_path}: {current} != {generation}"
+                )
+            temp_path = full_path.with_name(f"{full_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            temp_path.write_bytes(file_bytes)
+            os.replace(temp_path, full_path)
+        logger.info(f"File uploaded to local storage: {full_path}")
+
+        return destination_path
+
+    def delete_file(self, path: str) -> bool:
+        """ローカルファイルシステムからファイルを削除.
+
+        Args:
+            path: 相対パス（base_path からの相対）
+
+        Returns:
+            bool: ファイルを削除した場合は True
+        """
+        full_path = self.base_path / path
+
+        if not full_path.exists():
+            return False
+
+        full_path.unlink()
+        logger.info(f"File deleted from local storage: {full_path}")
+
+        return True
+
+    def list_prefix(self, prefix: str) -> Iterator[StorageObject]:
+        """ローカルファイルシステムのファイルを順次返す.
+
+        prefix の直下のエントリを `os.scandir` で順に読み、サブディレクトリ（ジョブごとの
+        ディレクトリ）の走査をスレッドプールで並列に実行する。走査中のサブディレクトリは
+        `scan_workers` の4倍までとし、完了した順ではなく読み込んだ順に結果を返す。
+
+        Args:
+            prefix: 相対パスの接頭辞（base_path からの相対）
+
+        Returns:
+            Iterator[StorageObject]: ファイル（パスは base_path からの相対）
+        """
+        directory, _, name_prefix = prefix.rpartition("/")
+        root = self.base_path / directory
+        if not root.is_dir():
+            return
+
+        max_pending = self.scan_workers * 4
+        pending: deque[Future[list[StorageObject]]] = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=self.scan_workers, thread_name_prefix="storage-scan"
+        )
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if not entry.name.startswith(name_prefix):
+                        continue
+                    relative = f"{directory}/{entry.name}" if directory else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(executor.submit(_scan_tree, entry.path, relative))
+                        if len(pending) >= max_pending:
+                            yield from pending.popleft().result()
+                    elif entry.is_file(follow_symlinks=False):
+                        yield _local_object(entry, relative)
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # 途中で走査を打ち切った場合は、開始していないサブディレクトリの走査を取り消す
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def delete_many(self, paths: Sequence[str]) -> int:
+        """ローカルファイルシステムから複数のファイルを削除する.
+
+        ファイルを削除した後、空になったディレクトリを最上位のディレクトリ（"uploads" など）の
+        直下まで遡って削除する。
+
+        Args:
+            paths: 相対パス（base_path からの相対）
+
+        Returns:
+            int: 削除したファイル数
+        """
+        deleted = 0
+        parents: set[Path] = set()
+        for path in paths:
+            full_path = self.base_path / path
+            try:
+                full_path.unlink()
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            # 最上位のディレクトリ（"uploads" など）とベースディレクトリは削除しない
+            relative = Path(path)
+            for parent in list(relative.parents)[: len(relative.parts) - 2]:
+                parents.add(self.base_path / parent)
+
+        # 深いディレクトリから順に、空のディレクトリだけを削除する
+        for parent in sorted(parents, key=lambda parent: len(parent.parts), reverse=True):
+            try:
+                parent.rmdir()
+            except OSError:
+                pass
+
+        logger.info(f"Deleted {deleted} of {len(paths)} files from local storage")
+        return deleted
+
 
 class GCSStorageClient(StorageClient):
     """Google Cloud Storage を使用するストレージクライアント."""
 
+    # 一覧取得の1ページあたりの件数（API の上限）
+    LIST_PAGE_SIZE = 1000
+    # 1回のバッチリクエストにまとめる削除リクエスト数（GCS の推奨上限）
+    DELETE_BATCH_SIZE = 100
+
     def __init__(self, bucket_name: str) -> None:
         """初期化.
 
@@ -148,6 +395,176 @@ class GCSStorageClient(StorageClient):
 
         return file_bytes
 
+    def download_with_generation(self, source_path: str) -> tuple[bytes, int]:
+        """GCSからファイルをダウンロードし、オブジェクトの世代（generation）を返す.
+
+        Args:
+            source_path: GCS内のパス
+
+        Returns:
+            tuple[bytes, int]: ファイルのバイトデータと世代
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+        """
+        blob = self.bucket.get_blob(source_path)
+        if blob is None:
+            raise FileNotFoundError(f"File not found: {source_path}")
+
+        # メタデータの取得後に更新された場合に別の世代の内容を読まないよう、世代を指定する
+        file_bytes = blob.download_as_bytes(if_generation_match=blob.generation)
+        logger.info(f"File downloaded from GCS: gs://{self.bucket.name}/{source_path}")
+
+        return file_bytes, blob.generation
+
+    def upload_if_generation(
+        self, file_bytes: bytes, destination_path: str, generation: int
+    ) -> str:
+        """オブジェクトの世代が generation と一致する場合だけアップロードする（事前条件付き）.
+
+        Args:
+            file_bytes: ファイルのバイトデータ
+            destination_path: GCS内のパス
+            generation: `download_with_generation` で取得した世代（0 の場合は存在しない場合だけ）
+
+        Returns:
+            str: アップロードされたファイルのパス
+
+        Raises:
+            PreconditionFailedError: オブジェクトの世代が一致しない場合
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
+        blob = self.bucket.blob(destination_path)
+        try:
+            blob.upload_from_string(file_bytes, if_generation_match=generation)
+        except PreconditionFailed as e:
+            raise PreconditionFailedError(
+                f"Generation mismatch for gs://{self.bucket.name}/{destination_path}"
+            ) from e
+        logger.info(f"File uploaded to GCS: gs://{self.bucket.name}/{destination_path}")
+
+        return destination_path
+
+    def delete_file(self, path: str) -> bool:
+        """GCSからファイルを削除.
+
+        Args:
+            path: GCS内のパス
+
+        Returns:
+            bool: ファイルを削除した場合は True
+        """
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.bucket.blob(path).delete()
+        except NotFound:
+            return False
+
+        logger.info(f"File deleted from GCS: gs://{self.bucket.name}/{path}")
+
+        return True
+
+    def list_prefix(self, prefix: str) -> Iterator[StorageObject]:
+        """GCSのオブジェクトをページ単位で取得し、順次返す.
+
+        Args:
+            prefix: GCS内のパスの接頭辞
+
+        Returns:
+            Iterator[StorageObject]: オブジェクト（パスの辞書順）
+        """
+        blobs = self.client.list_blobs(
+            self.bucket,
+            prefix=prefix,
+            page_size=self.LIST_PAGE_SIZE,
+            fields="items(name,size,updated),nextPageToken",
+        )
+        for blob in blobs:
+            yield StorageObject(path=blob.name, size=blob.size or 0, updated=blob.updated)
+
+    def delete_many(self, paths: Sequence[str]) -> int:
+        """GCSから複数のファイルをバッチリクエストで削除する.
+
+        `DELETE_BATCH_SIZE` 件ごとに1回のバッチリクエストを送信する。存在しないファイル（404）は
+        無視し、その他のエラーは警告を記録して削除しなかったものとして扱う。
+
+        Args:
+            paths: GCS内のパス
+
+        Returns:
+            int: 削除したファイル数
+        """
+        deleted = 0
+        failed = 0
+        for start in range(0, len(paths), self.DELETE_BATCH_SIZE):
+            chunk = paths[start : start + self.DELETE_BATCH_SIZE]
+            batch = self.client.batch(raise_exception=False)
+            # コンテキストマネージャは終了時に応答を返さずに送信するため、バッチを現在のバッチに
+            # 設定して削除リクエストを積んだ後、finish() を明示的に呼び出して応答を受け取る
+            self.client._push_batch(batch)
+            try:
+                for path in chunk:
+                    self.bucket.delete_blob(path)
+            finally:
+                self.client._pop_batch()
+            # raise_exception=False の場合、失敗したリクエストも例外にせず応答として返す
+            responses = batch.finish(raise_exception=False)
+            for path, response in zip(chunk, responses, strict=True):
+                if 200 <= response.status_code < 300:
+                    deleted += 1
+                elif response.status_code != 404:
+                    failed += 1
+                    logger.warning(
+                        f"Failed to delete gs://{self.bucket.name}/{path}: "
+                        f"HTTP {response.status_code}"
+                    )
+
+        logger.info(
+            f"Deleted {deleted} of {len(paths)} files from GCS "
+            f"gs://{self.bucket.name} ({failed} failed)"
+        )
+        return deleted
+
+
+def _local_object(entry: os.DirEntry[str], relative: str) -> StorageObject:
+    """`os.scandir` のエントリからオブジェクトを組み立てる."""
+    stat = entry.stat(follow_symlinks=False)
+    return StorageObject(
+        path=relative,
+        size=stat.st_size,
+        updated=datetime.fromtimestamp(stat.st_mtime, UTC),
+    )
+
+
+def _scan_tree(path: str, relative: str) -> list[StorageObject]:
+    """ディレクトリ以下のファイルを `os.scandir` で走査する（スレッドプールで実行）.
+
+    Args:
+        path: 走査するディレクトリのパス
+        relative: ディレクトリの base_path からの相対パス
+
+    Returns:
+        list[StorageObject]: ディレクトリ以下のファイル
+    """
+    objects = []
+    stack = [(path, relative)]
+    while stack:
+        current, current_relative = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    entry_relative = f"{current_relative}/{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, entry_relative))
+                    elif entry.is_file(follow_symlinks=False):
+                        objects.append(_local_object(entry, entry_relative))
+        except FileNotFoundError:
+            # 走査中に削除されたディレクトリ
+            continue
+    return objects
+
 
 def get_storage_client(settings: Settings) -> StorageClient:
     """設定に基づいて適切なストレージクライアントを返す.
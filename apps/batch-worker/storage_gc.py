@@ -0,0 +1,282 @@
+"""ストレージのガベージコレクション（GC）モジュール.
+
+Redisのジョブステータス（`job:{job_id}`）は TTL で期限切れになるが、ジョブのオブジェクト
+（`uploads/{job_id}/`・`results/{job_id}/`）はストレージに残り続ける。
+`StorageGarbageCollector` は対象の接頭辞を `StorageClient.list_prefix` で順次読み込み、
+`batch_size` 件ごとにジョブIDを取り出して、ステータスが存在しないジョブのオブジェクトを削除する。
+
+- ステータスの確認は1バッチにつき1回のパイプライン（`EXISTS`）で行う
+- 削除は `StorageClient.delete_many`（GCSはバッチリクエスト）をスレッドプールで実行し、
+  実行中の削除は `concurrency` バッチまでに制限する（一覧の読み込みもその間は待つ）
+- メモリに保持するのは読み込み中のバッチと実行中の削除だけで、一覧全体は保持しない
+- アップロードはステータスの登録より先に行われるため、更新から `min_age_seconds` 未満の
+  オブジェクトは削除しない
+
+GCは Redis のロックで同時に1つまでに制限し、バッチごとにロックの有効期限を延長する。
+
+実行例（Cloud Scheduler 等から定期実行する場合）:
+    python -m storage_gc run
+    python -m storage_gc run --dry-run
+"""
+
+import argparse
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from itertools import islice
+from typing import Any
+
+import redis
+from loguru import logger
+
+from config import Settings
+from processor import job_key
+from storage import StorageClient, StorageObject, get_storage_client
+
+# GCの排他ロック
+GC_LOCK_KEY = "storage_gc:lock"
+
+# ロックの有効期限（バッチごとに延長する。GC中にプロセスが停止した場合の解放）
+GC_LOCK_TTL_SECONDS = 300
+
+# ロックの解放と延長は、取得時のトークンと一致する場合だけ行う
+# （有効期限切れの後に他のプロセスが取得したロックを削除・延長しない）
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+EXTEND_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+@dataclass
+class GCStats:
+    """GCの集計."""
+
+    scanned: int = 0
+    # ステータスが存在するジョブのオブジェクト
+    live: int = 0
+    # 更新から最小経過時間が経っていないオブジェクト
+    recent: int = 0
+    # パスからジョブIDを取り出せないオブジェクト（削除しない）
+    unowned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    failed_batches: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """出力用の辞書を返す."""
+        return {
+            "scanned": self.scanned,
+            "live": self.live,
+            "recent": self.recent,
+            "unowned": self.unowned,
+            "orphaned": self.orphaned,
+            "deleted": self.deleted,
+            "failed_batches": self.failed_batches,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def job_id_from_path(path: str, prefix: str) -> str | None:
+    """オブジェクトのパスからジョブIDを取り出す（`{prefix}{job_id}/...` 形式）.
+
+    Args:
+        path: オブジェクトのパス
+        prefix: 対象の接頭辞（例: "uploads/"）
+
+    Returns:
+        str | None: ジョブID（接頭辞の直下のファイルなど、ジョブのディレクトリ外の場合は None）
+    """
+    job_id, separator, _ = path.removeprefix(prefix).partition("/")
+    return job_id if separator and job_id else None
+
+
+def _batched(objects: Iterable[StorageObject], size: int) -> Iterator[list[StorageObject]]:
+    """オブジェクトを size 件ずつのリストにまとめる."""
+    iterator = iter(objects)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class StorageGarbageCollector:
+    """ステータスが期限切れになったジョブのオブジェクトを、まとめてストレージから削除する."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        storage_client: StorageClient,
+        prefixes: Iterable[str] = ("uploads/", "results/"),
+        min_age_seconds: float = 3600.0,
+        batch_size: int = 1000,
+        concurrency: int = 8,
+        dry_run: bool = False,
+    ) -> None:
+        """初期化.
+
+        Args:
+            redis_client: Redisクライアント
+            storage_client: ストレージクライアント
+            prefixes: 対象の接頭辞（直下のディレクトリ名をジョブIDとして扱う）
+            min_age_seconds: 削除対象とする、更新からの最小経過時間
+            batch_size: ステータスの確認と削除をまとめる件数
+            concurrency: 同時に実行する削除のバッチ数の上限
+            dry_run: True の場合は削除対象を数えるだけで削除しない
+
+        Raises:
+            ValueError: 接頭辞が "/" で終わらない場合（バケット全体や history/ を対象にしない）
+        """
+        self.prefixes = [prefix for prefix in prefixes if prefix]
+        for prefix in self.prefixes:
+            if not prefix.endswith("/"):
+                raise ValueError(f"Storage GC prefix must end with '/': {prefix!r}")
+        self.redis_client = redis_client
+        self.storage_client = storage_client
+        self.min_age_seconds = min_age_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._extend_lock_script = redis_client.register_script(EXTEND_LOCK_SCRIPT)
+
+    def run(self) -> GCStats | None:
+        """対象の接頭辞を順に走査し、ステータスが存在しないジョブのオブジェクトを削除する.
+
+        Returns:
+            GCStats | None: 集計（他のプロセスがGC中の場合は None）
+        """
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(GC_LOCK_KEY, token, nx=True, ex=GC_LOCK_TTL_SECONDS):
+            logger.info("Storage GC is already running elsewhere, skipping")
+            return None
+
+        started = time.perf_counter()
+        stats = GCStats()
+        cutoff = datetime.now(UTC) - timedelta(seconds=self.min_age_seconds)
+        in_flight: set[Future[int]] = set()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="storage-gc")
+        try:
+            for prefix in self.prefixes:
+                for batch in _batched(self.storage_client.list_prefix(prefix), self.batch_size):
+                    orphans = self._find_orphans(prefix, batch, cutoff, stats)
+                    if orphans and not self.dry_run:
+                        # 実行中の削除が上限に達している場合は、1つ完了するまで一覧の読み込みを待つ
+                        while len(in_flight) >= self.concurrency:
+                            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            self._collect(done, stats)
+                        in_flight.add(executor.submit(self.storage_client.delete_many, orphans))
+                    if not self._extend_lock(token):
+                        logger.warning("Lost storage GC lock, stopping")
+                        return stats
+        finally:
+            self._collect(wait(in_flight).done, stats)
+            executor.shutdown(wait=True)
+            stats.seconds = time.perf_counter() - started
+            self._release_lock(keys=[GC_LOCK_KEY], args=[token])
+
+        logger.info(
+            f"Storage GC {'(dry run) ' if self.dry_run else ''}scanned {stats.scanned} objects, "
+            f"{stats.orphaned} orphaned, {stats.deleted} deleted in {stats.seconds:.1f}s"
+        )
+        return stats
+
+    def _find_orphans(
+        self, prefix: str, batch: list[StorageObject], cutoff: datetime, stats: GCStats
+    ) -> list[str]:
+        """1バッチ分のオブジェクトから、ステータスが存在しないジョブのオブジェクトを選ぶ.
+
+        Args:
+            prefix: 対象の接頭辞
+            batch: オブジェクト
+            cutoff: この時刻より前に更新されたオブジェクトだけを削除対象とする
+            stats: 集計（更新する）
+
+        Returns:
+            list[str]: 削除するオブジェクトのパス
+        """
+        stats.scanned += len(batch)
+        candidates: list[tuple[StorageObject, str]] = []
+        for obj in batch:
+            job_id = job_id_from_path(obj.path, prefix)
+            if job_id is None:
+                stats.unowned += 1
+            elif obj.updated >= cutoff:
+                stats.recent += 1
+            else:
+                candidates.append((obj, job_id))
+        if not candidates:
+            return []
+
+        # 同じジョブの複数のオブジェクト（結果・シャードの結果）は、ジョブIDごとに1回だけ確認する
+        job_ids = list(dict.fromkeys(job_id for _, job_id in candidates))
+        pipe = self.redis_client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.exists(job_key(job_id))
+        live = {job_id for job_id, exists in zip(job_ids, pipe.execute(), strict=True) if exists}
+
+        orphans = [obj.path for obj, job_id in candidates if job_id not in live]
+        stats.live += len(candidates) - len(orphans)
+        stats.orphaned += len(orphans)
+        return orphans
+
+    def _collect(self, done: set[Future[int]], stats: GCStats) -> None:
+        """完了した削除の結果を集計する（失敗したバッチは次回のGCで再度削除する）."""
+        for future in done:
+            try:
+                stats.deleted += future.result()
+            except Exception as e:
+                logger.error(f"Failed to delete storage GC batch: {e}")
+                stats.failed_batches += 1
+
+    def _extend_lock(self, token: str) -> bool:
+        """ロックを保持している場合は有効期限を延長する.
+
+        Returns:
+            bool: ロックを保持している場合は True
+        """
+        return bool(self._extend_lock_script(keys=[GC_LOCK_KEY], args=[token, GC_LOCK_TTL_SECONDS]))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """ストレージのGCを実行する（定期実行用のエントリーポイント）."""
+    parser = argparse.ArgumentParser(description="Delete storage objects of expired jobs")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--dry-run", action="store_true", help="削除対象を数えるだけで削除しない")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    redis_client = redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+    collector = StorageGarbageCollector(
+        redis_client,
+        get_storage_client(settings),
+        prefixes=[prefix.strip() for prefix in settings.storage_gc_prefixes.split(",")],
+        min_age_seconds=settings.storage_gc_min_age_seconds,
+        batch_size=settings.storage_gc_batch_size,
+        concurrency=settings.storage_gc_concurrency,
+        dry_run=args.dry_run,
+    )
+    stats = collector.run()
+    if stats is None:
+        print("Storage GC is already running")
+        return 0
+    print(f"Storage GC: {stats.to_dict()}")
+    return 1 if stats.failed_batches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
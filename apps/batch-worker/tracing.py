@@ -0,0 +1,414 @@
+"""エンドツーエンドのレイテンシトレーシングモジュール.
+
+Streamlitアプリでのアップロード・発行から、Pub/Sub のキュー待ち、ワーカーでの処理完了までを
+スパンとして記録する。トレースコンテキストは W3C Trace Context 形式（`traceparent`）で
+Pub/Sub のメッセージ属性に載せて伝搬する。
+
+スパンの出力先は `SpanExporter` で差し替えられる（ローカル用に console / file を用意）。
+エクスポーターを設定しない場合、スパンは記録されない。
+"""
+
+import json
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from config import Settings
+
+# メッセージ属性のキー（streamlit-app の tracing.py と共通）
+TRACEPARENT_ATTRIBUTE = "traceparent"
+SUBMITTED_AT_ATTRIBUTE = "submitted_at"
+UPLOAD_MS_ATTRIBUTE = "upload_ms"
+
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_FRACTION_PATTERN = re.compile(r"\.(\d+)")
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """プロセス間で伝搬するスパンの識別子."""
+
+    trace_id: str
+    span_id: str
+
+    def to_traceparent(self) -> str:
+        """W3C Trace Context の traceparent ヘッダー値を返す."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def from_traceparent(cls, value: str | None) -> "SpanContext | None":
+        """traceparent ヘッダー値を解析する（不正な値の場合は None）."""
+        if not value:
+            return None
+        match = _TRACEPARENT_PATTERN.match(value.strip().lower())
+        if match is None:
+            return None
+        return cls(trace_id=match.group(1), span_id=match.group(2))
+
+
+@dataclass
+class Span:
+    """1区間の処理時間の記録."""
+
+    name: str
+    context: SpanContext
+    parent_id: str | None
+    service: str
+    start_time: float
+    end_time: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        """スパンの長さ（ミリ秒）."""
+        end_time = self.end_time if self.end_time is not None else time.time()
+        return (end_time - self.start_time) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """属性を追加する."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        """エクスポート用の辞書を返す."""
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(ABC):
+    """スパン出力先の抽象基底クラス."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """終了したスパンを出力する.
+
+        Args:
+            span: 終了したスパン
+        """
+
+    def shutdown(self) -> None:  # noqa: B027
+        """出力先を閉じる（必要な場合のみ実装する）."""
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """スパンをログに出力するエクスポーター."""
+
+    def export(self, span: Span) -> None:
+        """スパンをJSONでログに出力する."""
+        logger.info(f"[trace] {json.dumps(span.to_dict(), ensure_ascii=False)}")
+
+
+class FileSpanExporter(SpanExporter):
+    """スパンをJSON Lines形式でファイルに追記するエクスポーター（オフライン分析用）."""
+
+    def __init__(self, path: str) -> None:
+        """初期化.
+
+        Args:
+            path: 出力先ファイルのパス
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        logger.info(f"FileSpanExporter initialized with path: {self.path}")
+
+    def export(self, span: Span) -> None:
+        """スパンを1行のJSONとして追記する."""
+        line = json.dumps(span.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """スパンを生成してエクスポーターに渡すトレーサー.
+
+    実行中のスパンは contextvars で管理するため、スレッド・asyncioタスクごとに親子関係が保たれる。
+    """
+
+    def __init__(self, service: str, exporter: SpanExporter | None = None) -> None:
+        """初期化.
+
+        Args:
+            service: サービス名（スパンの `service` 属性）
+            exporter: スパンの出力先（None の場合はスパンを記録しない）
+        """
+        self.service = service
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        """スパンを記録するか."""
+        return self.exporter is not None
+
+    @contextmanager
+    def span(
+        self, name: str, parent: SpanContext | None = None, **attributes: Any
+    ) -> Iterator[Span | None]:
+        """スパンを開始し、ブロックを抜けたときに終了・出力する.
+
+        Args:
+            name: スパン名
+            parent: 親スパン（省略時は実行中のスパン、リモートの親を指定する場合に使用）
+            **attributes: スパンの属性
+
+        Yields:
+            Span | None: 記録中のスパン（トレーシング無効時は None）
+        """
+        if self.exporter is None:
+            yield None
+            return
+
+        span = self._start(name, parent, time.time(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            self._end(span, time.time())
+
+    def record_span(
+        self,
+        name: str,
+        start_time: float,
+        end_time: float,
+        parent: SpanContext | None = None,
+        **attributes: Any,
+    ) -> None:
+        """開始・終了時刻が確定済みの区間をスパンとして記録する（キュー待ちなど）.
+
+        Args:
+            name: スパン名
+            start_time: 開始時刻（UNIX時刻）
+            end_time: 終了時刻（UNIX時刻）
+            parent: 親スパン（省略時は実行中のスパン）
+            **attributes: スパンの属性
+        """
+        if self.exporter is None:
+            return
+        self._end(self._start(name, parent, start_time, attributes), end_time)
+
+    def _start(
+        self,
+        name: str,
+        parent: SpanContext | None,
+        start_time: float,
+        attributes: dict[str, Any],
+    ) -> Span:
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        context = SpanContext(
+            trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+        )
+        return Span(
+            name=name,
+            context=context,
+            parent_id=parent.span_id if parent is not None else None,
+            service=self.service,
+            start_time=start_time,
+            attributes=dict(attributes),
+        )
+
+    def _end(self, span: Span, end_time: float) -> None:
+        span.end_time = end_time
+        assert self.exporter is not None
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+
+def current_span_context() -> SpanContext | None:
+    """実行中のスパンのコンテキストを返す."""
+    span = _current_span.get()
+    return span.context if span is not None else None
+
+
+def inject(attributes: dict[str, str]) -> dict[str, str]:
+    """実行中のスパンを親とする traceparent をメッセージ属性に設定する.
+
+    Args:
+        attributes: メッセージ属性（更新される）
+
+    Returns:
+        dict[str, str]: 更新したメッセージ属性
+    """
+    context = current_span_context()
+    if context is not None:
+        attributes[TRACEPARENT_ATTRIBUTE] = context.to_traceparent()
+    return attributes
+
+
+def parse_timestamp(value: str | None) -> float | None:
+    """RFC 3339 形式の時刻（Pub/Sub の publishTime など）をUNIX時刻に変換する.
+
+    Args:
+        value: 時刻文字列（例: "2026-02-12T06:30:00.123456789Z"）
+
+    Returns:
+        float | None: UNIX時刻（解析できない場合は None）
+    """
+    if not value:
+        return None
+    # fromisoformat はマイクロ秒（6桁）までしか扱えないため、ナノ秒精度を切り詰める
+    normalized = _FRACTION_PATTERN.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), value, 1)
+    try:
+        return datetime.fromisoformat(normalized.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class JobTiming:
+    """1ジョブのレイテンシ内訳の計測点."""
+
+    received_at: float
+    submitted_at: float | None = None
+    published_at: float | None = None
+    upload_ms: float | None = None
+    parent: SpanContext | None = None
+
+    @classmethod
+    def from_message(
+        cls, attributes: dict[str, str], publish_time: str | None, received_at: float
+    ) -> "JobTiming":
+        """メッセージ属性と publishTime から計測点を組み立てる.
+
+        Args:
+            attributes: メッセージ属性（traceparent, submitted_at, upload_ms）
+            publish_time: Pub/Sub の publishTime
+            received_at: ワーカーがメッセージを受信した時刻（UNIX時刻）
+
+        Returns:
+            JobTiming: 計測点
+        """
+        upload_ms = attributes.get(UPLOAD_MS_ATTRIBUTE)
+        try:
+            upload_ms_value = float(upload_ms) if upload_ms else None
+        except ValueError:
+            upload_ms_value = None
+        return cls(
+            received_at=received_at,
+            submitted_at=parse_timestamp(attributes.get(SUBMITTED_AT_ATTRIBUTE)),
+            published_at=parse_timestamp(publish_time),
+            upload_ms=upload_ms_value,
+            parent=SpanContext.from_traceparent(attributes.get(TRACEPARENT_ATTRIBUTE)),
+        )
+
+    @property
+    def queue_wait_ms(self) -> float | None:
+        """Pub/Sub に発行されてからワーカーが受信するまでの時間（ミリ秒）."""
+        if self.published_at is None:
+            return None
+        return max(0.0, (self.received_at - self.published_at) * 1000)
+
+    def breakdown(self, processing_seconds: float, completed_at: float) -> dict[str, float | None]:
+        """ジョブのレイテンシ内訳（ミリ秒）を返す.
+
+        - upload_ms: アプリでのPDFアップロード時間
+        - publish_ms: アップロード完了から Pub/Sub に発行されるまで（マイクロバッチの待ちを含む）
+        - queue_wait_ms: 発行からワーカーの受信まで（キュー待ち・再配信）
+        - processing_ms: ワーカーでの処理時間
+        - total_ms: ジョブ登録から処理完了まで
+
+        Args:
+            processing_seconds: ワーカーでの処理時間（秒）
+            completed_at: 処理完了時刻（UNIX時刻）
+
+        Returns:
+            dict[str, float | None]: レイテンシ内訳（計測できない項目は None）
+        """
+        publish_ms = None
+        if self.submitted_at is not None and self.published_at is not None:
+            publish_ms = max(
+                0.0, (self.published_at - self.submitted_at) * 1000 - (self.upload_ms or 0.0)
+            )
+        total_ms = (
+            (completed_at - self.submitted_at) * 1000 if self.submitted_at is not None else None
+        )
+
+        def rounded(value: float | None) -> float | None:
+            return round(value, 1) if value is not None else None
+
+        return {
+            "upload_ms": rounded(self.upload_ms),
+            "publish_ms": rounded(publish_ms),
+            "queue_wait_ms": rounded(self.queue_wait_ms),
+            "processing_ms": rounded(processing_seconds * 1000),
+            "total_ms": rounded(total_ms),
+        }
+
+
+def get_span_exporter(settings: Settings) -> SpanExporter | None:
+    """設定に基づいてスパンのエクスポーターを返す.
+
+    Args:
+        settings: アプリケーション設定
+
+    Returns:
+        SpanExporter | None: エクスポーター（TRACE_EXPORTER=none の場合は None）
+
+    Raises:
+        ValueError: 未知のエクスポーター種別の場合
+    """
+    if settings.trace_exporter == "none":
+        return None
+    elif settings.trace_exporter == "console":
+        return ConsoleSpanExporter()
+    elif settings.trace_exporter == "file":
+        return FileSpanExporter(settings.trace_file_path)
+    else:
+        raise ValueError(f"Unknown trace exporter: {settings.trace_exporter}")
+
+
+# プロセス全体で共有するトレーサー（configure_tracing で出力先を設定する）
+_tracer = Tracer("batch-worker")
+
+
+def configure_tracing(exporter: SpanExporter | None, service: str = "batch-worker") -> Tracer:
+    """共有トレーサーの出力先を設定する.
+
+    Args:
+        exporter: スパンの出力先（None の場合は無効）
+        service: サービス名
+
+    Returns:
+        Tracer: 設定したトレーサー
+    """
+    global _tracer
+    _tracer = Tracer(service, exporter)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    """共有トレーサーを返す."""
+    return _tracer
@@ -0,0 +1,125 @@
+"""ワーカーのウォームアップモジュール.
+
+Cloud Run の最小インスタンス数が0の場合、多くのジョブがコールドスタートしたインスタンスに届く。
+最初のジョブが遅延初期化（クライアントの生成、重いモジュールの import、Redisへの接続）を
+待たないよう、起動直後やヘルスチェック・スタートアッププローブを契機に初期化を済ませる。
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class WarmUpResult:
+    """ウォームアップの状態スナップショット."""
+
+    # idle: 未実行 / running: 実行中 / ready: 完了 / failed: 失敗したステップがある
+    state: str
+    step_seconds: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    total_seconds: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        """すべてのステップが成功したかどうか."""
+        return self.state == "ready"
+
+    def to_dict(self) -> dict[str, Any]:
+        """メトリクス出力用の辞書を返す."""
+        return {
+            "state": self.state,
+            "step_seconds": {name: round(value, 4) for name, value in self.step_seconds.items()},
+            "errors": self.errors,
+            "total_seconds": (
+                round(self.total_seconds, 4) if self.total_seconds is not None else None
+            ),
+        }
+
+
+class WarmUp:
+    """初期化のステップをバックグラウンドスレッドで1回だけ実行する.
+
+    失敗したステップがある場合は failed となり、次の `start` / `run` で再実行する。
+    fork 後の子プロセスでは状態を引き継がない（親プロセスで完了した初期化も子プロセスでやり直す）。
+    """
+
+    def __init__(self, steps: dict[str, Callable[[], object]]) -> None:
+        """初期化.
+
+        Args:
+            steps: ステップ名と初期化関数（登録順に実行する）
+        """
+        self._steps = steps
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._result = WarmUpResult(state="idle")
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        """fork 後の子プロセスで状態を未実行に戻す."""
+        self._lock = threading.Lock()
+        self._thread = None
+        self._result = WarmUpResult(state="idle")
+
+    @property
+    def result(self) -> WarmUpResult:
+        """現在の状態."""
+        return self._result
+
+    def start(self) -> bool:
+        """未実行・失敗済みの場合はバックグラウンドで実行を開始する.
+
+        Returns:
+            bool: 実行を開始した場合は True（実行中・完了済みの場合は False）
+        """
+        with self._lock:
+            if self._result.state in ("running", "ready"):
+                return False
+            self._result = WarmUpResult(state="running")
+            self._thread = threading.Thread(target=self._run_steps, name="warm-up", daemon=True)
+            self._thread.start()
+            return True
+
+    def run(self, timeout: float | None = None) -> WarmUpResult:
+        """実行を開始し（実行中の場合はそのまま）、完了まで待つ.
+
+        Args:
+            timeout: 待機する最大時間（秒、None の場合は完了まで待つ）
+
+        Returns:
+            WarmUpResult: 待機後の状態（タイムアウトした場合は running）
+        """
+        self.start()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._result
+
+    def _run_steps(self) -> None:
+        """ステップを登録順に実行し、結果を記録する（失敗しても残りのステップは実行する）."""
+        started = time.perf_counter()
+        step_seconds: dict[str, float] = {}
+        errors: dict[str, str] = {}
+        for name, step in self._steps.items():
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"Warm-up step {name} failed: {e}")
+                errors[name] = str(e)
+            step_seconds[name] = time.perf_counter() - step_started
+
+        total_seconds = time.perf_counter() - started
+        self._result = WarmUpResult(
+            state="failed" if errors else "ready",
+            step_seconds=step_seconds,
+            errors=errors,
+            total_seconds=total_seconds,
+        )
+        logger.info(f"Warm-up {self._result.state} in {total_seconds * 1000:.0f} ms")
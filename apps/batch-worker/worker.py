@@ -3,17 +3,33 @@
 Pub/SubからのHTTP POSTリクエストを受信し、PDF処理を実行する。
 """
 
-import base64
-import json
-from datetime import UTC, datetime
+import time
+from typing import cast
 
 import redis
-from flask import Flask, request
+from flask import Flask, g, jsonify, request
+from flask.typing import ResponseReturnValue
 from loguru import logger
 
+from cancellation import CancellationMetrics, JobCancelledError
+from clients import LazyClient, initialize
 from config import Settings
-from processor import PDFProcessor
-from storage import get_storage_client
+from history import HistoryArchiver, HistoryFlushThread
+from limiter import AdaptiveConcurrencyLimiter
+from messages import InvalidMessageError, JobMessage, parse_push_envelope
+from processor import (
+    BatchPDFProcessor,
+    PDFProcessor,
+    build_status_data,
+    configure_status_store,
+    queue_status,
+)
+from profiling import JobProfiler, ProfilingPolicy, profile_requested
+from publisher import MessagePublisher, PubSubPublisher
+from sharding import ShardAbortedError, ShardCoordinator, ShardProcessor, ShardSpec
+from storage import StorageClient, get_storage_client
+from tracing import JobTiming, configure_tracing, get_span_exporter
+from warmup import WarmUp
 
 # Flask アプリケーション初期化
 app = Flask(__name__)
@@ -25,98 +41,312 @@ logger.info(f"  STORAGE_TYPE: {settings.storage_type}")
 logger.info(f"  REDIS_HOST: {settings.redis_host}:{settings.redis_port}")
 logger.info(f"  GCP_PROJECT_ID: {settings.gcp_project_id}")
 
-# ストレージクライアント初期化
-storage_client = get_storage_client(settings)
-
-# Redisクライアント初期化
-redis_client = redis.Redis(
-    host=settings.redis_host,
-    port=settings.redis_port,
-    db=settings.redis_db,
-    decode_responses=True,
+# ストレージ・Redisクライアント（最初の利用時に生成し、fork 後の子プロセスでは作り直す）
+# GCSクライアントの生成は google.cloud.storage の import を含むため、import 時に行わない
+storage_client: StorageClient = cast(
+    StorageClient, LazyClient("storage", lambda: get_storage_client(settings))
+)
+redis_client: redis.Redis = cast(
+    redis.Redis,
+    LazyClient(
+        "redis",
+        lambda: redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            decode_responses=True,
+        ),
+    ),
 )
-logger.info("Redis client initialized")
+if not settings.lazy_client_init:
+    initialize(storage_client)
+    initialize(redis_client)
+    logger.info("Storage and Redis clients initialized")
+
+# トレーシング初期化（TRACE_EXPORTER=none の場合はスパンを記録しない）
+tracer = configure_tracing(get_span_exporter(settings))
+
+# 適応型同時実行数リミッター初期化
+limiter: AdaptiveConcurrencyLimiter | None = None
+if settings.concurrency_limit_enabled:
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=settings.concurrency_limit_initial,
+        min_limit=settings.concurrency_limit_min,
+        max_limit=settings.concurrency_limit_max,
+        latency_tolerance=settings.concurrency_latency_tolerance,
+    )
+    logger.info(f"Concurrency limiter enabled (initial limit: {limiter.limit})")
+
+# ジョブ単位のプロファイリング（無効時は None のままで判定処理も行わない）
+profiling_policy: ProfilingPolicy | None = None
+if settings.profile_enabled:
+    profiling_policy = ProfilingPolicy(redis_client, settings.profile_sample_rate)
+    logger.info(f"Job profiling enabled (sample rate: {settings.profile_sample_rate})")
+
+# ジョブ履歴のアーカイブ（終了ステータスをキューに積み、バックグラウンドスレッドでまとめて書き込む）
+configure_status_store(settings.history_enabled, settings.terminal_status_ttl_seconds)
+history_archiver: HistoryArchiver | None = None
+if settings.history_enabled:
+    history_archiver = HistoryArchiver(
+        redis_client,
+        storage_client,
+        batch_size=settings.history_batch_size,
+        max_age_seconds=settings.history_max_age_seconds,
+        check_interval_seconds=settings.history_check_interval_seconds,
+        retention_days=settings.history_retention_days,
+    )
+
+
+def _archive_history() -> None:
+    """条件を満たしていれば、終了したジョブの履歴を履歴ストアに書き込む（失敗は無視する）.
+
+    実行時に `history_archiver` を参照するため、差し替えたアーカイバーも使われる。
+    """
+    if history_archiver is None:
+        return
+    try:
+        history_archiver.maybe_flush()
+    except Exception as e:
+        logger.error(f"Failed to archive job history: {e}")
 
 
-@app.route("/", methods=["POST"])
-def handle_pubsub_message() -> tuple[str, int]:
-    """Pub/SubからのPushメッセージを処理する.
+# 履歴のフラッシュはリクエスト処理（Pub/Sub への ACK）を待たせないよう、バックグラウンドで行う
+# （gunicorn の post_fork フック・最初の Push リクエストで開始する）
+history_flusher = HistoryFlushThread(_archive_history, settings.history_check_interval_seconds)
+
+# キャンセルにより解放した処理量の集計
+cancellation_metrics = CancellationMetrics()
+
+# シャードメッセージの発行クライアント（初回のシャード分割時に初期化）
+_publisher: MessagePublisher | None = None
 
-    Push型 Pub/Sub は以下のJSONフォーマットでPOSTリクエストを送信:
-    {
-        "message": {
-            "data": "base64エンコードされたメッセージ",
-            "messageId": "...",
-            "publishTime": "..."
-        },
-        "subscription": "..."
-    }
+
+def get_publisher() -> MessagePublisher:
+    """シャードメッセージの発行クライアントを返す（初回呼び出し時に初期化）.
 
     Returns:
-        tuple[str, int]: レスポンスメッセージとステータスコード
+        MessagePublisher: 発行クライアント
     """
-    job_id: str | None = None
+    global _publisher
+    if _publisher is None:
+        if not settings.gcp_project_id:
+            raise ValueError("GCP_PROJECT_ID is required for shard fan-out")
+        _publisher = PubSubPublisher(
+            settings.gcp_project_id, settings.pubsub_topic, settings.message_schema_version
+        )
+    return _publisher
 
-    try:
-        # リクエストボディからPub/Subメッセージを取得
-        envelope = request.get_json()
-        if not envelope:
-            logger.error("No JSON body received")
-            return "Bad Request: no JSON body", 400
 
-        # Pub/Subメッセージを抽出
-        if "message" not in envelope:
-            logger.error("Invalid Pub/Sub message format: missing 'message' field")
-            return "Bad Request: missing message field", 400
+def _warm_up_redis() -> None:
+    """Redisクライアントを生成し、コネクションプールに接続を1本確立する."""
+    redis_client.ping()
 
-        pubsub_message = envelope["message"]
 
-        # Base64エンコードされたデータをデコード
-        if "data" not in pubsub_message:
-            logger.error("Invalid Pub/Sub message: missing 'data' field")
-            return "Bad Request: missing data field", 400
+def _warm_up_storage() -> None:
+    """ストレージクライアントを生成する（GCSの場合は google.cloud.storage の import を含む）."""
+    initialize(storage_client)
 
-        message_data = base64.b64decode(pubsub_message["data"]).decode("utf-8")
-        logger.info(f"Received message: {message_data}")
 
-        # メッセージパース
-        message_dict = json.loads(message_data)
-        job_id = message_dict.get("job_id")
-        pdf_path = message_dict.get("pdf_path")
+def _warm_up_publisher() -> None:
+    """シャード分割が有効な場合は、シャードメッセージの発行クライアントを生成する."""
+    if settings.shard_enabled and settings.gcp_project_id:
+        get_publisher()
 
-        if not job_id or not pdf_path:
-            logger.error(f"Invalid message format: {message_dict}")
-            return "Bad Request: missing job_id or pdf_path", 400
 
-        logger.info(f"Processing job {job_id}, PDF: {pdf_path}")
+# 最初のジョブより前にクライアントを初期化するウォームアップ
+# （gunicorn の post_fork フック・/health で開始し、/warmup は完了まで待つ）
+warm_up = WarmUp(
+    {
+        "redis": _warm_up_redis,
+        "storage": _warm_up_storage,
+        "publisher": _warm_up_publisher,
+    }
+)
+
+
+@app.route("/", methods=["POST"])
+def handle_pubsub_message() -> tuple[str, int]:
+    """Pub/SubからのPushメッセージを処理する.
 
-        # 処理実行
-        processor = PDFProcessor(job_id, pdf_path, storage_client, redis_client)
-        result_path = processor.process()
+    同時実行数が上限に達している場合は 429 を返す。Pub/Sub は 2xx 以外を NACK として扱い、
+    バックオフ後に再配信する。履歴のフラッシュスレッドが未開始の場合は開始する（完了は待たない）。
+
+    Returns:
+        tuple[str, int]: レスポンスメッセージとステータスコード
+    """
+    if history_archiver is not None:
+        history_flusher.start()
+
+    if limiter is None:
+        return _process_push_message()
+    elif not limiter.try_acquire():
+        logger.warning(f"Concurrency limit reached ({limiter.limit}), rejecting message")
+        return "Too Many Requests: concurrency limit reached", 429
+    else:
+        g.page_latency = None
+        try:
+            return _process_push_message()
+        finally:
+            limiter.release(g.page_latency)
+
+
+def _process_push_message() -> tuple[str, int]:
+    """Pushメッセージを解析してPDF処理を実行する.
+
+    エンベロープ形式は `messages.parse_push_envelope` を参照。複数ジョブを含むバッチメッセージは
+    `BatchPDFProcessor` でまとめて処理する。ページ数が `SHARD_MIN_PAGES` 以上のPDFは
+    ページ範囲ごとのシャードメッセージに分割して再発行し、シャードメッセージは
+    `ShardProcessor` で処理する（最後のシャードが結果をマージする）。
+    キャンセルされたジョブはページの区切りで中止し、解放した処理量をメトリクスに記録する。
+    プロファイル取得対象の単一ジョブは、CPUプロファイルとメモリスナップショットを記録する。
+    処理に成功した場合は、ページ単位のレイテンシを `g.page_latency` に記録する。
+    メッセージ属性のトレースコンテキストを親としてスパンを記録し、完了ステータスには
+    レイテンシ内訳（アップロード・発行・キュー待ち・処理）を含める。
+
+    Returns:
+        tuple[str, int]: レスポンスメッセージとステータスコード
+    """
+    job_ids: list[str] = []
+    started = time.monotonic()
+    received_at = time.time()
 
-        logger.info(f"Job {job_id} completed. Result: {result_path}")
+    try:
+        # リクエストボディからPub/Subメッセージを取得
+        try:
+            job_messages = parse_push_envelope(request.get_json())
+        except InvalidMessageError as e:
+            return f"Bad Request: {e}", 400
+
+        job_ids = [job_message.job_id for job_message in job_messages]
+        timings = {
+            job_message.job_id: JobTiming.from_message(
+                job_message.attributes, job_message.publish_time, received_at
+            )
+            for job_message in job_messages
+        }
+        for job_message in job_messages:
+            _record_delivery_spans(job_message, timings[job_message.job_id], time.time())
+        page_delay_range = (settings.mock_page_delay_min, settings.mock_page_delay_max)
+        page_count_range = (settings.mock_page_count_min, settings.mock_page_count_max)
+        cancel_check_interval = settings.cancel_check_interval_seconds
+
+        if len(job_messages) == 1 and job_messages[0].shard is not None:
+            job_id = job_messages[0].job_id
+            shard = ShardSpec(**job_messages[0].shard)
+            logger.info(f"Processing job {job_id}, shard {shard.index + 1}/{shard.count}")
+
+            # シャード処理実行（最後に完了したシャードが結果をマージする）
+            shard_processor = ShardProcessor(
+                job_id,
+                job_messages[0].pdf_path,
+                shard,
+                storage_client,
+                redis_client,
+                page_delay_range=page_delay_range,
+                cancel_check_interval=cancel_check_interval,
+                timing=timings[job_id],
+            )
+            with tracer.span(
+                "process_shard", parent=timings[job_id].parent, job_id=job_id, shard=shard.index
+            ):
+                shard_processor.process()
+            g.page_latency = (time.monotonic() - started) / shard_processor.page_count
+        elif len(job_messages) == 1:
+            job_id = job_messages[0].job_id
+            pdf_path = job_messages[0].pdf_path
+            logger.info(f"Processing job {job_id}, PDF: {pdf_path}")
+
+            processor = PDFProcessor(
+                job_id,
+                pdf_path,
+                storage_client,
+                redis_client,
+                page_delay_range=page_delay_range,
+                page_count_range=page_count_range,
+                cancel_check_interval=cancel_check_interval,
+                timing=timings[job_id],
+            )
+
+            profile_reason = _profile_reason(job_messages[0])
+
+            # 大きなPDFはシャードに分割して複数インスタンスで並列処理する
+            # （プロファイルの取得を要求されたジョブは分割せず、このインスタンスで処理する）
+            if (
+                settings.shard_enabled
+                and processor.page_count >= settings.shard_min_pages
+                and profile_reason in (None, "sampled")
+            ):
+                coordinator = ShardCoordinator(job_id, pdf_path, redis_client, get_publisher())
+                with tracer.span("fan_out", parent=timings[job_id].parent, job_id=job_id):
+                    coordinator.fan_out(
+                        processor.page_count, settings.shard_pages, job_messages[0].attributes
+                    )
+                return "OK", 200
+
+            # 処理実行
+            with tracer.span("process_job", parent=timings[job_id].parent, job_id=job_id):
+                result_path = _run_processor(processor, job_messages[0], profile_reason)
+            g.page_latency = (time.monotonic() - started) / processor.page_count
+
+            logger.info(f"Job {job_id} completed. Result: {result_path}")
+        else:
+            logger.info(f"Processing batch of {len(job_messages)} jobs: {job_ids}")
+            if profiling_policy is not None:
+                # フロントエンドはプロファイルの取得を要求したジョブをバッチにまとめない
+                requested = [m.job_id for m in job_messages if profile_requested(m.attributes)]
+                if requested:
+                    logger.warning(f"Profiling is not supported for batched jobs: {requested}")
+
+            # バッチ処理実行（ジョブ単位の失敗は BatchPDFProcessor 内で failed として記録される）
+            batch_processor = BatchPDFProcessor(
+                [(job_message.job_id, job_message.pdf_path) for job_message in job_messages],
+                storage_client,
+                redis_client,
+                page_delay_range=page_delay_range,
+                page_count_range=page_count_range,
+                cancel_check_interval=cancel_check_interval,
+                timings=timings,
+            )
+            # バッチは1つのスパンで記録し、各ジョブのトレースとは job_ids 属性で関連付ける
+            with tracer.span("process_batch", job_ids=job_ids):
+                results = batch_processor.process()
+            g.page_latency = (time.monotonic() - started) / batch_processor.tick_count
+
+            cancelled = [
+                result for result in results.values() if isinstance(result, JobCancelledError)
+            ]
+            for error in cancelled:
+                _record_cancellation(error, started)
+            failed = [job_id for job_id, result in results.items() if isinstance(result, Exception)]
+            logger.info(
+                f"Batch completed ({len(results) - len(failed)} ok, "
+                f"{len(failed) - len(cancelled)} failed, {len(cancelled)} cancelled)"
+            )
 
         # 成功レスポンス（Pub/Subに ACK を返す）
         return "OK", 200
 
+    except JobCancelledError as e:
+        # キャンセル済み（ステータスは cancelled として記録済み）。Pub/Subに ACK を返す
+        _record_cancellation(e, started)
+        return "OK", 200
+
     except Exception as e:
         logger.error(f"Error processing message: {e}", exc_info=True)
 
         # エラーステータスをRedisに記録（TTL: 24時間）
-        if job_id:
+        if job_ids:
             try:
-                job_key = f"job:{job_id}"
-                error_status = {
-                    "status": "failed",
-                    "progress": 0,
-                    "message": "Error occurred",
-                    "result_url": "",
-                    "error_msg": str(e),
-                    "updated_at": datetime.now(UTC).isoformat(),
-                }
-                # TTL 24時間（86400秒）を設定
-                redis_client.setex(job_key, 86400, json.dumps(error_status))
-                logger.info(f"Error status saved to Redis for job {job_id}")
+                error_status = build_status_data(
+                    status="failed", progress=0, message="Error occurred", error_msg=str(e)
+                )
+                # 他のシャードの失敗による中断は、失敗したシャードが件数を数える
+                count = not isinstance(e, ShardAbortedError)
+                pipe = redis_client.pipeline(transaction=False)
+                for job_id in job_ids:
+                    queue_status(pipe, job_id, error_status, count=count)
+                pipe.execute()
+                logger.info(f"Error status saved to Redis for jobs {job_ids}")
             except Exception as redis_error:
                 logger.error(f"Failed to update error status in Redis: {redis_error}")
 
@@ -125,16 +355,122 @@ def handle_pubsub_message() -> tuple[str, int]:
         return "OK", 200
 
 
+def _profile_reason(job_message: JobMessage) -> str | None:
+    """プロファイルを取得する理由を返す（無効時は判定処理を呼び出さない）.
+
+    Args:
+        job_message: ジョブメッセージ
+
+    Returns:
+        str | None: `ProfilingPolicy.reason` の戻り値（取得しない場合は None）
+    """
+    if profiling_policy is None:
+        return None
+    return profiling_policy.reason(job_message.job_id, job_message.attributes)
+
+
+def _run_processor(
+    processor: PDFProcessor, job_message: JobMessage, profile_reason: str | None
+) -> str:
+    """PDF処理を実行する（プロファイル取得対象のジョブはプロファイラで囲む）.
+
+    Args:
+        processor: PDF処理クラス
+        job_message: ジョブメッセージ
+        profile_reason: プロファイルを取得する理由（`_profile_reason` の戻り値）
+
+    Returns:
+        str: 結果ファイルのパス
+    """
+    if profile_reason is None:
+        return processor.process()
+    with JobProfiler(job_message.job_id, storage_client, redis_client, profile_reason):
+        return processor.process()
+
+
+def _record_delivery_spans(job_message: JobMessage, timing: JobTiming, decoded_at: float) -> None:
+    """Pub/Sub のキュー待ちとメッセージ解析のスパンを記録する.
+
+    Args:
+        job_message: ジョブメッセージ
+        timing: レイテンシ内訳の計測点
+        decoded_at: メッセージの解析が完了した時刻（UNIX時刻）
+    """
+    if not tracer.enabled:
+        return
+    if timing.published_at is not None:
+        tracer.record_span(
+            "pubsub.queue_wait",
+            timing.published_at,
+            timing.received_at,
+            parent=timing.parent,
+            job_id=job_message.job_id,
+        )
+    tracer.record_span(
+        "decode", timing.received_at, decoded_at, parent=timing.parent, job_id=job_message.job_id
+    )
+
+
+def _record_cancellation(error: JobCancelledError, started: float) -> None:
+    """キャンセルで解放した処理量をメトリクスに記録する.
+
+    中止までの1ページあたりの処理時間から、処理しなかったページ分の時間を推定する。
+
+    Args:
+        error: キャンセル時の例外
+        started: 処理開始時刻（time.monotonic）
+    """
+    if error.pages_done:
+        page_seconds = (time.monotonic() - started) / error.pages_done
+    else:
+        page_seconds = (settings.mock_page_delay_min + settings.mock_page_delay_max) / 2
+    cancellation_metrics.record(error, page_seconds)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> ResponseReturnValue:
+    """ワーカーのメトリクス（同時実行数の上限・拒否数、キャンセルで解放した処理量、
+    ウォームアップの状態など）を返す.
+
+    Returns:
+        ResponseReturnValue: メトリクスのJSON
+    """
+    return jsonify(
+        {
+            "concurrency": limiter.stats().to_dict() if limiter else None,
+            "cancellation": cancellation_metrics.stats().to_dict(),
+            "warm_up": warm_up.result.to_dict(),
+        }
+    )
+
+
 @app.route("/health", methods=["GET"])
 def health_check() -> tuple[str, int]:
     """ヘルスチェックエンドポイント.
 
+    ウォームアップが未実行・失敗済みの場合はバックグラウンドで開始する（完了は待たない）。
+
     Returns:
         tuple[str, int]: レスポンスメッセージとステータスコード
     """
+    warm_up.start()
     return "OK", 200
 
 
+@app.route("/warmup", methods=["GET"])
+def warmup_check() -> ResponseReturnValue:
+    """ウォームアップの完了まで待つエンドポイント（Cloud Run のスタートアッププローブ用）.
+
+    スタートアッププローブが成功するまでインスタンスにリクエストは振り分けられないため、
+    最初のジョブはクライアントの初期化を待たずに処理を開始できる。
+
+    Returns:
+        ResponseReturnValue: ウォームアップの状態のJSON（失敗・タイムアウトした場合は 503）
+    """
+    result = warm_up.run(timeout=settings.warmup_timeout_seconds)
+    return jsonify(result.to_dict()), 200 if result.ready else 503
+
+
 if __name__ == "__main__":
     # 本番環境では gunicorn で起動するため、このブロックは開発用
     import os
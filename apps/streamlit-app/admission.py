@@ -0,0 +1,396 @@
+"""ジョブ登録のアドミッション制御モジュール.
+
+混雑時にジョブを Pub/Sub に発行し続けると、サブスクリプションでの待ちがワーカーのタイムアウトや
+確認応答期限を超えて再配信が連鎖するため、登録時にシステム内の待ち時間を見積もって受け付けを制御する。
+
+- バックログ: フロントエンドとワーカーが更新するステータス集合（`status:pending` /
+  `status:processing`）の件数と、スループットで待ち時間を見積もる。処理中のジョブは
+  `processing_heartbeat_seconds` 以内に更新されたものだけを数える（停止したワーカーの処理中ジョブを
+  除く）。スループットは直近の終了件数（`stats:{bucket}`）から求めた値と、設定したワーカーの処理能力の
+  大きい方とする（低負荷時の終了件数は需要を表し、処理能力を過小に見積もるため）
+- 即時発行: 見積もりが `max_wait_seconds` 以下で、受付待ちのジョブが無い場合
+- 受付待ち: それ以外で受付待ちに空きがあり、完了までの見積もりが `max_eta_seconds` 以下の場合は
+  Redisの受付待ちキュー（`admission:queue`）に積み、`AdmissionController.drain` が空きに応じて
+  登録順に発行する（複数のアプリインスタンスで共有）
+- 拒否: 受付待ちも満杯の場合
+- ユーザーごとのトークンバケット（`ratelimit:{user_id}`）で登録の頻度を制限する
+
+`job:*` のSCANやステータス集合に含まれないよう、ジョブステータスとは別のプレフィックスを使う。
+"""
+
+import json
+import math
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import redis
+from loguru import logger
+
+from job_stats import (
+    STATS_RETENTION_SECONDS,
+    load_summary,
+    queue_submission,
+    status_set_key,
+)
+
+# 受付待ちキュー（sorted set、スコアは登録時刻）と、発行処理の排他ロック
+ADMISSION_QUEUE_KEY = "admission:queue"
+ADMISSION_LOCK_KEY = "admission:drain_lock"
+
+# 受付待ちのジョブの保持期間と、発行処理のロックの有効期限
+ADMISSION_JOB_TTL_SECONDS = 86400
+DRAIN_LOCK_TTL_SECONDS = 60
+
+# スループットの観測値を使うのに必要な、集計期間内の終了件数
+MIN_THROUGHPUT_SAMPLES = 5
+
+# 発行処理のロックを、取得時のトークンと一致する場合だけ削除する
+# （有効期限切れの後に他のインスタンスが取得したロックを削除しない）
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def admission_job_key(job_id: str) -> str:
+    """受付待ちのジョブのメッセージを保存するRedisキーを返す."""
+    return f"admission:job:{job_id}"
+
+
+def rate_limit_key(user_id: str) -> str:
+    """ユーザーごとのトークンバケットのRedisキーを返す."""
+    return f"ratelimit:{user_id}"
+
+
+class TokenBucket:
+    """Redisに状態を保存するユーザーごとのトークンバケット（アプリインスタンス間で共有）.
+
+    トークンの読み込みと更新は WATCH / MULTI で楽観的に排他する。
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        capacity: int,
+        refill_per_second: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """初期化.
+
+        Args:
+            redis_client: Redisクライアント
+            capacity: バケットの容量（連続して登録できる件数）
+            refill_per_second: 1秒あたりに補充するトークン数
+            clock: 現在時刻（UNIX時刻）を返す関数
+        """
+        if capacity < 1 or refill_per_second <= 0:
+            raise ValueError("capacity must be >= 1 and refill_per_second must be positive")
+        self.redis_client = redis_client
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        # 満杯まで補充される時間を過ぎたバケットは削除してよい
+        self._ttl_seconds = math.ceil(capacity / refill_per_second) + 60
+
+    def take(self, user_id: str) -> float:
+        """トークンを1つ消費する.
+
+        Args:
+            user_id: ユーザーID
+
+        Returns:
+            float: 消費できた場合は0、できなかった場合は次のトークンが補充されるまでの秒数
+        """
+        key = rate_limit_key(user_id)
+
+        def attempt(pipe: Any) -> float:
+            tokens_str, updated_at_str = pipe.hmget(key, "tokens", "updated_at")
+            now = self._clock()
+            tokens = float(self.capacity)
+            if tokens_str is not None and updated_at_str is not None:
+                elapsed = max(0.0, now - float(updated_at_str))
+                tokens = min(tokens, float(tokens_str) + elapsed * self.refill_per_second)
+
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / self.refill_per_second
+            pipe.multi()
+            pipe.hset(key, mapping={"tokens": tokens, "updated_at": now})
+            pipe.expire(key, self._ttl_seconds)
+            return retry_after
+
+        return self.redis_client.transaction(attempt, key, value_from_callable=True)
+
+
+@dataclass(frozen=True)
+class Backlog:
+    """システム内のジョブ数とスループット."""
+
+    pending: int
+    processing: int
+    queued: int
+    jobs_per_second: float
+
+    @property
+    def in_flight(self) -> int:
+        """発行済みで終了していないジョブ数."""
+        return self.pending + self.processing
+
+    def wait_seconds(self, jobs_ahead: int) -> float:
+        """先行するジョブがすべて終了するまでの見積もり（秒、スループットが0の場合は無限大）."""
+        if jobs_ahead <= 0:
+            return 0.0
+        if self.jobs_per_second <= 0:
+            return math.inf
+        return jobs_ahead / self.jobs_per_second
+
+
+@dataclass(frozen=True)
+class AdmissionDecision:
+    """ジョブ登録の可否."""
+
+    # "publish"（即時発行） / "queue"（受付待ち） / "reject"（拒否） / "rate_limited"（頻度超過）
+    action: str
+    backlog: Backlog
+    # 登録したジョブが完了するまでの見積もり（秒）
+    eta_seconds: float
+    # 再試行までの待ち時間（rate_limited の場合のみ）
+    retry_after_seconds: float = 0.0
+
+
+class AdmissionController:
+    """ジョブ登録の受け付けと、受付待ちのジョブの発行を制御する."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        rate_limiter: TokenBucket | None = None,
+        max_wait_seconds: float = 1200.0,
+        max_eta_seconds: float = 7200.0,
+        max_queued: int = 500,
+        capacity_jobs_per_second: float = 0.1,
+        throughput_window_seconds: int = 900,
+        processing_heartbeat_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """初期化.
+
+        Args:
+            redis_client: Redisクライアント
+            rate_limiter: ユーザーごとの頻度制限（None の場合は制限しない）
+            max_wait_seconds: 発行済みのジョブが完了するまでの見積もりの上限
+                （ワーカーのタイムアウトより短くする）
+            max_eta_seconds: 受付待ちを含め、登録したジョブが完了するまでの見積もりの上限
+            max_queued: 受付待ちに積めるジョブ数の上限
+            capacity_jobs_per_second: ワーカー全体の処理能力（スループットの下限として使う）
+            throughput_window_seconds: スループットを求める集計期間
+            processing_heartbeat_seconds: 処理中のジョブとして数える、最終更新からの経過時間の上限
+            clock: 現在時刻（UNIX時刻）を返す関数
+
+        Raises:
+            ValueError: capacity_jobs_per_second・throughput_window_seconds・
+                processing_heartbeat_seconds のいずれかが正でない場合
+        """
+        if (
+            capacity_jobs_per_second <= 0
+            or throughput_window_seconds <= 0
+            or processing_heartbeat_seconds <= 0
+        ):
+            raise ValueError(
+                "capacity_jobs_per_second, throughput_window_seconds and "
+                "processing_heartbeat_seconds must be positive"
+            )
+        self.redis_client = redis_client
+        self.rate_limiter = rate_limiter
+        self.max_wait_seconds = max_wait_seconds
+        self.max_eta_seconds = max_eta_seconds
+        self.max_queued = max_queued
+        self.capacity_jobs_per_second = capacity_jobs_per_second
+        self.throughput_window_seconds = throughput_window_seconds
+        self.processing_heartbeat_seconds = processing_heartbeat_seconds
+        self._clock = clock
+        self._release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def backlog(self) -> Backlog:
+        """現在のバックログを返す.
+
+        Returns:
+            Backlog: 処理待ち・処理中・受付待ちのジョブ数とスループット
+        """
+        now = self._clock()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zcount(status_set_key("pending"), now - STATS_RETENTION_SECONDS, "+inf")
+        # 処理中のジョブはページごとにスコア（最終更新時刻）が更新される
+        pipe.zcount(status_set_key("processing"), now - self.processing_heartbeat_seconds, "+inf")
+        pipe.zcard(ADMISSION_QUEUE_KEY)
+        pending, processing, queued = pipe.execute()
+        # 受付待ちのジョブも登録時に処理待ちの集合に入るため、発行済みの件数から除く
+        pending = max(0, pending - queued)
+
+        summary = load_summary(self.redis_client, self.throughput_window_seconds, now=now)
+        finished = summary.completed + summary.failed + summary.cancelled
+        jobs_per_second = self.capacity_jobs_per_second
+        if finished >= MIN_THROUGHPUT_SAMPLES:
+            jobs_per_second = max(jobs_per_second, finished / self.throughput_window_seconds)
+        return Backlog(pending, processing, queued, jobs_per_second)
+
+    def decide(self, user_id: str) -> AdmissionDecision:
+        """ジョブを登録できるかを判定する（受け付ける場合はユーザーのトークンを消費する）.
+
+        Args:
+            user_id: ユーザーID
+
+        Returns:
+            AdmissionDecision: 判定結果
+        """
+        backlog = self.backlog()
+        publish_eta = backlog.wait_seconds(backlog.in_flight + 1)
+        queue_eta = backlog.wait_seconds(backlog.in_flight + backlog.queued + 1)
+
+        # 受付待ちがある間は、登録順を保つため新しいジョブも受付待ちに積む
+        if not backlog.queued and publish_eta <= self.max_wait_seconds:
+            action, eta = "publish", publish_eta
+        elif backlog.queued < self.max_queued and queue_eta <= self.max_eta_seconds:
+            action, eta = "queue", queue_eta
+        else:
+            logger.warning(
+                f"Rejected submission from {user_id} "
+                f"(in flight {backlog.in_flight}, queued {backlog.queued}, eta {queue_eta:.0f}s)"
+            )
+            return AdmissionDecision("reject", backlog, queue_eta)
+
+        if self.rate_limiter is not None:
+            retry_after = self.rate_limiter.take(user_id)
+            if retry_after > 0:
+                return AdmissionDecision("rate_limited", backlog, eta, retry_after)
+        return AdmissionDecision(action, backlog, eta)
+
+    def enqueue(
+        self,
+        job_id: str,
+        message: dict[str, Any],
+        attributes: dict[str, str],
+        eta_seconds: float,
+    ) -> None:
+        """ジョブを受付待ちキューに積む.
+
+        即時発行と同じく登録時のカウンタと処理待ちの集合を更新し、`job:{job_id}` に pending の
+        ステータスを書き込む（`queue_submission`）。
+
+        Args:
+            job_id: ジョブID
+            message: 発行するメッセージ
+            attributes: メッセージ属性
+            eta_seconds: 完了までの見積もり（秒）
+        """
+        now = self._clock()
+        payload = {"message": message, "attributes": attributes}
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.setex(admission_job_key(job_id), ADMISSION_JOB_TTL_SECONDS, json.dumps(payload))
+        pipe.zadd(ADMISSION_QUEUE_KEY, {job_id: now})
+        queue_submission(
+            pipe,
+            job_id,
+            now=now,
+            message=f"Waiting for admission (ETA {eta_seconds / 60:.0f} min)",
+        )
+        pipe.execute()
+        logger.info(f"Queued job {job_id} for admission (eta {eta_seconds:.0f}s)")
+
+    def drain(
+        self, publish: Callable[[dict[str, Any], dict[str, str]], str], max_jobs: int = 100
+    ) -> int:
+        """バックログに空きがある分だけ、受付待ちのジョブを登録順に発行する.
+
+        発行は Redis のロックで同時に1インスタンスまでに制限する。ジョブは発行に成功してから
+        受付待ちキューから取り除くため、発行の途中で停止しても失われない（次回に再度発行する）。
+
+        Args:
+            publish: メッセージとメッセージ属性を受け取り、発行したメッセージIDを返す関数
+            max_jobs: 1回に発行する最大ジョブ数
+
+        Returns:
+            int: 発行したジョブ数（他のインスタンスが発行中の場合は0）
+        """
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(ADMISSION_LOCK_KEY, token, nx=True, ex=DRAIN_LOCK_TTL_SECONDS):
+            return 0
+
+        published = 0
+        try:
+            backlog = self.backlog()
+            in_flight = backlog.in_flight
+            while published < max_jobs:
+                if backlog.wait_seconds(in_flight + 1) > self.max_wait_seconds:
+                    break
+                head = self.redis_client.zrange(ADMISSION_QUEUE_KEY, 0, 0)
+                if not head:
+                    break
+                job_id = head[0]
+                payload_str = self.redis_client.get(admission_job_key(job_id))
+                if payload_str is None:
+                    pipe = self.redis_client.pipeline(transaction=True)
+                    pipe.zrem(ADMISSION_QUEUE_KEY, job_id)
+                    pipe.zrem(status_set_key("pending"), job_id)
+                    pipe.execute()
+                    logger.warning(f"Dropped queued job {job_id} (message expired)")
+                    continue
+
+                # 処理待ちの集合には受付待ちに積んだ時点で登録済み（`enqueue`）
+                # 発行に失敗した場合は受付待ちの先頭に残し、次回に再度発行する
+                payload = json.loads(payload_str)
+                publish(payload["message"], payload["attributes"])
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.zrem(ADMISSION_QUEUE_KEY, job_id)
+                pipe.delete(admission_job_key(job_id))
+                pipe.execute()
+                in_flight += 1
+                published += 1
+        finally:
+            self._release_lock(keys=[ADMISSION_LOCK_KEY], args=[token])
+
+        if published:
+            logger.info(f"Published {published} queued jobs")
+        return published
+
+    def start_drainer(
+        self,
+        publish: Callable[[dict[str, Any], dict[str, str]], str],
+        interval_seconds: float = 5.0,
+    ) -> None:
+        """受付待ちのジョブを定期的に発行するバックグラウンドスレッドを開始する.
+
+        Args:
+            publish: メッセージとメッセージ属性を受け取り、発行したメッセージIDを返す関数
+            interval_seconds: 発行を試みる間隔（秒）
+        """
+        if self._thread is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.drain(publish)
+                except Exception as e:
+                    logger.error(f"Failed to publish queued jobs: {e}")
+
+        self._thread = threading.Thread(target=run, name="admission-drainer", daemon=True)
+        self._thread.start()
+
+    def stop_drainer(self) -> None:
+        """バックグラウンドスレッドを停止する."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
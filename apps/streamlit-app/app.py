@@ -4,24 +4,42 @@ PDF一括解析システムのメインUIアプリケーション。
 ユーザーからのPDFファイルアップロードを受け付け、非同期バッチ処理をトリガーし、
 処理状況をリアルタイムに表示し、完了後に結果ファイルのダウンロードを提供する。
 
-3タブ構成:
+4タブ構成:
 - タブ1: ジョブ登録 - PDFアップロードとジョブ開始
-- タブ2: ジョブ一覧 - 過去24時間のジョブ履歴表示
+- タブ2: ジョブ一覧 - 過去24時間のジョブの集計と、絞り込み・ページング可能な一覧
 - タブ3: ステータス確認 - 選択ジョブの詳細表示
+- タブ4: ジョブ履歴 - オブジェクトストレージにアーカイブした長期の履歴（Redisは参照しない）
+
+混雑時のジョブ登録は受付待ちに積むか拒否し（アドミッション制御）、ユーザーごとに登録の頻度を制限する。
+処理待ち・処理中のジョブはタブ2・タブ3から中止でき、ワーカーはページの区切りで処理を止める。
+ワーカーがプロファイルを取得したジョブは、タブ3からプロファイルを参照できる。
 """
 
+import hashlib
 import json
 import time
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
 import redis
 import streamlit as st
 from loguru import logger
 
+from admission import AdmissionController, TokenBucket
 from config import Settings
-from pubsub_client import PubSubClient
+from history import HistoryReader
+from job_stats import JOB_STATUSES, load_job_page, load_summary, queue_submission
+from job_table import render_job_table
+from pubsub_client import BatchingPublisher, PubSubClient
 from storage import get_storage_client
+from tracing import (
+    SUBMITTED_AT_ATTRIBUTE,
+    UPLOAD_MS_ATTRIBUTE,
+    Tracer,
+    get_span_exporter,
+    inject,
+)
 
 # 設定読み込み
 settings = Settings()
@@ -40,7 +58,165 @@ if not settings.gcp_project_id:
     st.error("GCP_PROJECT_ID が設定されていません。環境変数を確認してください。")
     st.stop()
 
-pubsub_client = PubSubClient(settings.gcp_project_id, settings.pubsub_topic)
+
+@st.cache_resource
+def get_pubsub_client(project_id: str, topic_name: str) -> PubSubClient:
+    """Pub/Subクライアントを返す（セッション間で共有）."""
+    return PubSubClient(project_id, topic_name, settings.message_schema_version)
+
+
+@st.cache_resource
+def get_batching_publisher(project_id: str, topic_name: str) -> BatchingPublisher:
+    """小さなジョブをまとめて発行するパブリッシャーを返す（全セッションで1つを共有）."""
+    return BatchingPublisher(
+        get_pubsub_client(project_id, topic_name),
+        linger_seconds=settings.batch_linger_seconds,
+        max_jobs=settings.batch_max_jobs,
+    )
+
+
+@st.cache_resource
+def get_history_reader() -> HistoryReader:
+    """履歴ストアのリーダーを返す（セグメントのキャッシュを全セッションで共有）."""
+    return HistoryReader(storage_client)
+
+
+@st.cache_resource
+def get_app_tracer() -> Tracer:
+    """ジョブ登録のスパンを記録するトレーサーを返す（全セッションで1つを共有）."""
+    return Tracer("streamlit-app", get_span_exporter(settings))
+
+
+@st.cache_resource
+def get_admission_controller() -> AdmissionController | None:
+    """アドミッション制御を返す（受付待ちを発行するスレッドを含め、全セッションで1つを共有）."""
+    if not settings.admission_enabled:
+        return None
+    rate_limiter = None
+    if settings.rate_limit_per_minute > 0:
+        rate_limiter = TokenBucket(
+            redis_client, settings.rate_limit_burst, settings.rate_limit_per_minute / 60
+        )
+    controller = AdmissionController(
+        redis_client,
+        rate_limiter,
+        max_wait_seconds=settings.admission_max_wait_seconds,
+        max_eta_seconds=settings.admission_max_eta_seconds,
+        max_queued=settings.admission_max_queued,
+        capacity_jobs_per_second=settings.admission_capacity_jobs_per_minute / 60,
+        throughput_window_seconds=settings.admission_throughput_window_seconds,
+        processing_heartbeat_seconds=settings.admission_processing_heartbeat_seconds,
+    )
+    client = get_pubsub_client(settings.gcp_project_id, settings.pubsub_topic)
+    controller.start_drainer(client.publish_message, settings.admission_drain_interval_seconds)
+    return controller
+
+
+pubsub_client = get_pubsub_client(settings.gcp_project_id, settings.pubsub_topic)
+batching_publisher = get_batching_publisher(settings.gcp_project_id, settings.pubsub_topic)
+tracer = get_app_tracer()
+history_reader = get_history_reader()
+admission = get_admission_controller()
+
+# 中止できるステータス
+CANCELLABLE_STATUSES = ("pending", "processing")
+
+# タブ2の集計・絞り込みの期間、並び順、1ページあたりの件数
+JOB_LIST_WINDOWS = {"1時間": 3600, "6時間": 21600, "24時間": 86400}
+JOB_ORDER_LABELS = {
+    "updated_desc": "更新日時（新しい順）",
+    "updated_asc": "更新日時（古い順）",
+    "status": "ステータス順",
+}
+JOB_PAGE_SIZE = 50
+
+# 履歴にアーカイブされる終了ステータスと、タブ4の1ページあたりの件数
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+HISTORY_PAGE_SIZE = 50
+
+# プロファイル取得を要求するメッセージ属性（ワーカー側で PROFILE_ENABLED=true の場合に有効）
+PROFILE_ATTRIBUTE = "profile"
+
+# タブ3でプロファイルのファイルを表示する順序
+PROFILE_FILE_LABELS = {
+    "cpu_report": "CPUプロファイル（テキスト）",
+    "memory_report": "メモリスナップショット",
+    "cpu_profile": "CPUプロファイル（pstats）",
+}
+
+
+def current_user_id() -> str:
+    """頻度制限に使うユーザーIDを返す.
+
+    IAP の認証ヘッダーがある場合はメールアドレス、無い場合はセッションごとのIDを使う。
+    """
+    email = st.context.headers.get("X-Goog-Authenticated-User-Email")
+    if email:
+        return email.removeprefix("accounts.google.com:")
+    if "user_id" not in st.session_state:
+        st.session_state["user_id"] = f"session-{uuid.uuid4()}"
+    return st.session_state["user_id"]
+
+
+def format_eta(seconds: float) -> str:
+    """完了までの見積もりを表示用の文字列にする."""
+    if seconds < 60:
+        return "1分以内"
+    if seconds < 3600:
+        return f"約{seconds / 60:.0f}分"
+    return f"約{seconds / 3600:.1f}時間"
+
+
+def request_cancel(job_id: str) -> None:
+    """ジョブの中止をリクエストする.
+
+    Redisにキャンセルフラグ（TTL: 24時間）を書き込む。ワーカーはページの区切りでフラグを確認し、
+    処理を中止してステータスを cancelled に更新する。
+
+    Args:
+        job_id: ジョブID
+    """
+    redis_client.setex(f"cancel:{job_id}", 86400, "1")
+    logger.info(f"Cancellation requested for job {job_id}")
+
+
+def render_profile(job_id: str, profile: dict[str, Any]) -> None:
+    """ワーカーが取得したプロファイルの概要と、保存先へのリンクを表示する.
+
+    Args:
+        job_id: ジョブID
+        profile: プロファイルのサマリー（Redis の `profile:{job_id}`）
+    """
+    with st.expander("🔬 プロファイル", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("処理時間", f"{profile['wall_seconds']:.2f} s")
+        col2.metric("CPU時間", f"{profile['cpu_seconds']:.2f} s")
+        col3.metric("ピークメモリ", f"{profile['peak_memory_bytes'] / 1024 / 1024:.1f} MB")
+        st.caption(f"取得理由: {profile['reason']} / 取得日時: {profile['profiled_at']}")
+
+        prefix = profile["prefix"]
+        if settings.storage_type == "GCP" and settings.gcs_bucket_name:
+            st.link_button(
+                "📂 保存先を開く（Cloud Storage）",
+                "https://console.cloud.google.com/storage/browser/"
+                f"{settings.gcs_bucket_name}/{prefix}",
+            )
+        else:
+            st.caption(f"保存先: `{settings.local_storage_path}/{prefix}`")
+
+        for key, label in PROFILE_FILE_LABELS.items():
+            path = profile["files"][key]
+            try:
+                st.download_button(
+                    label=f"📥 {label}",
+                    data=storage_client.download_file(path),
+                    file_name=f"{job_id}_{path.rsplit('/', 1)[-1]}",
+                    key=f"profile_{key}_{job_id}",
+                )
+            except Exception as e:
+                logger.error(f"Error downloading profile {path}: {e}")
+                st.error(f"プロファイルのダウンロードに失敗しました: {path}")
+
 
 # ページ設定
 st.set_page_config(
@@ -51,8 +227,10 @@ st.set_page_config(
 
 st.title("📄 PDF一括解析システム")
 
-# 3タブ構成
-tab1, tab2, tab3 = st.tabs(["📤 ジョブ登録", "📋 ジョブ一覧", "📊 ステータス確認"])
+# 4タブ構成
+tab1, tab2, tab3, tab4 = st.tabs(
+    ["📤 ジョブ登録", "📋 ジョブ一覧", "📊 ステータス確認", "🗄️ ジョブ履歴"]
+)
 
 # ========================================
 # タブ1: ジョブ登録
@@ -66,126 +244,209 @@ with tab1:
         help="最大100MBまでのPDFファイルをアップロードできます。",
     )
 
+    if admission is not None:
+        try:
+            backlog = admission.backlog()
+            st.caption(
+                f"混雑状況: 処理待ち {backlog.pending} / 処理中 {backlog.processing} / "
+                f"受付待ち {backlog.queued}"
+                f"（完了までの目安 {format_eta(backlog.wait_seconds(backlog.in_flight + 1))}）"
+            )
+        except redis.RedisError as e:
+            logger.error(f"Error loading backlog: {e}")
+
     if uploaded_file is not None:
         st.info(
             f"📁 選択されたファイル: {uploaded_file.name} "
             f"({uploaded_file.size / 1024 / 1024:.2f} MB)"
         )
 
+        profile_requested = st.checkbox(
+            "🔬 CPU・メモリプロファイルを取得する",
+            help="処理が遅いPDFの調査用。ワーカーでプロファイリングが有効な場合のみ取得されます。",
+        )
+
         if st.button("🚀 解析開始", type="primary"):
-            try:
-                # ジョブID生成
-                job_id = str(uuid.uuid4())
-                logger.info(f"Starting job {job_id} for file {uploaded_file.name}")
-
-                # ファイルアップロード
-                destination_path = f"uploads/{job_id}/{uploaded_file.name}"
-                file_bytes = uploaded_file.read()
-                storage_client.upload_file(file_bytes, destination_path)
-                logger.info(f"File uploaded: {destination_path}")
-
-                # Pub/Subメッセージ発行
-                message = {
-                    "job_id": job_id,
-                    "pdf_path": destination_path,
-                    "bucket_name": settings.gcs_bucket_name or "local",
-                    "timestamp": datetime.now(UTC).isoformat(),
-                }
-                message_id = pubsub_client.publish_message(message)
-                logger.info(f"Published Pub/Sub message: {message_id}")
-
-                # セッションステートに保存（ステータス確認タブで使用）
-                st.session_state["selected_job_id"] = job_id
-
-                st.success(
-                    f"✅ 処理を開始しました\n\n"
-                    f"**Job ID**: `{job_id}`\n\n"
-                    f"「ジョブ一覧」タブで確認できます。"
+            # 混雑時は受付待ちに積むか拒否する（拒否する場合はアップロードしない）
+            decision = admission.decide(current_user_id()) if admission is not None else None
+            if decision is not None and decision.action == "reject":
+                st.error(
+                    "❌ システムが混雑しているため受け付けできません"
+                    f"（完了までの目安 {format_eta(decision.eta_seconds)}）。"
+                    "しばらくしてから再度お試しください。"
+                )
+            elif decision is not None and decision.action == "rate_limited":
+                st.warning(
+                    "⏳ 登録の間隔が短すぎます。"
+                    f"{decision.retry_after_seconds:.0f}秒後に再度お試しください。"
                 )
+            else:
+                try:
+                    # ジョブID生成
+                    job_id = str(uuid.uuid4())
+                    submitted_at = datetime.now(UTC)
+                    logger.info(f"Starting job {job_id} for file {uploaded_file.name}")
+
+                    with tracer.span("submit_job", job_id=job_id):
+                        # ファイルアップロード
+                        destination_path = f"uploads/{job_id}/{uploaded_file.name}"
+                        file_bytes = uploaded_file.read()
+                        upload_started = time.perf_counter()
+                        with tracer.span(
+                            "upload_file", path=destination_path, bytes=len(file_bytes)
+                        ):
+                            storage_client.upload_file(file_bytes, destination_path)
+                        upload_ms = (time.perf_counter() - upload_started) * 1000
+                        logger.info(f"File uploaded: {destination_path}")
+
+                        # Pub/Subメッセージ発行（計測点とトレースコンテキストを属性に付与）
+                        # content_sha256 は重複排除用にルーティング属性として発行される
+                        message = {
+                            "job_id": job_id,
+                            "pdf_path": destination_path,
+                            "bucket_name": settings.gcs_bucket_name or "local",
+                            "timestamp": datetime.now(UTC).isoformat(),
+                            "content_sha256": hashlib.sha256(file_bytes).hexdigest(),
+                        }
+                        attributes = {
+                            SUBMITTED_AT_ATTRIBUTE: submitted_at.isoformat(),
+                            UPLOAD_MS_ATTRIBUTE: f"{upload_ms:.1f}",
+                        }
+                        if profile_requested:
+                            attributes[PROFILE_ATTRIBUTE] = "1"
+                        # プロファイルはバッチ処理では取得しないため、要求した場合はまとめない
+                        batched = (
+                            settings.batch_enabled
+                            and uploaded_file.size <= settings.batch_small_file_max_bytes
+                            and not profile_requested
+                        )
+                        if (
+                            admission is not None
+                            and decision is not None
+                            and (decision.action == "queue")
+                        ):
+                            # 受付待ちに積む（バックログに空きができた時点でアプリが発行する）
+                            with tracer.span("queue_job"):
+                                inject(attributes)
+                                admission.enqueue(job_id, message, attributes, decision.eta_seconds)
+                        else:
+                            # ダッシュボードのカウンタ（submitted）と処理待ちの集合に登録し、
+                            # 発行直後から中止できるよう処理待ちのステータスを書き込む
+                            pipe = redis_client.pipeline(transaction=False)
+                            queue_submission(pipe, job_id)
+                            pipe.execute()
+                            with tracer.span("publish_message", batched=batched):
+                                inject(attributes)
+                                if batched:
+                                    # 小さなPDFはリンガー時間内の他のジョブとまとめて発行
+                                    message_id = batching_publisher.submit(
+                                        message, attributes
+                                    ).result(timeout=settings.batch_linger_seconds + 30)
+                                else:
+                                    message_id = pubsub_client.publish_message(message, attributes)
+                            logger.info(f"Published Pub/Sub message: {message_id}")
+
+                    # セッションステートに保存（ステータス確認タブで使用）
+                    st.session_state["selected_job_id"] = job_id
+
+                    if decision is not None and decision.action == "queue":
+                        st.info(
+                            f"⏳ 混雑しているため受付待ちに登録しました"
+                            f"（完了までの目安 {format_eta(decision.eta_seconds)}）\n\n"
+                            f"**Job ID**: `{job_id}`\n\n"
+                            f"空きができ次第、自動的に処理を開始します。"
+                        )
+                    else:
+                        st.success(
+                            f"✅ 処理を開始しました\n\n"
+                            f"**Job ID**: `{job_id}`\n\n"
+                            f"「ジョブ一覧」タブで確認できます。"
+                        )
 
-                # 画面を再描画してジョブ一覧を更新
-                time.sleep(1)
-                st.rerun()
+                    # 画面を再描画してジョブ一覧を更新
+                    time.sleep(1)
+                    st.rerun()
 
-            except Exception as e:
-                logger.error(f"Error starting job: {e}")
-                st.error(f"❌ エラーが発生しました: {e}")
+                except Exception as e:
+                    logger.error(f"Error starting job: {e}")
+                    st.error(f"❌ エラーが発生しました: {e}")
 
 # ========================================
 # タブ2: ジョブ一覧
 # ========================================
 with tab2:
-    st.header("過去24時間のジョブ一覧")
+    st.header("ジョブ一覧")
 
     try:
-        # Redis SCAN でjob:*パターンのキーを全て取得
-        cursor = 0
-        jobs = []
-        while True:
-            cursor, keys = redis_client.scan(cursor, match="job:*", count=100)
-            for key in keys:
-                job_data_str = redis_client.get(key)
-                if job_data_str:
-                    job_data = json.loads(job_data_str)
-                    job_data["job_id"] = key.replace("job:", "")
-                    jobs.append(job_data)
-            if cursor == 0:
-                break
-
-        if not jobs:
-            st.info("ジョブが見つかりませんでした。")
+        filter_col1, filter_col2, filter_col3 = st.columns([1, 3, 1])
+        with filter_col1:
+            window_label = st.selectbox(
+                "期間", list(JOB_LIST_WINDOWS), index=len(JOB_LIST_WINDOWS) - 1
+            )
+        with filter_col2:
+            selected_statuses = st.multiselect("ステータス", JOB_STATUSES, default=JOB_STATUSES)
+        with filter_col3:
+            order = st.selectbox(
+                "並び順", list(JOB_ORDER_LABELS), format_func=JOB_ORDER_LABELS.__getitem__
+            )
+        window_seconds = JOB_LIST_WINDOWS[window_label]
+
+        # サマリー（ワーカーが更新する時間バケットのカウンタを集計、ジョブ数に依存しない）
+        summary = load_summary(redis_client, window_seconds)
+        metric_cols = st.columns(8)
+        metric_cols[0].metric("投入", summary.submitted)
+        metric_cols[1].metric("処理待ち", summary.pending)
+        metric_cols[2].metric("処理中", summary.processing)
+        metric_cols[3].metric("完了", summary.completed)
+        metric_cols[4].metric("失敗", summary.failed)
+        metric_cols[5].metric("中止", summary.cancelled)
+        metric_cols[6].metric("処理ページ数", summary.pages)
+        avg_seconds = summary.avg_processing_seconds
+        metric_cols[7].metric(
+            "平均処理時間", f"{avg_seconds:.1f}s" if avg_seconds is not None else "-"
+        )
+
+        # 表示するページのジョブだけをRedisから読み込む（ページング・並び替えはRedis側で行う）
+        job_page_number = st.number_input("ページ", min_value=1, value=1, step=1, key="job_page")
+        job_page = load_job_page(
+            redis_client,
+            selected_statuses,
+            time.time() - window_seconds,
+            page=int(job_page_number) - 1,
+            page_size=JOB_PAGE_SIZE,
+            order=order,
+        )
+
+        if not job_page.records:
+            st.info(f"ジョブが見つかりませんでした（{job_page.total} 件）。")
         else:
-            # updated_at でソート（新しい順）
-            jobs.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
-
-            # ヘッダー行
-            col1, col2, col3, col4, col5 = st.columns([2, 2, 1, 2, 1])
-            with col1:
-                st.markdown("**Job ID**")
-            with col2:
-                st.markdown("**ステータス**")
-            with col3:
-                st.markdown("**進捗**")
-            with col4:
-                st.markdown("**更新日時**")
-            with col5:
-                st.markdown("**操作**")
-
-            st.divider()
-
-            # テーブル表示
-            for job in jobs:
-                job_id = job.get("job_id", "unknown")
-                status = job.get("status", "unknown")
-                progress = job.get("progress", 0)
-                updated_at = job.get("updated_at", "")
-
-                # ステータスアイコン
-                status_icons = {
-                    "pending": "🟡",
-                    "processing": "🔵",
-                    "completed": "🟢",
-                    "failed": "🔴",
-                }
-                icon = status_icons.get(status, "⚪")
-
-                # 行表示
-                col1, col2, col3, col4, col5 = st.columns([2, 2, 1, 2, 1])
-                with col1:
-                    st.text(f"{job_id}")
-                with col2:
-                    st.text(f"{icon} {status}")
-                with col3:
-                    st.text(f"{progress}%")
-                with col4:
-                    st.text(updated_at[:19] if updated_at else "")
-                with col5:
-                    if st.button("詳細", key=f"select_{job_id}"):
-                        st.session_state["selected_job_id"] = job_id
-                        st.toast(
-                            f"ジョブ `{job_id}` を選択しました。ステータスで確認できます",
-                            icon=":material/output:",
-                        )
+            first = job_page.page * job_page.page_size + 1
+            st.caption(
+                f"{job_page.total} 件中 {first}〜{first + len(job_page.records) - 1} 件"
+                f"（{job_page.page + 1} / {job_page.page_count} ページ）。"
+                "行を選択すると操作できます。"
+            )
+            # 絞り込み・ページが変わった場合は行の選択を解除する
+            table_key = "_".join(
+                ["job_table", window_label, order, str(job_page.page), *selected_statuses]
+            )
+            selected_job = render_job_table(job_page.records, key=table_key)
+
+            if selected_job is not None:
+                job_id = selected_job["job_id"]
+                action_col1, action_col2, action_col3 = st.columns([4, 1, 1])
+                action_col1.markdown(f"選択中: `{job_id}`")
+                if action_col2.button("詳細", key="job_list_select", use_container_width=True):
+                    st.session_state["selected_job_id"] = job_id
+                    st.toast(
+                        f"ジョブ `{job_id}` を選択しました。ステータスで確認できます",
+                        icon=":material/output:",
+                    )
+                if selected_job.get("status") in CANCELLABLE_STATUSES and action_col3.button(
+                    "中止", key="job_list_cancel", use_container_width=True
+                ):
+                    request_cancel(job_id)
+                    st.toast(f"ジョブ `{job_id}` の中止をリクエストしました", icon="⏹️")
 
     except redis.RedisError as e:
         logger.error(f"Redis connection error: {e}")
@@ -228,6 +489,13 @@ with tab3:
                 result_url = job_data.get("result_url", "")
                 updated_at = job_data.get("updated_at", "")
 
+                # 中止ボタン（処理待ち・処理中のみ）
+                if status in CANCELLABLE_STATUSES and st.button(
+                    "⏹️ 処理を中止", key=f"cancel_detail_{selected_job_id}"
+                ):
+                    request_cancel(selected_job_id)
+                    st.info("中止をリクエストしました。次のページの区切りで処理が停止します。")
+
                 # ステータス表示
                 if status == "pending":
                     st.info("🟡 処理待機中...")
@@ -246,6 +514,23 @@ with tab3:
                     st.success("🟢 処理完了！")
                     st.text(f"更新日時: {updated_at}")
 
+                    # レイテンシ内訳（ワーカーが記録した場合のみ）
+                    latency = job_data.get("latency")
+                    if latency:
+                        st.markdown("**レイテンシ内訳**")
+                        latency_labels = {
+                            "upload_ms": "アップロード",
+                            "publish_ms": "発行",
+                            "queue_wait_ms": "キュー待ち",
+                            "processing_ms": "処理",
+                            "total_ms": "合計",
+                        }
+                        for col, (key, label) in zip(
+                            st.columns(len(latency_labels)), latency_labels.items(), strict=True
+                        ):
+                            value = latency.get(key)
+                            col.metric(label, f"{value / 1000:.2f} s" if value is not None else "-")
+
                     if result_url:
                         try:
                             result_bytes = storage_client.download_file(result_url)
@@ -266,12 +551,79 @@ with tab3:
                     st.error(f"**エラー内容**: {error_msg}")
                     st.text(f"更新日時: {updated_at}")
 
+                elif status == "cancelled":
+                    st.warning(f"⚫ 処理を中止しました: {message}")
+                    st.text(f"更新日時: {updated_at}")
+
                 else:
                     st.warning(f"⚠️ 不明なステータス: {status}")
 
+                # プロファイル（ワーカーが取得した場合のみ、終了したジョブで表示）
+                profile_str = redis_client.get(f"profile:{selected_job_id}")
+                if profile_str:
+                    render_profile(selected_job_id, json.loads(profile_str))
+
         except redis.RedisError as e:
             logger.error(f"Redis connection error: {e}")
             st.error("❌ Redis接続エラー")
         except Exception as e:
             logger.error(f"Error fetching job status: {e}")
             st.error(f"❌ ステータス取得エラー: {e}")
+
+# ========================================
+# タブ4: ジョブ履歴（アーカイブ）
+# ========================================
+with tab4:
+    st.header("ジョブ履歴")
+    st.caption("終了したジョブの履歴をオブジェクトストレージから表示します（数分遅れで反映）。")
+
+    today = datetime.now(UTC).date()
+    col1, col2, col3 = st.columns([2, 2, 2])
+    date_range = col1.date_input(
+        "期間（UTC）", value=(today - timedelta(days=7), today), max_value=today
+    )
+    history_statuses = col2.multiselect(
+        "ステータス", TERMINAL_STATUSES, default=list(TERMINAL_STATUSES)
+    )
+    job_id_prefix = col3.text_input("Job ID（前方一致）").strip()
+
+    # 期間の選択途中（開始日のみ）は開始日の1日分を表示する
+    start_date, end_date = (date_range[0], date_range[-1]) if date_range else (today, today)
+
+    try:
+        history_page_number = st.number_input("ページ", min_value=1, value=1, step=1)
+        history_page = history_reader.query(
+            start_date,
+            end_date,
+            history_statuses,
+            job_id_prefix=job_id_prefix,
+            page=int(history_page_number) - 1,
+            page_size=HISTORY_PAGE_SIZE,
+        )
+        if history_page.records:
+            first = history_page.page * history_page.page_size + 1
+            st.caption(
+                f"{history_page.total} 件中 {first}〜{first + len(history_page.records) - 1} 件"
+                f"（{history_page.page + 1} / {history_page.page_count} ページ）"
+            )
+            st.dataframe(
+                [
+                    {
+                        "Job ID": record["job_id"],
+                        "ステータス": record["status"],
+                        "更新日時": record["updated_at"],
+                        "メッセージ": record["message"],
+                        "エラー": record.get("error_msg", ""),
+                        "結果": record.get("result_url", ""),
+                    }
+                    for record in history_page.records
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.info(f"📭 該当するジョブがありません（{history_page.total} 件）")
+
+    except Exception as e:
+        logger.error(f"Error loading job history: {e}")
+        st.error(f"❌ 履歴の取得エラー: {e}")
@@ -0,0 +1,4 @@
+"""Streamlit フロントエンドのベンチマークスイート.
+
+`apps/streamlit-app` をカレントディレクトリとして `python -m benchmarks.<name>` で実行する。
+"""
@@ -0,0 +1,270 @@
+"""ジョブ一覧（タブ2）の描画ベンチマーク.
+
+ジョブ数を変えながら、タブ2の1回の再実行（Redisからの読み込みと描画）にかかる時間を
+`streamlit.testing.v1.AppTest` で計測する。
+
+- table: ステータス集合から表示するページだけを読み込み、1つの `st.dataframe` で描画する（現行）
+- legacy: `job:*` を SCAN して全件を読み込み、行ごとに `st.columns` と `st.button` を描画する
+  （旧実装）
+
+table について、最大ジョブ数の再実行時間（p50）が最小ジョブ数の `--max-growth` 倍以下であることと、
+読み込むジョブのレコード数がページサイズ以下であることを確認し、満たさない場合は終了コード1で終了する。
+legacy は時間がかかるため `--legacy-max-jobs` 以下のジョブ数だけで計測する。
+
+実行例（apps/streamlit-app で実行）:
+    python -m benchmarks.bench_job_table --jobs 100,1000,10000 --output bench_job_table.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import redis
+from loguru import logger
+from streamlit.testing.v1 import AppTest
+
+from job_stats import JOB_STATUSES, queue_submission, status_set_key
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", default="100,1000,10000", help="ジョブ数（カンマ区切り）")
+    parser.add_argument("--reruns", type=int, default=10, help="ジョブ数ごとの再実行回数")
+    parser.add_argument("--page-size", type=int, default=50, help="1ページあたりの件数")
+    parser.add_argument(
+        "--legacy-max-jobs", type=int, default=1000, help="legacy を計測する最大ジョブ数"
+    )
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=1.5,
+        help="table で許容する、最大ジョブ数の再実行時間（p50）の最小ジョブ数比",
+    )
+    parser.add_argument("--redis-url", default=None, help="ローカルRedis（未指定時 fakeredis）")
+    parser.add_argument("--output", type=Path, default=None, help="結果JSONの出力先")
+    return parser.parse_args(argv)
+
+
+class CountingRedis:
+    """ネットワーク往復数と、読み込んだジョブのレコード数を計測するプロキシ."""
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+        self.round_trips = 0
+        self.job_records = 0
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.round_trips += 1
+            result = attr(*args, **kwargs)
+            if name == "get" and result:
+                self.job_records += 1
+            elif name == "mget":
+                self.job_records += sum(1 for value in result if value)
+            return result
+
+        return wrapper
+
+    def pipeline(self, *args: Any, **kwargs: Any) -> Any:
+        pipe = self._client.pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*execute_args: Any, **execute_kwargs: Any) -> Any:
+            self.round_trips += 1
+            return execute(*execute_args, **execute_kwargs)
+
+        pipe.execute = counted_execute  # type: ignore[method-assign]
+        return pipe
+
+
+def create_redis_client(redis_url: str | None) -> redis.Redis:
+    """ベンチマーク用のRedisクライアントを生成する（未指定の場合は fakeredis）."""
+    if redis_url:
+        return redis.Redis.from_url(redis_url, decode_responses=True)
+
+    import fakeredis
+
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def populate(redis_client: redis.Redis, jobs: int, rng: random.Random) -> None:
+    """過去24時間に分散したジョブのステータスとステータス集合を書き込む."""
+    redis_client.flushdb()
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for index in range(jobs):
+        job_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        submitted_at = now - rng.uniform(0, 86000)
+        status = rng.choice(JOB_STATUSES)
+        queue_submission(pipe, job_id, now=submitted_at)
+        if status != "pending":
+            pipe.zrem(status_set_key("pending"), job_id)
+            pipe.zadd(status_set_key(status), {job_id: submitted_at})
+            status_data = {
+                "status": status,
+                "progress": 100 if status == "completed" else rng.randint(0, 99),
+                "message": f"{status} message",
+                "result_url": f"results/{job_id}/result.json" if status == "completed" else "",
+                "error_msg": "",
+                "updated_at": datetime.fromtimestamp(submitted_at, UTC).isoformat(),
+            }
+            pipe.setex(f"job:{job_id}", 86400, json.dumps(status_data))
+        if index % 1000 == 999:
+            pipe.execute()
+    pipe.execute()
+
+
+def table_script(redis_client: "CountingRedis", page_size: int) -> None:
+    """現行のタブ2（ページ単位の読み込みと `st.dataframe`）.
+
+    AppTest がソースを切り出して実行するため、import は関数内で行う。
+    """
+    import time
+
+    from job_stats import JOB_STATUSES, load_job_page
+    from job_table import render_job_table
+
+    job_page = load_job_page(
+        redis_client, JOB_STATUSES, time.time() - 86400, page=0, page_size=page_size
+    )
+    render_job_table(job_page.records, key="job_table")
+
+
+def legacy_script(redis_client: "CountingRedis", page_size: int) -> None:
+    """旧実装のタブ2（`job:*` の SCAN と、行ごとの `st.columns` / `st.button`）."""
+    import json
+
+    import streamlit as st
+
+    cursor = 0
+    jobs = []
+    while True:
+        cursor, keys = redis_client.scan(cursor, match="job:*", count=100)
+        for key in keys:
+            job_data_str = redis_client.get(key)
+            if job_data_str:
+                job_data = json.loads(job_data_str)
+                job_data["job_id"] = key.replace("job:", "")
+                jobs.append(job_data)
+        if cursor == 0:
+            break
+    jobs.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
+
+    for job in jobs:
+        job_id = job["job_id"]
+        col1, col2, col3, col4, col5 = st.columns([2, 2, 1, 2, 1])
+        with col1:
+            st.text(job_id)
+        with col2:
+            st.text(job["status"])
+        with col3:
+            st.text(f"{job['progress']}%")
+        with col4:
+            st.text(job["updated_at"][:19])
+        with col5:
+            st.button("詳細", key=f"select_{job_id}")
+            if job["status"] in ("pending", "processing"):
+                st.button("中止", key=f"cancel_{job_id}")
+
+
+def measure(
+    script: Callable[..., None], redis_client: CountingRedis, page_size: int, reruns: int
+) -> dict[str, Any]:
+    """スクリプトの再実行時間と、1回あたりのRedisの往復数・読み込んだレコード数を計測する."""
+    app = AppTest.from_function(script, args=(redis_client, page_size), default_timeout=600)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{script.__name__} failed: {app.exception[0].message}")
+
+    durations = []
+    round_trips_before = redis_client.round_trips
+    records_before = redis_client.job_records
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        durations.append(time.perf_counter() - started)
+
+    return {
+        "p50_ms": round(statistics.median(durations) * 1000, 2),
+        "max_ms": round(max(durations) * 1000, 2),
+        "redis_round_trips": (redis_client.round_trips - round_trips_before) // reruns,
+        "job_records_read": (redis_client.job_records - records_before) // reruns,
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """ベンチマークを実行し、結果を辞書で返す."""
+    job_counts = sorted(int(value) for value in args.jobs.split(","))
+    raw_client = create_redis_client(args.redis_url)
+    redis_client = CountingRedis(raw_client)
+    rng = random.Random(0)
+
+    results: dict[str, dict[str, Any]] = {"table": {}, "legacy": {}}
+    for jobs in job_counts:
+        populate(raw_client, jobs, rng)
+        results["table"][str(jobs)] = measure(
+            table_script, redis_client, args.page_size, args.reruns
+        )
+        if jobs <= args.legacy_max_jobs:
+            results["legacy"][str(jobs)] = measure(
+                legacy_script, redis_client, args.page_size, max(1, args.reruns // 5)
+            )
+
+    table = results["table"]
+    smallest, largest = table[str(job_counts[0])], table[str(job_counts[-1])]
+    growth = largest["p50_ms"] / smallest["p50_ms"] if smallest["p50_ms"] else 0.0
+
+    failures = []
+    if growth > args.max_growth:
+        failures.append(
+            f"table rerun p50 grew {growth:.2f}x from {job_counts[0]} to {job_counts[-1]} jobs "
+            f"(max {args.max_growth:.2f}x)"
+        )
+    for jobs, result in table.items():
+        if result["job_records_read"] > args.page_size:
+            failures.append(f"table read {result['job_records_read']} job records at {jobs} jobs")
+
+    return {
+        "config": {
+            "jobs": job_counts,
+            "reruns": args.reruns,
+            "page_size": args.page_size,
+            "legacy_max_jobs": args.legacy_max_jobs,
+        },
+        "modes": results,
+        "table_growth_ratio": round(growth, 3),
+        "failures": failures,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """エントリーポイント."""
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    result = run(args)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
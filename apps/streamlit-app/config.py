@@ -26,6 +26,32 @@ class Settings(BaseSettings):
     pubsub_emulator_host: str | None = None
     pubsub_topic: str = "pdf-processing-topic"
     gcp_project_id: str | None = None
+    # 発行するメッセージ本文のスキーマ（"1": JSON / "2": msgpack。ワーカーの移行後に "2" にする）
+    message_schema_version: str = "1"
+
+    # マイクロバッチ設定（小さなPDFをまとめて1メッセージで発行）
+    batch_enabled: bool = True
+    batch_linger_seconds: float = 2.0
+    batch_max_jobs: int = 10
+    batch_small_file_max_bytes: int = 1024 * 1024
+
+    # アドミッション制御（混雑時はジョブを受付待ちに積み、満杯の場合は拒否する）
+    admission_enabled: bool = True
+    admission_max_wait_seconds: float = 1200.0
+    admission_max_eta_seconds: float = 7200.0
+    admission_max_queued: int = 500
+    admission_capacity_jobs_per_minute: float = 6.0
+    admission_throughput_window_seconds: int = 900
+    admission_processing_heartbeat_seconds: float = 300.0
+    admission_drain_interval_seconds: float = 5.0
+
+    # ユーザーごとの登録頻度の制限（トークンバケット、0 で無効）
+    rate_limit_burst: int = 10
+    rate_limit_per_minute: float = 2.0
+
+    # トレーシング設定（TRACE_EXPORTER: none / console / file）
+    trace_exporter: str = "none"
+    trace_file_path: str = "./traces/app-spans.jsonl"
 
     model_config = SettingsConfigDict(
         env_file=".env",
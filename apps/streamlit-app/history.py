@@ -0,0 +1,205 @@
+"""ジョブ履歴の読み込みモジュール.
+
+ワーカーがオブジェクトストレージに書き込んだ履歴（`history/index.json` と、日付パーティション
+ごとの gzip 圧縮 NDJSON セグメント）を読み込み、Redisを参照せずに長期の履歴をページ単位で
+絞り込む。索引のステータス別件数から対象のセグメントと件数を求め、表示するページを含む
+セグメントだけをダウンロードする（セグメントは追記のみのため、読み込んだ内容はキャッシュする）。
+ワーカーは前日以前のセグメントを1つにまとめて古いセグメントを削除するため、キャッシュした索引の
+セグメントが見つからない場合は索引を読み込み直して検索をやり直す。
+"""
+
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+from storage import StorageClient
+
+# 履歴ストアの索引
+HISTORY_INDEX_PATH = "history/index.json"
+
+
+@dataclass(frozen=True)
+class HistoryPage:
+    """履歴の1ページ分の検索結果."""
+
+    records: list[dict[str, Any]]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def page_count(self) -> int:
+        """総ページ数（最低1）."""
+        return max(1, -(-self.total // self.page_size))
+
+
+class HistoryReader:
+    """履歴ストアを検索するリーダー."""
+
+    def __init__(
+        self,
+        storage_client: StorageClient,
+        index_ttl_seconds: float = 30.0,
+        segment_cache_size: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化.
+
+        Args:
+            storage_client: ストレージクライアント
+            index_ttl_seconds: 索引を再読み込みするまでの秒数
+            segment_cache_size: メモリにキャッシュするセグメント数
+            clock: 索引の有効期限の計測に使う時計
+        """
+        self.storage_client = storage_client
+        self.index_ttl_seconds = index_ttl_seconds
+        self.segment_cache_size = segment_cache_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: list[dict[str, Any]] = []
+        self._index_loaded_at: float | None = None
+        self._segments: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+
+    def segments(self) -> list[dict[str, Any]]:
+        """セグメントの一覧を新しい順に返す（`index_ttl_seconds` の間はキャッシュを使う）.
+
+        Returns:
+            list[dict[str, Any]]: 索引のセグメント情報
+        """
+        with self._lock:
+            now = self._clock()
+            loaded_at = self._index_loaded_at
+            if loaded_at is not None and now - loaded_at < self.index_ttl_seconds:
+                return self._index
+
+        try:
+            index = json.loads(self.storage_client.download_file(HISTORY_INDEX_PATH))
+        except FileNotFoundError:
+            index = {"segments": []}
+        segments = sorted(
+            index["segments"], key=lambda segment: (segment["date"], segment["last"]), reverse=True
+        )
+
+        with self._lock:
+            self._index = segments
+            self._index_loaded_at = self._clock()
+        return segments
+
+    def invalidate_index(self) -> None:
+        """キャッシュした索引を破棄し、次回の検索で読み込み直す."""
+        with self._lock:
+            self._index_loaded_at = None
+
+    def read_segment(self, path: str) -> list[dict[str, Any]]:
+        """セグメントのレコードを返す（新しい順）.
+
+        Args:
+            path: セグメントのパス
+
+        Returns:
+            list[dict[str, Any]]: 履歴レコード
+        """
+        with self._lock:
+            if path in self._segments:
+                self._segments.move_to_end(path)
+                return self._segments[path]
+
+        body = gzip.decompress(self.storage_client.download_file(path)).decode("utf-8")
+        records = [json.loads(line) for line in body.splitlines() if line]
+
+        with self._lock:
+            self._segments[path] = records
+            while len(self._segments) > self.segment_cache_size:
+                self._segments.popitem(last=False)
+        return records
+
+    def query(
+        self,
+        start: date,
+        end: date,
+        statuses: Collection[str],
+        job_id_prefix: str = "",
+        page: int = 0,
+        page_size: int = 50,
+    ) -> HistoryPage:
+        """期間・ステータス・ジョブIDで絞り込んだ履歴の1ページを返す.
+
+        ジョブIDを指定しない場合は、索引の件数だけで総件数と読み飛ばすセグメントを決めるため、
+        ダウンロードするのは表示するページを含むセグメントだけになる。
+
+        Args:
+            start: 期間の開始日（UTC、この日を含む）
+            end: 期間の終了日（UTC、この日を含む）
+            statuses: 対象のステータス
+            job_id_prefix: ジョブIDの前方一致（空の場合は絞り込まない）
+            page: ページ番号（0始まり）
+            page_size: 1ページあたりの件数
+
+        Returns:
+            HistoryPage: 検索結果
+        """
+        try:
+            return self._query(start, end, statuses, job_id_prefix, page, page_size)
+        except FileNotFoundError:
+            # まとめられて削除されたセグメント（索引の読み込み後にワーカーが更新した）
+            self.invalidate_index()
+            return self._query(start, end, statuses, job_id_prefix, page, page_size)
+
+    def _query(
+        self,
+        start: date,
+        end: date,
+        statuses: Collection[str],
+        job_id_prefix: str,
+        page: int,
+        page_size: int,
+    ) -> HistoryPage:
+        """`query` の本体（引数と戻り値は `query` と同じ）."""
+        start_key, end_key = start.isoformat(), end.isoformat()
+        candidates = [
+            (segment, sum(segment["statuses"].get(status, 0) for status in statuses))
+            for segment in self.segments()
+            if start_key <= segment["date"] <= end_key
+        ]
+        candidates = [(segment, count) for segment, count in candidates if count]
+
+        def matched_records(segment: dict[str, Any]) -> list[dict[str, Any]]:
+            return [
+                record
+                for record in self.read_segment(segment["path"])
+                if record["status"] in statuses and record["job_id"].startswith(job_id_prefix)
+            ]
+
+        offset = page * page_size
+        records: list[dict[str, Any]] = []
+
+        if job_id_prefix:
+            # ジョブIDは索引に無いため、期間内のセグメントを全て読み込んで数える
+            total = 0
+            for segment, _ in candidates:
+                matched = matched_records(segment)
+                start_at = max(0, offset - total)
+                records.extend(matched[start_at : max(0, offset + page_size - total)])
+                total += len(matched)
+            return HistoryPage(records[:page_size], total, page, page_size)
+
+        total = sum(count for _, count in candidates)
+        skipped = 0
+        for segment, count in candidates:
+            if len(records) >= page_size:
+                break
+            if skipped + count <= offset:
+                # 表示するページより前のセグメントは読み込まない
+                skipped += count
+                continue
+            matched = matched_records(segment)
+            start_at = max(0, offset - skipped)
+            records.extend(matched[start_at : start_at + page_size - len(records)])
+            skipped += count
+        return HistoryPage(records, total, page, page_size)
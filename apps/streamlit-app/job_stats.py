@@ -0,0 +1,277 @@
+"""ジョブ一覧のダッシュボード用カウンタの読み込みモジュール.
+
+ワーカーがステータスの書き込みと同じパイプラインで更新するカウンタ（`stats:{bucket}`）と
+ステータス集合（`status:{status}`）を読み込み、`job:*` を走査せずにジョブ一覧の集計と
+絞り込み・ページングを行う。キーの構成はワーカーの `job_stats` モジュールを参照。
+
+ジョブ登録時の submitted の加算と `status:pending` への追加、処理待ちのステータス
+（`job:{job_id}`）の書き込みはフロントエンドが行う（`queue_submission`）。
+"""
+
+import heapq
+import itertools
+import json
+import time
+from collections.abc import Collection
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+import redis
+
+# 時間バケットの幅（秒）と、カウンタ・ステータス集合の保持期間（ワーカーと同じ値）
+STATS_BUCKET_SECONDS = 300
+STATS_RETENTION_SECONDS = 86400
+
+# 登録時に書き込む処理待ちのステータスのTTL（ワーカーが書き込むステータスと同じ24時間）
+PENDING_STATUS_TTL_SECONDS = 86400
+
+# ステータス集合を持つステータス
+JOB_STATUSES = ("pending", "processing", "completed", "failed", "cancelled")
+
+# ジョブ一覧の並び順（最終更新の新しい順 / 古い順 / ステータス順）
+JOB_ORDERS = ("updated_desc", "updated_asc", "status")
+
+
+def stats_bucket_key(timestamp: float) -> str:
+    """時刻を含む時間バケットのRedisキーを返す."""
+    return f"stats:{int(timestamp) // STATS_BUCKET_SECONDS * STATS_BUCKET_SECONDS}"
+
+
+def status_set_key(status: str) -> str:
+    """ステータス集合のRedisキーを返す."""
+    return f"status:{status}"
+
+
+def queue_submission(
+    pipe: Any,
+    job_id: str,
+    now: float | None = None,
+    message: str = "Waiting for processing...",
+) -> None:
+    """ジョブ登録時のカウンタ・ステータス集合と、処理待ちのステータスの書き込みをパイプラインに積む.
+
+    ステータス確認タブで発行直後のジョブを表示・中止できるよう、`job:{job_id}` に pending の
+    ステータスを書き込む（ワーカーが処理を開始すると上書きする）。メッセージの発行より前に実行する。
+
+    Args:
+        pipe: Redisパイプライン
+        job_id: ジョブID
+        now: 現在時刻（UNIX時刻、省略時は time.time()）
+        message: 処理待ちのステータスメッセージ
+    """
+    now = time.time() if now is None else now
+    bucket_key = stats_bucket_key(now)
+    status_data = {
+        "status": "pending",
+        "progress": 0,
+        "message": message,
+        "result_url": "",
+        "error_msg": "",
+        "updated_at": datetime.fromtimestamp(now, UTC).isoformat(),
+    }
+    pipe.hincrby(bucket_key, "submitted", 1)
+    pipe.expire(bucket_key, STATS_RETENTION_SECONDS + STATS_BUCKET_SECONDS)
+    pipe.zadd(status_set_key("pending"), {job_id: now})
+    pipe.setex(f"job:{job_id}", PENDING_STATUS_TTL_SECONDS, json.dumps(status_data))
+
+
+@dataclass(frozen=True)
+class JobSummary:
+    """集計期間内のジョブ件数."""
+
+    submitted: int
+    completed: int
+    failed: int
+    cancelled: int
+    pages: int
+    processing_ms: int
+    # 現在のステータスが処理待ち・処理中のジョブ数（集計期間内に更新されたもの）
+    pending: int
+    processing: int
+
+    @property
+    def avg_processing_seconds(self) -> float | None:
+        """完了ジョブの平均処理時間（秒、完了ジョブが無い場合は None）."""
+        if not self.completed:
+            return None
+        return self.processing_ms / self.completed / 1000
+
+
+def load_summary(
+    redis_client: redis.Redis, window_seconds: int, now: float | None = None
+) -> JobSummary:
+    """集計期間内のカウンタを1回のパイプラインで読み込む.
+
+    読み込むキーは期間内の時間バケット数（最大 `STATS_RETENTION_SECONDS / STATS_BUCKET_SECONDS`）
+    とステータス集合2つで、ジョブ数には依存しない。期間の開始はバケットの境界に切り下げる。
+
+    Args:
+        redis_client: Redisクライアント
+        window_seconds: 集計期間（秒）
+        now: 現在時刻（UNIX時刻、省略時は time.time()）
+
+    Returns:
+        JobSummary: 集計結果
+    """
+    now = time.time() if now is None else now
+    since = now - window_seconds
+    first_bucket = int(since) // STATS_BUCKET_SECONDS * STATS_BUCKET_SECONDS
+
+    pipe = redis_client.pipeline(transaction=False)
+    for bucket in range(first_bucket, int(now) + 1, STATS_BUCKET_SECONDS):
+        pipe.hgetall(stats_bucket_key(bucket))
+    pipe.zcount(status_set_key("pending"), since, "+inf")
+    pipe.zcount(status_set_key("processing"), since, "+inf")
+    *buckets, pending, processing = pipe.execute()
+
+    totals: dict[str, int] = {}
+    for bucket in buckets:
+        for field, value in bucket.items():
+            totals[field] = totals.get(field, 0) + int(value)
+    return JobSummary(
+        submitted=totals.get("submitted", 0),
+        completed=totals.get("completed", 0),
+        failed=totals.get("failed", 0),
+        cancelled=totals.get("cancelled", 0),
+        pages=totals.get("pages", 0),
+        processing_ms=totals.get("processing_ms", 0),
+        pending=pending,
+        processing=processing,
+    )
+
+
+@dataclass(frozen=True)
+class JobPage:
+    """ジョブ一覧の1ページ分の検索結果."""
+
+    records: list[dict[str, Any]]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def page_count(self) -> int:
+        """総ページ数（最低1）."""
+        return max(1, -(-self.total // self.page_size))
+
+
+def load_job_page(
+    redis_client: redis.Redis,
+    statuses: Collection[str],
+    since: float,
+    page: int = 0,
+    page_size: int = 50,
+    order: str = "updated_desc",
+) -> JobPage:
+    """指定したステータス・期間のジョブ一覧の1ページを返す.
+
+    件数はステータス集合ごとの ZCOUNT、ページのジョブIDは ZRANGEBYSCORE / ZREVRANGEBYSCORE
+    （O(log n + 取得件数)）で求め、表示するページのジョブだけを MGET で読み込む。
+
+    Args:
+        redis_client: Redisクライアント
+        statuses: 対象のステータス
+        since: 最終更新時刻の下限（UNIX時刻）
+        page: ページ番号（0始まり）
+        page_size: 1ページあたりの件数
+        order: 並び順（`JOB_ORDERS` のいずれか）
+
+    Returns:
+        JobPage: 検索結果（レコードは `job:{job_id}` の内容に job_id を加えたもの）
+    """
+    statuses = [status for status in JOB_STATUSES if status in statuses]
+    if not statuses:
+        return JobPage([], 0, page, page_size)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for status in statuses:
+        pipe.zcount(status_set_key(status), since, "+inf")
+    counts = dict(zip(statuses, pipe.execute(), strict=True))
+    total = sum(counts.values())
+
+    offset = page * page_size
+    if order == "status":
+        members = _status_ordered_members(redis_client, counts, since, offset, page_size)
+    else:
+        members = _time_ordered_members(
+            redis_client, statuses, since, offset, page_size, newest_first=order == "updated_desc"
+        )
+
+    values = redis_client.mget([f"job:{job_id}" for job_id, _, _ in members]) if members else []
+    records = []
+    for (job_id, status, score), job_data_str in zip(members, values, strict=True):
+        if job_data_str:
+            record = json.loads(job_data_str)
+        else:
+            # ワーカーが処理を開始する前のジョブは job:{job_id} が未作成
+            updated_at = datetime.fromtimestamp(score, UTC).isoformat()
+            record = {"status": status, "progress": 0, "updated_at": updated_at}
+        record["job_id"] = job_id
+        records.append(record)
+    return JobPage(records, total, page, page_size)
+
+
+def _status_ordered_members(
+    redis_client: redis.Redis,
+    counts: dict[str, int],
+    since: float,
+    offset: int,
+    limit: int,
+) -> list[tuple[str, str, float]]:
+    """ステータス順（同じステータスの中は新しい順）に、ページの範囲のメンバーを返す.
+
+    ステータスごとの件数から各集合内の開始位置を求めるため、読み込むのはページの件数分だけになる。
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    queried = []
+    skipped = 0
+    for status, count in counts.items():
+        start = max(0, offset - skipped)
+        num = offset + limit - skipped - start
+        skipped += count
+        if start >= count or num <= 0:
+            continue
+        pipe.zrevrangebyscore(
+            status_set_key(status), "+inf", since, start=start, num=num, withscores=True
+        )
+        queried.append(status)
+    if not queried:
+        return []
+    return [
+        (job_id, status, score)
+        for status, members in zip(queried, pipe.execute(), strict=True)
+        for job_id, score in members
+    ]
+
+
+def _time_ordered_members(
+    redis_client: redis.Redis,
+    statuses: list[str],
+    since: float,
+    offset: int,
+    limit: int,
+    newest_first: bool,
+) -> list[tuple[str, str, float]]:
+    """最終更新時刻順に、ページの範囲のメンバーを返す.
+
+    各集合の先頭から `offset + limit` 件を取得してマージするため、読み込む件数はページの位置に
+    比例する（総件数には依存しない）。
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for status in statuses:
+        key = status_set_key(status)
+        if newest_first:
+            pipe.zrevrangebyscore(key, "+inf", since, start=0, num=offset + limit, withscores=True)
+        else:
+            pipe.zrangebyscore(key, since, "+inf", start=0, num=offset + limit, withscores=True)
+
+    merged = heapq.merge(
+        *(
+            [(job_id, status, score) for job_id, score in members]
+            for status, members in zip(statuses, pipe.execute(), strict=True)
+        ),
+        key=lambda member: member[2],
+        reverse=newest_first,
+    )
+    return list(itertools.islice(merged, offset, offset + limit))
@@ -0,0 +1,78 @@
+"""ジョブ一覧テーブルの描画モジュール.
+
+ジョブ一覧（タブ2）を1つの `st.dataframe` で描画する。行ごとにウィジェットを作らず、
+表示するページのレコードだけを渡すため、再実行時の描画コストはジョブ数に依存しない。
+行の選択は `st.dataframe` の行選択（`on_select="rerun"`）を使う。
+"""
+
+from typing import Any
+
+import streamlit as st
+
+# ステータスアイコン
+STATUS_ICONS = {
+    "pending": "🟡",
+    "processing": "🔵",
+    "completed": "🟢",
+    "failed": "🔴",
+    "cancelled": "⚫",
+}
+
+# テーブルの列設定
+JOB_TABLE_COLUMNS = {
+    "Job ID": st.column_config.TextColumn("Job ID", width="large"),
+    "ステータス": st.column_config.TextColumn("ステータス"),
+    "進捗": st.column_config.ProgressColumn("進捗", min_value=0, max_value=100, format="%d%%"),
+    "更新日時": st.column_config.TextColumn("更新日時"),
+    "メッセージ": st.column_config.TextColumn("メッセージ", width="large"),
+}
+
+
+def job_table_rows(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """ジョブのレコードをテーブルの行に変換する.
+
+    Args:
+        records: ジョブのレコード（`job_stats.load_job_page` の戻り値）
+
+    Returns:
+        list[dict[str, Any]]: テーブルの行
+    """
+    rows = []
+    for record in records:
+        status = record.get("status", "unknown")
+        updated_at = record.get("updated_at", "")
+        rows.append(
+            {
+                "Job ID": record["job_id"],
+                "ステータス": f"{STATUS_ICONS.get(status, '⚪')} {status}",
+                "進捗": record.get("progress", 0),
+                "更新日時": updated_at[:19] if updated_at else "",
+                "メッセージ": record.get("message", ""),
+            }
+        )
+    return rows
+
+
+def render_job_table(records: list[dict[str, Any]], key: str) -> dict[str, Any] | None:
+    """ジョブ一覧のテーブルを描画し、選択された行のレコードを返す.
+
+    Args:
+        records: 表示するページのジョブのレコード
+        key: ウィジェットのキー（ページ・絞り込みが変わった場合は選択を解除するため変える）
+
+    Returns:
+        dict[str, Any] | None: 選択された行のレコード（未選択の場合は None）
+    """
+    event = st.dataframe(
+        job_table_rows(records),
+        column_config=JOB_TABLE_COLUMNS,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=key,
+    )
+    selected_rows = event.selection.rows
+    if not selected_rows or selected_rows[0] >= len(records):
+        return None
+    return records[selected_rows[0]]
@@ -4,37 +4,56 @@ Cloud Pub/Sub へのメッセージ発行機能を提供する。
 ローカル開発時は PUBSUB_EMULATOR_HOST 環境変数でエミュレータに接続する。
 """
 
-import json
+import threading
+from concurrent.futures import Future
+from datetime import UTC, datetime
+from typing import Any
 
 from google.cloud import pubsub_v1
 from loguru import logger
 
+from pdf_batch_shared.message_schema import DEFAULT_SCHEMA_VERSION, encode_job_message
+
 
 class PubSubClient:
     """Pub/Sub メッセージ発行クライアント."""
 
-    def __init__(self, project_id: str, topic_name: str) -> None:
+    def __init__(
+        self, project_id: str, topic_name: str, schema_version: str = DEFAULT_SCHEMA_VERSION
+    ) -> None:
         """初期化.
 
         Args:
             project_id: GCPプロジェクトID
             topic_name: Pub/Subトピック名（例: "pdf-processing-topic"）
+            schema_version: メッセージ本文のスキーマのバージョン（"1": JSON / "2": msgpack）
         """
+        self.schema_version = schema_version
         self.publisher = pubsub_v1.PublisherClient()
         self.topic_path = self.publisher.topic_path(project_id, topic_name)
         logger.info(f"PubSubClient initialized with topic: {self.topic_path}")
 
-    def publish_message(self, message: dict[str, str]) -> str:
+    def publish_message(
+        self, message: dict[str, Any], attributes: dict[str, str] | None = None
+    ) -> str:
         """メッセージを発行し、メッセージIDを返す.
 
+        本文は `schema_version` のスキーマでエンコードし
+        （`pdf_batch_shared.message_schema.encode_job_message`）、ルーティング用の属性
+        （job_id, content_sha256, schema_version、バッチは job_count）を `attributes` に加える。
+
         Args:
             message: 発行するメッセージ（辞書形式）
                 例: {
                     "job_id": "uuid",
                     "pdf_path": "uploads/uuid/file.pdf",
                     "bucket_name": "bucket-name",
-                    "timestamp": "2026-02-12T06:30:00Z"
+                    "timestamp": "2026-02-12T06:30:00Z",
+                    "content_sha256": "9f86d08..."
                 }
+                （bucket_name と timestamp は v1 の本文にのみ含まれる）
+            attributes: メッセージ属性（トレースコンテキストなど）
+                例: {"traceparent": "00-...-...-01", "submitted_at": "...", "upload_ms": "12.3"}
 
         Returns:
             str: 発行されたメッセージID
@@ -42,13 +61,115 @@ class PubSubClient:
         Raises:
             Exception: メッセージ発行に失敗した場合
         """
-        message_bytes = json.dumps(message).encode("utf-8")
+        message_bytes, routing_attributes = encode_job_message(message, self.schema_version)
 
         try:
-            future = self.publisher.publish(self.topic_path, message_bytes)
+            future = self.publisher.publish(
+                self.topic_path, message_bytes, **{**(attributes or {}), **routing_attributes}
+            )
             message_id = future.result()
             logger.info(f"Published message {message_id}: {message}")
             return message_id
         except Exception as e:
             logger.error(f"Failed to publish message: {e}")
             raise
+
+
+class BatchingPublisher:
+    """小さなジョブを短いリンガー時間内でまとめ、1つのバッチメッセージとして発行するクラス.
+
+    1〜3ページ程度の小さなPDFは、1ジョブあたりの固定コスト（HTTPリクエスト、ストレージ・Redis
+    呼び出し、Cloud Run のリクエストスケジューリング）の比率が大きいため、複数ジョブを1回の配信に
+    まとめてワーカー側でオーバーヘッドを償却する。
+
+    バッチメッセージ形式:
+        {
+            "jobs": [{"job_id": "...", "pdf_path": "...", "trace": {...}, ...}, ...],
+            "timestamp": "2026-02-12T06:30:00Z"
+        }
+
+    メッセージ属性はバッチ全体で1つのため、ジョブごとの属性（トレースコンテキスト）は
+    各ジョブの `trace` に格納する。
+    """
+
+    def __init__(self, client: PubSubClient, linger_seconds: float, max_jobs: int) -> None:
+        """初期化.
+
+        Args:
+            client: 発行に使用する Pub/Sub クライアント
+            linger_seconds: 最初のジョブを受け付けてから発行するまでの最大待ち時間（秒）
+            max_jobs: 1バッチに含める最大ジョブ数（達した時点で即時発行）
+        """
+        self.client = client
+        self.linger_seconds = linger_seconds
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._pending: list[tuple[dict[str, Any], dict[str, str], Future[str]]] = []
+        self._timer: threading.Timer | None = None
+
+    def submit(
+        self, message: dict[str, Any], attributes: dict[str, str] | None = None
+    ) -> Future[str]:
+        """ジョブをバッチに追加し、発行後にメッセージIDを返す Future を返す.
+
+        Args:
+            message: 単一ジョブのメッセージ
+            attributes: ジョブのメッセージ属性（トレースコンテキストなど）
+
+        Returns:
+            Future[str]: 発行されたメッセージID（バッチ内のジョブは同じID）
+        """
+        future: Future[str] = Future()
+        batch: list[tuple[dict[str, Any], dict[str, str], Future[str]]] = []
+        with self._lock:
+            self._pending.append((message, attributes or {}, future))
+            if len(self._pending) >= self.max_jobs:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.linger_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._publish(batch)
+        return future
+
+    def flush(self) -> None:
+        """保留中のジョブを即時発行する."""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._publish(batch)
+
+    def _take_pending(self) -> list[tuple[dict[str, Any], dict[str, str], Future[str]]]:
+        """保留中のジョブを取り出す（ロック取得中に呼び出す）."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _publish(self, batch: list[tuple[dict[str, Any], dict[str, str], Future[str]]]) -> None:
+        """ジョブをまとめて発行し、各 Future に結果を設定する."""
+        if len(batch) == 1:
+            message, attributes, _ = batch[0]
+        else:
+            message = {
+                "jobs": [
+                    {**job, "trace": job_attributes} if job_attributes else job
+                    for job, job_attributes, _ in batch
+                ],
+                "timestamp": datetime.now(UTC).isoformat(),
+            }
+            attributes = {}
+
+        try:
+            message_id = self.client.publish_message(message, attributes)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        logger.info(f"Published batch of {len(batch)} jobs as message {message_id}")
+        for _, _, future in batch:
+            future.set_result(message_id)
@@ -0,0 +1 @@
+"""PDF一括解析バッチ処理システムのアプリ間（フロントエンド・ワーカー）で共有するロジック."""
@@ -0,0 +1,183 @@
+"""ジョブメッセージ本文のスキーマモジュール.
+
+フロントエンド（`pubsub_client`）とワーカー（`publisher`・`messages`）で共通の形式を扱う。
+
+メッセージ本文のスキーマはメッセージ属性 `schema_version` で判別する（未指定の場合は v1）。
+
+- v1: JSON（`{"job_id", "pdf_path", "bucket_name", "timestamp", ...}`）
+- v2: msgpack。キーを1文字に短縮し、ジョブID（UUID）は16バイトのバイナリ、シャードのページ範囲は
+  配列で表す。`bucket_name` と `timestamp`（Pub/Sub の publishTime と重複）は含めない
+
+ルーティング・重複排除に使うキー（job_id, content_sha256）とバッチのジョブ数（job_count）は、
+本文をデコードせずに参照できるようメッセージ属性にも設定する（`encode_job_message`）。
+ワーカーは本文をデコードする前に属性を検証する（`job_id` の無い単一ジョブのメッセージを拒否する）。
+
+発行側の既定は v1 とし、全てのワーカーが v2 を受信できるようになってから設定
+（`MESSAGE_SCHEMA_VERSION=2`）で切り替える。
+"""
+
+import json
+import uuid
+from typing import Any
+
+import msgpack
+
+# メッセージ属性: 本文のスキーマのバージョン（"1": JSON / "2": msgpack）
+SCHEMA_VERSION_ATTRIBUTE = "schema_version"
+SCHEMA_VERSIONS = ("1", "2")
+
+# 発行時の既定のスキーマのバージョン
+DEFAULT_SCHEMA_VERSION = "1"
+
+# ルーティング・重複排除用のフィールド（単一ジョブのメッセージでは同名のメッセージ属性にも設定する）
+ROUTING_FIELDS = ("job_id", "content_sha256")
+
+# 単一ジョブの v2 の本文には含めず、メッセージ属性だけに設定するフィールド
+ATTRIBUTE_ONLY_FIELDS = ("content_sha256",)
+
+# バッチメッセージのジョブ数の属性
+JOB_COUNT_ATTRIBUTE = "job_count"
+
+# v2 の短縮キー
+V2_KEYS = {
+    "job_id": "i",
+    "pdf_path": "p",
+    "shard": "s",
+    "trace": "t",
+    "content_sha256": "h",
+    "jobs": "j",
+}
+V2_FIELDS = {key: name for name, key in V2_KEYS.items()}
+
+# v2 でシャードを配列で表す場合のフィールド順（ワーカーの `sharding.ShardSpec` のフィールド）
+SHARD_FIELDS = ("index", "count", "start_page", "end_page", "page_count")
+
+
+class MessageSchemaError(ValueError):
+    """スキーマのバージョンが未知、または本文をデコードできない場合の例外."""
+
+
+def encode_job_message(
+    message: dict[str, Any], schema_version: str = DEFAULT_SCHEMA_VERSION
+) -> tuple[bytes, dict[str, str]]:
+    """メッセージを本文とルーティング用のメッセージ属性にエンコードする.
+
+    Args:
+        message: 単一ジョブ形式またはバッチ形式（`{"jobs": [...]}`）のメッセージ
+        schema_version: 本文のスキーマのバージョン（`SCHEMA_VERSIONS` のいずれか）
+
+    Returns:
+        tuple[bytes, dict[str, str]]: 本文とメッセージ属性
+
+    Raises:
+        ValueError: 未知のスキーマのバージョンの場合
+    """
+    if schema_version not in SCHEMA_VERSIONS:
+        raise ValueError(f"Unknown message schema version: {schema_version}")
+
+    attributes = {SCHEMA_VERSION_ATTRIBUTE: schema_version}
+    if "jobs" in message:
+        attributes[JOB_COUNT_ATTRIBUTE] = str(len(message["jobs"]))
+    else:
+        for name in ROUTING_FIELDS:
+            if message.get(name) is not None:
+                attributes[name] = str(message[name])
+
+    if schema_version == "1":
+        return json.dumps(message).encode("utf-8"), attributes
+
+    if "jobs" in message:
+        body = {V2_KEYS["jobs"]: [_encode_v2_job(job, routing=True) for job in message["jobs"]]}
+    else:
+        body = _encode_v2_job(message, routing=False)
+    return msgpack.packb(body), attributes
+
+
+def _encode_v2_job(job: dict[str, Any], routing: bool) -> dict[str, Any]:
+    """ジョブを v2 の短縮キーの辞書に変換する.
+
+    routing=False の場合、`ATTRIBUTE_ONLY_FIELDS` はメッセージ属性に設定するため本文に含めない。
+    """
+    encoded: dict[str, Any] = {}
+    for name, value in job.items():
+        key = V2_KEYS.get(name)
+        if key is None or value is None or (not routing and name in ATTRIBUTE_ONLY_FIELDS):
+            continue
+        if name == "job_id":
+            value = _pack_job_id(value)
+        elif name == "shard":
+            value = [value[field_name] for field_name in SHARD_FIELDS]
+        elif name == "content_sha256":
+            value = bytes.fromhex(value)
+        encoded[key] = value
+    return encoded
+
+
+def _pack_job_id(job_id: str) -> bytes | str:
+    """正規形式のUUIDは16バイトに変換する（それ以外は文字列のまま）."""
+    try:
+        packed = uuid.UUID(job_id)
+    except ValueError:
+        return job_id
+    return packed.bytes if str(packed) == job_id else job_id
+
+
+def decode_message_body(data: bytes, attributes: dict[str, str]) -> dict[str, Any]:
+    """メッセージ本文をスキーマのバージョンに従ってデコードする.
+
+    v2 の本文は v1 と同じキー（`job_id`, `pdf_path`, `shard`, `trace`, `jobs` など）の辞書に戻す。
+
+    Args:
+        data: メッセージ本文
+        attributes: メッセージ属性
+
+    Returns:
+        dict[str, Any]: 単一ジョブ形式またはバッチ形式のメッセージ
+
+    Raises:
+        MessageSchemaError: 未知のスキーマのバージョン、または本文をデコードできない場合
+    """
+    schema_version = attributes.get(SCHEMA_VERSION_ATTRIBUTE, "1")
+    if schema_version not in SCHEMA_VERSIONS:
+        raise MessageSchemaError(f"unsupported schema version: {schema_version}")
+
+    # JSON・msgpack・UUID の不正な値の例外はいずれも ValueError のサブクラス
+    try:
+        if schema_version == "1":
+            decoded = json.loads(data.decode("utf-8"))
+        else:
+            decoded = msgpack.unpackb(data)
+        if not isinstance(decoded, dict):
+            raise MessageSchemaError("message body must be an object")
+        if schema_version == "1":
+            return decoded
+
+        if V2_KEYS["jobs"] in decoded:
+            jobs = decoded[V2_KEYS["jobs"]]
+            if not isinstance(jobs, list):
+                raise MessageSchemaError("jobs must be a non-empty list")
+            return {"jobs": [_decode_v2_job(job) for job in jobs]}
+        return _decode_v2_job(decoded)
+    except MessageSchemaError:
+        raise
+    except ValueError as e:
+        raise MessageSchemaError(f"malformed v{schema_version} message body: {e}") from e
+
+
+def _decode_v2_job(job: Any) -> dict[str, Any]:
+    """v2 の短縮キーの辞書を v1 と同じキーの辞書に戻す."""
+    if not isinstance(job, dict):
+        raise MessageSchemaError("job must be an object")
+    decoded: dict[str, Any] = {}
+    for key, value in job.items():
+        name = V2_FIELDS.get(key)
+        if name is None:
+            continue
+        if name == "job_id" and isinstance(value, bytes):
+            value = str(uuid.UUID(bytes=value))
+        elif name == "shard" and isinstance(value, list):
+            value = dict(zip(SHARD_FIELDS, value, strict=False))
+        elif name == "content_sha256" and isinstance(value, bytes):
+            value = value.hex()
+        decoded[name] = value
+    return decoded
@@ -1,3 +1,10 @@
+# インスタンスあたりの同時リクエスト数の上限
+# ワーカーの適応型同時実行数制御の上限（CONCURRENCY_LIMIT_MAX）と gunicorn のスレッド数（8）に合わせる。
+# Cloud Run の既定（80）のままだと、上限を超えた Push が 429 で拒否されずに gunicorn のキューで待たされる
+locals {
+  max_request_concurrency = 8
+}
+
 resource "google_cloud_run_v2_service" "batch_worker" {
   name               = var.service_name
   location           = var.region
@@ -42,6 +49,23 @@ resource "google_cloud_run_v2_service" "batch_worker" {
         value = "6379"
       }
 
+      env {
+        name  = "CONCURRENCY_LIMIT_MAX"
+        value = tostring(local.max_request_concurrency)
+      }
+
+      # 起動確認（/health は応答と同時にバックグラウンドのウォームアップを開始する。
+      # ウォームアップの完了を待ってからジョブを受け付ける場合は path を "/warmup" にする）
+      startup_probe {
+        http_get {
+          path = "/health"
+          port = 8080
+        }
+        period_seconds    = 1
+        timeout_seconds   = 1
+        failure_threshold = 30
+      }
+
       resources {
         limits = {
           cpu    = "2"
@@ -53,6 +77,8 @@ resource "google_cloud_run_v2_service" "batch_worker" {
     timeout         = "1800s" # 30分
     service_account = var.service_account_email
 
+    max_instance_request_concurrency = local.max_request_concurrency
+
     # VPC Connector経由でRedisに接続
     vpc_access {
       connector = var.vpc_connector_id